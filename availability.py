@@ -0,0 +1,154 @@
+import logging
+import os
+import threading
+from datetime import date
+
+import numpy as np
+
+from reservations import to_day
+
+# На сколько дней вперед от сегодняшнего строится карта занятости
+HORIZON_DAYS = int(os.environ.get("CAR_RENTAL_AVAILABILITY_DAYS", "730"))
+
+logger = logging.getLogger(__name__)
+
+
+def interval_days(start_date, end_date, origin):
+    """Начало и конец интервала в днях от origin; None, если дата в строке некорректна"""
+    try:
+        return to_day(start_date) - origin, to_day(end_date) - origin
+    except (TypeError, ValueError):
+        return None
+
+
+class AvailabilityIndex:
+    """Карта занятости автомобилей по дням: строка - автомобиль, столбец - день.
+
+    Ячейка хранит число интервалов (активных аренд и бронирований), покрывающих
+    день, а не один бит: так снятие интервала при возврате или отмене остается
+    точным. Свободен ли автомобиль в окне - векторная проверка всех ячеек окна
+    на ноль сразу по всему парку. Активная аренда, срок возврата которой уже
+    наступил, занимает автомобиль до конца горизонта: когда его вернут, неизвестно.
+
+    Изменения приходят из журнала AvailabilityLog, который заполняют триггеры
+    на Rentals, Reservations и Cars, поэтому индекс видит записи любых
+    обработчиков и внешних процессов (загрузчика и т.п.), применяя их по одной.
+    """
+
+    def __init__(self, horizon_days=HORIZON_DAYS):
+        self.horizon_days = horizon_days
+        self._lock = threading.Lock()
+        self.origin = None
+        self.last_seq = 0
+        self.car_ids = np.empty(0, dtype=np.int64)
+        self.rows = {}
+        self.daily_rates = np.empty(0, dtype=np.float64)
+        self.fuel_types = np.empty(0, dtype=object)
+        self.busy = np.zeros((0, horizon_days), dtype=np.int8)
+
+    def rebuild(self, conn):
+        """Построить карту заново по текущим арендам и бронированиям"""
+        origin = to_day(str(date.today()))
+        conn.execute("BEGIN")
+        try:
+            last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM AvailabilityLog").fetchone()[0]
+            cars = conn.execute("SELECT car_id, daily_rate, fuel_type FROM Cars ORDER BY car_id").fetchall()
+            intervals = conn.execute('''
+                SELECT car_id, rental_date, planned_return_date, 1 FROM Rentals WHERE status = 'active'
+                UNION ALL
+                SELECT car_id, start_date, end_date, 0 FROM Reservations WHERE status = 'active'
+            ''').fetchall()
+        finally:
+            conn.commit()
+
+        car_ids = np.array([c[0] for c in cars], dtype=np.int64)
+        rows = {car_id: row for row, car_id in enumerate(car_ids.tolist())}
+        busy = np.zeros((len(cars), self.horizon_days), dtype=np.int8)
+
+        known = []
+        for car_id, start_date, end_date, is_rental in intervals:
+            if car_id not in rows:
+                continue
+            days = interval_days(start_date, end_date, origin)
+            if days is None:
+                # Строка с испорченной датой не должна ронять запуск приложения
+                logger.warning("Карта занятости: пропущен интервал с некорректной датой (car_id=%s, %r - %r)",
+                               car_id, start_date, end_date)
+                continue
+            known.append((rows[car_id], *days, is_rental))
+
+        # Интервалы размечаются разностным массивом: +1 в начале, -1 после конца, затем cumsum
+        if known:
+            row_idx, starts, ends, is_rental = (np.array(column, dtype=np.int64) for column in zip(*known))
+            # Не возвращенный в срок автомобиль занят до возврата, то есть до конца горизонта
+            ends[(is_rental == 1) & (ends <= 0)] = self.horizon_days
+            starts = np.clip(starts, 0, self.horizon_days)
+            ends = np.clip(ends, 0, self.horizon_days)
+            delta = np.zeros((len(cars), self.horizon_days + 1), dtype=np.int32)
+            np.add.at(delta, (row_idx, starts), 1)
+            np.add.at(delta, (row_idx, ends), -1)
+            busy = np.cumsum(delta, axis=1)[:, :-1].astype(np.int8)
+
+        self.origin = origin
+        self.last_seq = last_seq
+        self.car_ids = car_ids
+        self.rows = rows
+        self.daily_rates = np.array([c[1] for c in cars], dtype=np.float64)
+        self.fuel_types = np.array([c[2] for c in cars], dtype=object)
+        self.busy = busy
+
+    def _apply(self, kind, car_id, start_date, end_date, delta):
+        row = self.rows.get(car_id)
+        if row is None:
+            return
+        days = interval_days(start_date, end_date, self.origin)
+        if days is None:
+            # Запись пропускается и при снятии интервала (-1): в карте ее +1 тоже не было
+            logger.warning("Карта занятости: пропущена запись журнала с некорректной датой (%s, car_id=%s, %r - %r)",
+                           kind, car_id, start_date, end_date)
+            return
+        start = min(max(days[0], 0), self.horizon_days)
+        end = min(max(days[1], 0), self.horizon_days)
+        if kind == "rental" and end == 0:
+            # Как в rebuild: просроченная аренда занимает автомобиль до конца горизонта
+            end = self.horizon_days
+        self.busy[row, start:end] += delta
+
+    def refresh(self, conn):
+        """Применить новые записи журнала; перестроить карту, если сменился день,
+        изменился состав или тарифы автомобилей или журнал обрезан дальше прочитанного места"""
+        if self.origin != to_day(str(date.today())):
+            self.rebuild(conn)
+            return
+
+        changes = conn.execute(
+            "SELECT seq, kind, car_id, start_date, end_date, delta FROM AvailabilityLog WHERE seq > ? ORDER BY seq",
+            (self.last_seq,)
+        ).fetchall()
+        if not changes:
+            return
+        if changes[0][0] != self.last_seq + 1 or any(change[1] == "car" for change in changes):
+            self.rebuild(conn)
+            return
+        for seq, kind, car_id, start_date, end_date, delta in changes:
+            self._apply(kind, car_id, start_date, end_date, delta)
+            self.last_seq = seq
+
+    def find_available(self, conn, date_from, date_to, fuel_type=None, max_rate=None):
+        """Идентификаторы автомобилей, свободных во всем окне [date_from, date_to)"""
+        with self._lock:
+            self.refresh(conn)
+            start = to_day(date_from) - self.origin
+            end = to_day(date_to) - self.origin
+            if start < 0 or end > self.horizon_days or start >= end:
+                raise ValueError("Окно поиска вне горизонта карты занятости")
+
+            free = ~self.busy[:, start:end].any(axis=1)
+            if fuel_type is not None:
+                free &= self.fuel_types == fuel_type
+            if max_rate is not None:
+                free &= self.daily_rates <= max_rate
+            return self.car_ids[free].tolist()
+
+
+availability_index = AvailabilityIndex()
@@ -0,0 +1,86 @@
+"""Замер пропускной способности записи: транзакция на операцию против групповой фиксации (writer.py).
+
+    python benchmarks/group_commit.py --operations 5000 --threads 32
+    CAR_RENTAL_SYNCHRONOUS=FULL python benchmarks/group_commit.py   # fsync на каждую фиксацию
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db import ConnectionPool, connect  # noqa: E402
+from migrations import migrate  # noqa: E402
+from writer import GroupCommitWriter  # noqa: E402
+
+
+def insert_customer(i):
+    def operation(conn):
+        return conn.execute(
+            "INSERT INTO Customers (first_name, last_name, email, phone, driver_license) VALUES (?, ?, ?, ?, ?) RETURNING customer_id",
+            ("Bench", f"Customer{i}", f"bench{i}@example.com", "+70000000000", f"DLBENCH{i}")
+        ).fetchone()[0]
+    return operation
+
+
+def write_single(conn, operation):
+    """Отдельная транзакция на операцию прямо на conn - как execute_write без писателя.
+
+    execute_write не используется: при CAR_RENTAL_GROUP_COMMIT=1 он отдал бы
+    операцию глобальному писателю, и базовый замер тоже стал бы групповым.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = operation(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return result
+
+
+def run(operations, threads, submit):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(submit, range(operations)))
+    return operations / (time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер групповой фиксации записей")
+    parser.add_argument("--operations", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("single", "group"):
+            path = os.path.join(tmp, f"{name}.db")
+            conn = connect(path)
+            migrate(conn)
+            conn.close()
+
+            if name == "single":
+                pool = ConnectionPool(path, size=args.threads)
+
+                def submit(i):
+                    with pool.connection() as conn:
+                        return write_single(conn, insert_customer(i))
+
+                rate = run(args.operations, args.threads, submit)
+                pool.close()
+            else:
+                writer = GroupCommitWriter(path)
+                writer.start()
+                rate = run(args.operations, args.threads, lambda i: writer.submit(insert_customer(i)).result())
+                writer.stop()
+                print(f"  пачек: {writer.batches}, в среднем {writer.operations / writer.batches:.1f} операций")
+            print(f"{name}: {rate:.0f} операций/с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
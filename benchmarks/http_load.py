@@ -0,0 +1,194 @@
+"""Нагрузочный замер HTTP API: запускает main.py под uvicorn на сгенерированной базе,
+гоняет сценарии с заданной параллельностью и пишет JSON-отчет (запросы/с и перцентили задержки).
+
+    python benchmarks/http_load.py --cars 2000 --customers 5000 --concurrency 16 --requests 2000
+    python benchmarks/http_load.py --output new.json --compare old.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from generate_data import generate  # noqa: E402
+
+SCENARIOS = ("get_cars", "get_rentals", "stats", "rental_cycle")
+
+
+def start_server(db_path, port):
+    """Запустить приложение под uvicorn и дождаться готовности"""
+    env = dict(os.environ, CAR_RENTAL_DB=str(db_path))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/openapi.json", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        if server.poll() is not None:
+            raise RuntimeError("Сервер завершился при запуске")
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Сервер не запустился за 30 с")
+
+
+def summarize(latencies, errors, elapsed):
+    """Сводка по операции: число запросов, ошибки, запросов в секунду и перцентили задержки в мс"""
+    values = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0,
+        "p50_ms": round(float(p50), 2),
+        "p90_ms": round(float(p90), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(values.max()), 2),
+    }
+
+
+async def run_scenario(client, name, total, concurrency, cars, customers):
+    """Выполнить total итераций сценария в concurrency параллельных потоках; задержки по операциям"""
+    latencies = {}
+    errors = {}
+    counter = iter(range(total))
+
+    async def call(operation, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.status_code == 200 and not (isinstance(body := response.json(), dict) and "error" in body)
+        except (httpx.HTTPError, ValueError):
+            ok, body = False, None
+        latencies.setdefault(operation, []).append(time.perf_counter() - started)
+        if not ok:
+            errors[operation] = errors.get(operation, 0) + 1
+        return body if ok else None
+
+    async def worker(index):
+        # У каждого потока свои автомобили: аренды потоков не конкурируют за одну машину
+        own_cars = cars[index::concurrency] or cars
+        rng = random.Random(index)
+        for i in counter:
+            if name == "get_cars":
+                await call("get_cars", "GET", "/cars/", params={"limit": 100})
+            elif name == "get_rentals":
+                await call("get_rentals", "GET", "/rentals/", params={"limit": 100})
+            elif name == "stats":
+                await call("stats_rentals", "GET", "/stats/rentals")
+                await call("stats_cars", "GET", "/stats/cars")
+            else:
+                today = str(date.today())
+                rental = await call("create_rental", "POST", "/rentals/", params={
+                    "car_id": own_cars[i % len(own_cars)], "customer_id": rng.choice(customers), "rental_date": today,
+                    "planned_return_date": str(date.today() + timedelta(days=3)), "mileage_start": 0
+                })
+                if rental:
+                    await call("return_rental", "POST", f"/rentals/{rental['rental_id']}/return",
+                               params={"return_date": today, "mileage_end": 100})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(k) for k in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {operation: summarize(values, errors.get(operation, 0), elapsed) for operation, values in latencies.items()}
+
+
+async def run_all(base_url, scenarios, total, concurrency, cars, customers):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        results = {}
+        for name in scenarios:
+            print(f"сценарий {name}...", file=sys.stderr)
+            results.update(await run_scenario(client, name, total, concurrency, cars, customers))
+        return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Напечатать изменение запросов/с и p99 относительно прошлого отчета"""
+    print(f"{'операция':<16} {'rps':>10} {'было':>10} {'p99 мс':>10} {'было':>10}")
+    for operation, current in report["results"].items():
+        previous = baseline["results"].get(operation)
+        if previous is None:
+            continue
+        print(f"{operation:<16} {current['rps']:>10} {previous['rps']:>10} {current['p99_ms']:>10} {previous['p99_ms']:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный замер HTTP API проката автомобилей")
+    parser.add_argument("--db", help="Готовая база (по умолчанию генерируется во временном каталоге)")
+    parser.add_argument("--cars", type=int, default=2000)
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--rentals", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=1000, help="Итераций на сценарий")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", default="http_load.json", help="Файл JSON-отчета")
+    parser.add_argument("--compare", help="Прошлый отчет для сравнения")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(args.db) if args.db else Path(tmp) / "load.db"
+        if not args.db:
+            print("генерация базы...", file=sys.stderr)
+            generate(db_path, args.cars, args.customers, args.rentals, args.seed)
+
+        conn = sqlite3.connect(db_path)
+        try:
+            cars = [row[0] for row in conn.execute("SELECT car_id FROM Cars WHERE is_available = 1")]
+            customers = [row[0] for row in conn.execute("SELECT customer_id FROM Customers")]
+            dataset = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ("Cars", "Customers", "Rentals")}
+        finally:
+            conn.close()
+
+        server = start_server(db_path, args.port)
+        try:
+            results = asyncio.run(run_all(f"http://127.0.0.1:{args.port}", args.scenarios, args.requests,
+                                          args.concurrency, cars, customers))
+        finally:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "settings": {"requests": args.requests, "concurrency": args.concurrency, "seed": args.seed},
+        "dataset": dataset,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
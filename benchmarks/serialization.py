@@ -0,0 +1,88 @@
+"""Замер стоимости выборки и сериализации строки списка: кортежи + jsonable_encoder + json
+против фабрики строк (rows.py) + orjson (responses.py).
+
+    python benchmarks/serialization.py --rows 100000
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from migrations import migrate  # noqa: E402
+from responses import FastJSONResponse  # noqa: E402
+from rows import CAR_COLUMNS, car_row  # noqa: E402
+
+
+def tuple_to_dict(c):
+    """Прежнее преобразование строки по индексам"""
+    return {
+        "car_id": c[0],
+        "brand": c[1],
+        "model": c[2],
+        "year": c[3],
+        "color": c[4],
+        "license_plate": c[5],
+        "daily_rate": c[6],
+        "is_available": bool(c[7]),
+        "mileage": c[8],
+        "fuel_type": c[9]
+    }
+
+
+def before(conn):
+    rows = conn.execute(f"SELECT {CAR_COLUMNS} FROM Cars ORDER BY car_id").fetchall()
+    content = jsonable_encoder([tuple_to_dict(c) for c in rows])
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def after(conn):
+    cursor = conn.cursor()
+    cursor.row_factory = car_row
+    rows = cursor.execute(f"SELECT {CAR_COLUMNS} FROM Cars ORDER BY car_id").fetchall()
+    return FastJSONResponse(rows).body
+
+
+def measure(name, func, conn, rows, repeat):
+    best = min(timed(func, conn) for _ in range(repeat))
+    print(f"{name}: {best:.3f} с, {best / rows * 1e6:.2f} мкс на строку")
+    return best
+
+
+def timed(func, conn):
+    started = time.perf_counter()
+    func(conn)
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер сериализации списков")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(":memory:")
+    migrate(conn)
+    conn.executemany(
+        "INSERT INTO Cars (brand, model, year, color, license_plate, daily_rate, mileage, fuel_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        ((f"Марка{i % 50}", f"Модель{i % 300}", 2000 + i % 25, "Белый", f"A{i:07d}", 1000.0 + i % 5000, i * 7 % 200000, "petrol")
+         for i in range(args.rows))
+    )
+    conn.commit()
+
+    if json.loads(before(conn)) != json.loads(after(conn)):
+        print("Ошибка: ответы различаются", file=sys.stderr)
+        return 1
+    old = measure("кортежи + jsonable_encoder + json", before, conn, args.rows, args.repeat)
+    new = measure("фабрика строк + orjson", after, conn, args.rows, args.repeat)
+    print(f"ускорение: {old / new:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
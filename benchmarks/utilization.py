@@ -0,0 +1,63 @@
+"""Замер отчета о загрузке автомобилей (reports.utilization) на сгенерированной базе: суммы дней
+аренд по индексу и точный расчет для автомобилей с пересекающимися арендами, как в GET /stats/utilization.
+Цель - меньше секунды на 100 тысяч автомобилей за 5 лет (параметры по умолчанию).
+
+    python benchmarks/utilization.py
+    python benchmarks/utilization.py --rentals 6000000
+    python benchmarks/utilization.py --db car_rental_generated.db --years 5
+"""
+import argparse
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db import connect  # noqa: E402
+from generate_data import generate  # noqa: E402
+from reports import utilization  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер отчета о загрузке автомобилей")
+    parser.add_argument("--db", help="Готовая база (по умолчанию генерируется во временном каталоге)")
+    parser.add_argument("--cars", type=int, default=100000)
+    parser.add_argument("--customers", type=int, default=200000)
+    parser.add_argument("--rentals", type=int, default=1000000)
+    parser.add_argument("--years", type=int, default=5, help="Глубина истории и ширина окна отчета")
+    parser.add_argument("--today", type=date.fromisoformat, default=date.today(), help="Конец окна отчета")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    date_to = args.today
+    date_from = date_to - timedelta(days=round(365.25 * args.years))
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or str(Path(tmp) / "utilization.db")
+        if not args.db:
+            print("генерация базы...", file=sys.stderr)
+            generate(db_path, args.cars, args.customers, args.rentals, args.seed, args.years, date_to)
+
+        conn = connect(db_path, read_only=True)
+        try:
+            cars, rentals, overlapping = (conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                                          for table in ("Cars", "Rentals", "RentalOverlaps"))
+            print(f"{cars} автомобилей ({overlapping} с пересекающимися арендами), {rentals} аренд, "
+                  f"окно {date_from} - {date_to}")
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                report = utilization(conn, str(date_from), str(date_to), least_first=True)
+                timings.append(time.perf_counter() - started)
+        finally:
+            conn.close()
+
+    average = sum(row["utilization"] for row in report) / len(report) if report else 0
+    print(f"лучшее время: {min(timings):.3f} с, средняя загрузка {average:.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import json
+import sqlite3
+
+# Максимальное число записей в одном запросе массовой загрузки
+MAX_BULK_SIZE = 10000
+
+
+def integrity_error_message(error):
+    """Понятное описание ошибки целостности (например, дубликата уникального поля)"""
+    text = str(error)
+    if text.startswith("UNIQUE constraint failed:"):
+        fields = [name.strip().split(".")[-1] for name in text.split(":", 1)[1].split(",")]
+        return f"Запись с таким значением поля {', '.join(fields)} уже существует"
+    return f"Ошибка целостности данных: {text}"
+
+
+def existing_ids(conn, table, id_field, ids):
+    """Множество идентификаторов из ids, которые есть в таблице (одним запросом)"""
+    rows = conn.execute(
+        f"SELECT {id_field} FROM {table} WHERE {id_field} IN (SELECT value FROM json_each(?))",
+        (json.dumps(sorted(set(ids))),)
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def bulk_insert(conn, table, id_field, columns, rows, rejected=None):
+    """Вставить строки одной транзакцией через executemany.
+
+    rows - список кортежей значений, rejected - {индекс: ошибка} для строк,
+    отклоненных заранее. Ошибка целостности в одной строке не отменяет
+    остальные: пачка повторяется построчно с точками сохранения.
+    Возвращает результат по каждой строке в исходном порядке.
+    """
+    rejected = rejected or {}
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    pending = [(index, row) for index, row in enumerate(rows) if index not in rejected]
+    results = {index: {"index": index, "error": error} for index, error in rejected.items()}
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("SAVEPOINT bulk")
+        try:
+            conn.executemany(sql, [row for _, row in pending])
+            # Под блокировкой записи AUTOINCREMENT выдает идентификаторы подряд
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            first_id = last_id - len(pending) + 1
+            for offset, (index, _) in enumerate(pending):
+                results[index] = {"index": index, id_field: first_id + offset}
+            conn.execute("RELEASE bulk")
+        except sqlite3.IntegrityError:
+            conn.execute("ROLLBACK TO bulk")
+            conn.execute("RELEASE bulk")
+            for index, row in pending:
+                conn.execute("SAVEPOINT item")
+                try:
+                    cursor = conn.execute(sql, row)
+                    results[index] = {"index": index, id_field: cursor.lastrowid}
+                    conn.execute("RELEASE item")
+                except sqlite3.IntegrityError as e:
+                    conn.execute("ROLLBACK TO item")
+                    conn.execute("RELEASE item")
+                    results[index] = {"index": index, "error": integrity_error_message(e)}
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    ordered = [results[index] for index in range(len(rows))]
+    failed = sum(1 for item in ordered if "error" in item)
+    return {"inserted": len(rows) - failed, "failed": failed, "results": ordered}
@@ -0,0 +1,66 @@
+import threading
+
+
+def table_versions(conn, *tables):
+    """Текущие версии записи таблиц (увеличиваются триггерами при каждом изменении)"""
+    placeholders = ", ".join("?" * len(tables))
+    rows = conn.execute(
+        f"SELECT table_name, version FROM TableVersions WHERE table_name IN ({placeholders})",
+        tables
+    ).fetchall()
+    versions = dict(rows)
+    return tuple(versions.get(table, 0) for table in tables)
+
+
+def make_etag(name, versions):
+    """Слабый ETag ответа, зависящий только от версий исходных таблиц"""
+    return f'W/"{name}-{"-".join(str(v) for v in versions)}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Проверить заголовок If-None-Match (список ETag или *) по правилам слабого сравнения"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+
+class VersionedCache:
+    """Кэш результатов в памяти процесса, действительный до изменения исходных таблиц"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, versions, compute):
+        """Вернуть значение из кэша, если версии таблиц не изменились, иначе пересчитать.
+
+        Версии нужно читать до вычисления: тогда запись, случившаяся во время
+        расчета, только сделает кэш устаревшим, но не спрячет изменения.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == versions:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = (versions, value)
+        return value
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0,
+            "entries": len(self._entries)
+        }
+
+
+cache = VersionedCache()
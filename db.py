@@ -0,0 +1,143 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter
+
+from metrics import METRICS_ENABLED, TimedConnection, pool_wait
+
+# Настройки базы данных (можно переопределить переменными окружения)
+DB_PATH = os.environ.get("CAR_RENTAL_DB", "car_rental.db")
+POOL_SIZE = int(os.environ.get("CAR_RENTAL_POOL_SIZE", "8"))
+READ_POOL_SIZE = int(os.environ.get("CAR_RENTAL_READ_POOL_SIZE", "16"))
+POOL_TIMEOUT = float(os.environ.get("CAR_RENTAL_POOL_TIMEOUT", "30"))
+SYNCHRONOUS = os.environ.get("CAR_RENTAL_SYNCHRONOUS", "NORMAL")
+BUSY_TIMEOUT_MS = int(os.environ.get("CAR_RENTAL_BUSY_TIMEOUT_MS", "5000"))
+CACHE_SIZE_KB = int(os.environ.get("CAR_RENTAL_CACHE_SIZE_KB", "65536"))
+MMAP_SIZE = int(os.environ.get("CAR_RENTAL_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+
+def connect(path=DB_PATH, read_only=False, timed=True):
+    """Открыть соединение с базой и применить настройки PRAGMA.
+
+    Соединение только для чтения открывается с mode=ro и query_only: в режиме WAL
+    читатели работают со своим снимком и не блокируют запись. При включенных
+    метриках время каждого выражения учитывает TimedConnection; timed=False -
+    для служебных соединений (миграции при запуске, загрузчик, генератор).
+    """
+    factory = TimedConnection if METRICS_ENABLED and timed else sqlite3.Connection
+    if read_only:
+        uri = f"file:{Path(path).resolve().as_posix()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False, factory=factory)
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False, factory=factory)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA synchronous = {SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+def is_busy(error):
+    """Ошибка SQLite из-за занятой базы: SQLITE_BUSY или SQLITE_LOCKED (в том числе расширенные коды)"""
+    code = getattr(error, "sqlite_errorcode", None)
+    return code is not None and (code & 0xFF) in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+
+class ConnectionPool:
+    """Ограниченный пул соединений с SQLite"""
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE, timeout=POOL_TIMEOUT, read_only=False):
+        self.path = path
+        self.size = size
+        self.read_only = read_only
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._wait = pool_wait.labels("read" if read_only else "write")
+
+    def acquire(self):
+        """Взять соединение из пула (при необходимости открыть новое)"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+
+        if can_create:
+            try:
+                return connect(self.path, self.read_only)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError("Нет свободных соединений с базой данных")
+
+    def release(self, conn):
+        """Вернуть соединение в пул, откатив незавершенную транзакцию"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Соединение испорчено - закрываем его и освобождаем место в пуле
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Контекстный менеджер: соединение возвращается в пул при выходе"""
+        started = perf_counter()
+        conn = self.acquire()
+        self._wait.observe(perf_counter() - started)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        """Размер пула, открытые и свободные соединения"""
+        return {"size": self.size, "open": self._created, "idle": self._idle.qsize()}
+
+    def close(self):
+        """Закрыть все свободные соединения"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+pool = ConnectionPool()
+read_pool = ConnectionPool(size=READ_POOL_SIZE, read_only=True)
+
+
+def get_db():
+    """Зависимость FastAPI: соединение из пула на время обработки запроса"""
+    with pool.connection() as conn:
+        yield conn
+
+
+def get_read_db():
+    """Зависимость FastAPI для GET-запросов: соединение только для чтения"""
+    with read_pool.connection() as conn:
+        yield conn
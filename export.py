@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+
+from fastapi.responses import StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен, без него работает стандартный json
+    orjson = None
+
+# Сколько строк читается из курсора за один шаг
+CHUNK_SIZE = 1000
+
+# Поддерживаемые форматы выгрузки и их MIME-типы
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _ndjson_chunks(cursor):
+    """Выдавать строки курсора пачками в формате NDJSON"""
+    while True:
+        rows = cursor.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+        if orjson is not None:
+            yield b"".join(orjson.dumps(row) + b"\n" for row in rows)
+        else:
+            yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+
+
+def _csv_value(value):
+    """Значение ячейки CSV: логические значения пишутся как в JSON (true/false), а не True/False"""
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    return value
+
+
+def _csv_chunks(cursor, columns):
+    """Выдавать строки курсора пачками в формате CSV (первой строкой - заголовок)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    while True:
+        rows = cursor.fetchmany(CHUNK_SIZE)
+        for row in rows:
+            writer.writerow([_csv_value(value) for value in row.values()])
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if not rows:
+            break
+
+
+def stream_rows(conn, query, params, row_factory, columns, fmt, filename, headers=None):
+    """Выполнить запрос и отдавать результат потоком, не загружая его в память целиком.
+
+    row_factory превращает строку курсора в словарь ответа (см. rows.py).
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = row_factory
+    cursor.execute(query, params)
+
+    headers = dict(headers or {})
+    if fmt == "csv":
+        body = _csv_chunks(cursor, columns)
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    else:
+        body = _ndjson_chunks(cursor)
+
+    return StreamingResponse(body, media_type=EXPORT_FORMATS[fmt], headers=headers)
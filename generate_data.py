@@ -0,0 +1,344 @@
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from db import connect
+from loader import Progress
+from migrations import migrate
+from overdue import scan_overdue
+from pricing import rental_costs
+
+# Марки: модели и базовая дневная ставка
+BRANDS = {
+    "Lada": (["Vesta", "Granta", "Niva", "Largus"], 1200),
+    "Hyundai": (["Solaris", "Creta", "Tucson", "Elantra"], 1800),
+    "Kia": (["Rio", "Sportage", "Ceed", "K5"], 1900),
+    "Skoda": (["Octavia", "Rapid", "Kodiaq"], 2100),
+    "Volkswagen": (["Polo", "Tiguan", "Passat"], 2200),
+    "Honda": (["Civic", "CR-V", "Accord"], 2300),
+    "Toyota": (["Camry", "Corolla", "RAV4", "Land Cruiser"], 2500),
+    "Mercedes-Benz": (["C-Class", "E-Class", "GLC"], 4800),
+    "BMW": (["3 Series", "5 Series", "X5"], 5500),
+}
+COLORS = ["White", "Black", "Silver", "Gray", "Blue", "Red", "Green"]
+FUEL_TYPES = ["petrol", "diesel", "hybrid", "electric"]
+FUEL_WEIGHTS = [0.7, 0.18, 0.08, 0.04]
+
+FIRST_NAMES = [("Иван", "ivan"), ("Мария", "maria"), ("Алексей", "aleksey"), ("Елена", "elena"), ("Дмитрий", "dmitry"),
+               ("Анна", "anna"), ("Сергей", "sergey"), ("Ольга", "olga"), ("Андрей", "andrey"), ("Наталья", "natalya"),
+               ("Михаил", "mikhail"), ("Татьяна", "tatyana"), ("Николай", "nikolay"), ("Ирина", "irina")]
+LAST_NAMES = [("Петров", "petrov"), ("Сидоров", "sidorov"), ("Кузнецов", "kuznetsov"), ("Васильев", "vasilev"),
+              ("Смирнов", "smirnov"), ("Иванов", "ivanov"), ("Попов", "popov"), ("Соколов", "sokolov"),
+              ("Лебедев", "lebedev"), ("Козлов", "kozlov"), ("Новиков", "novikov"), ("Морозов", "morozov")]
+EMAIL_DOMAINS = ["mail.ru", "gmail.com", "yandex.ru"]
+CITIES = ["Москва", "Санкт-Петербург", "Казань", "Екатеринбург", "Новосибирск"]
+STREETS = ["ул. Ленина", "ул. Пушкина", "пр. Мира", "ул. Гагарина", "ул. Советская", "ул. Садовая"]
+
+MAINTENANCE_TYPES = [
+    ("Регулярное ТО", "Плановое техническое обслуживание", 5000, 12000),
+    ("Техническое обслуживание", "Замена масла, фильтров", 6000, 10000),
+    ("Ремонт", "Замена тормозных колодок", 8000, 20000),
+    ("Замена шин", "Сезонная замена шин", 3000, 6000),
+]
+
+# Буквы, допустимые в госномерах и сериях водительских удостоверений
+PLATE_LETTERS = "АВЕКМНОРСТУХ"
+REGIONS = ["77", "97", "99", "177", "197", "199", "777", "799", "50", "90", "150", "190", "750", "78", "98", "178", "16", "66", "54", "23"]
+
+# Верхняя граница длительности одной аренды в днях
+MAX_RENTAL_DAYS = 30
+# Строк аренд на один проход генерации (определяет пиковую память)
+RENTALS_PER_CHUNK = 1_000_000
+CUSTOMERS_PER_CHUNK = 500_000
+# Кэш страниц на время построения индексов и число строк выборки для ANALYZE
+BUILD_CACHE_SIZE_KB = 1024 * 1024
+ANALYSIS_LIMIT = 2000
+
+
+class GenerateError(Exception):
+    pass
+
+
+def date_strings(days):
+    """Номера дней (от 1970-01-01) в список строк YYYY-MM-DD"""
+    return np.asarray(days, dtype="datetime64[D]").astype(str).tolist()
+
+
+def plate(i):
+    """Уникальный госномер по порядковому номеру: А001АА77, А002АА77, ..."""
+    number, i = i % 999 + 1, i // 999
+    letters = ""
+    for _ in range(3):
+        letters += PLATE_LETTERS[i % len(PLATE_LETTERS)]
+        i //= len(PLATE_LETTERS)
+    return f"{letters[0]}{number:03d}{letters[1:]}{REGIONS[i % len(REGIONS)]}"
+
+
+def generate_cars(rng, count, last_year):
+    """Столбцы автомобилей: марка, модель, год, цвет, номер, ставка, топливо"""
+    names = list(BRANDS)
+    brand_index = rng.integers(0, len(names), count)
+    model_choice = rng.random(count)
+    years = rng.integers(2012, last_year + 1, count)
+    # Ставка растет с классом марки и годом выпуска, округлена до 100
+    base = np.array([BRANDS[name][1] for name in names])[brand_index]
+    rates = np.round(base * (1 + 0.04 * (years - 2012)) * rng.uniform(0.9, 1.1, count), -2)
+    brands = [names[b] for b in brand_index.tolist()]
+    models = [BRANDS[name][0][int(u * len(BRANDS[name][0]))] for name, u in zip(brands, model_choice.tolist())]
+    colors = rng.choice(COLORS, count).tolist()
+    fuels = rng.choice(FUEL_TYPES, count, p=FUEL_WEIGHTS).tolist()
+    return brands, models, years.tolist(), colors, rates, fuels
+
+
+def plan_rentals(rng, counts, first_day, last_day, mean_days):
+    """Непересекающиеся аренды группы автомобилей в окне [first_day, last_day] (номера дней).
+
+    Длительность - геометрическое распределение со средним mean_days; свободные дни окна
+    делятся случайными долями между промежутками перед арендами и хвостом после последней,
+    поэтому аренды одного автомобиля идут подряд без наложений. Возвращает
+    (индекс автомобиля в группе, начало, конец) для аренд в порядке автомобилей и времени.
+    """
+    window = last_day - first_day
+    if (counts > window).any():
+        raise GenerateError("Слишком много аренд на автомобиль для окна дат (увеличьте --years)")
+    cars = len(counts)
+    car_index = np.repeat(np.arange(cars), counts)
+    durations = np.minimum(rng.geometric(1 / mean_days, len(car_index)), MAX_RENTAL_DAYS)
+
+    busy = np.bincount(car_index, durations, minlength=cars).astype(np.int64)
+    over = busy > window
+    if over.any():
+        # Аренды не помещаются в окно - пропорционально сжимаем их длительность
+        scale = np.where(over, (window - counts) / np.maximum(busy - counts, 1), 1.0)
+        durations = 1 + np.floor((durations - 1) * scale[car_index]).astype(np.int64)
+        busy = np.bincount(car_index, durations, minlength=cars).astype(np.int64)
+
+    weights = rng.exponential(size=len(car_index))
+    total = np.bincount(car_index, weights, minlength=cars) + rng.exponential(size=cars)
+    gaps = np.floor(weights / total[car_index] * (window - busy)[car_index]).astype(np.int64)
+
+    # Накопленная сумма внутри каждого автомобиля: общая сумма минус сумма до его первой аренды
+    ends = np.cumsum(gaps + durations)
+    before = np.concatenate(([0], ends))[np.cumsum(counts) - counts]
+    ends = ends - np.repeat(before, counts) + first_day
+    return car_index, ends - durations, ends
+
+
+def generate_customers(conn, rng, count):
+    progress = Progress("Customers")
+    for first in range(0, count, CUSTOMERS_PER_CHUNK):
+        size = min(CUSTOMERS_PER_CHUNK, count - first)
+        first_names = rng.integers(0, len(FIRST_NAMES), size).tolist()
+        last_names = rng.integers(0, len(LAST_NAMES), size).tolist()
+        domains = rng.integers(0, len(EMAIL_DOMAINS), size).tolist()
+        cities = rng.integers(0, len(CITIES), size).tolist()
+        streets = rng.integers(0, len(STREETS), size).tolist()
+        houses = rng.integers(1, 120, size).tolist()
+        regions = rng.integers(10, 100, size).tolist()
+        rows = []
+        for k in range(size):
+            i = first + k
+            name, name_latin = FIRST_NAMES[first_names[k]]
+            last, last_latin = LAST_NAMES[last_names[k]]
+            # Женские фамилии для женских имен
+            if name_latin.endswith("a"):
+                last += "а"
+            series = PLATE_LETTERS[i // 1_000_000 % 12] + PLATE_LETTERS[i // 12_000_000 % 12]
+            rows.append((
+                i + 1, name, last, f"{name_latin}.{last_latin}{i + 1}@{EMAIL_DOMAINS[domains[k]]}",
+                # Множитель 7919 взаимно прост с 10^9 - номера телефонов не повторяются
+                f"+79{(i * 7919 + 160000000) % 1_000_000_000:09d}",
+                f"{regions[k]}{series}{i % 1_000_000:06d}",
+                f"{CITIES[cities[k]]}, {STREETS[streets[k]]}, д. {houses[k]}",
+            ))
+        conn.executemany(
+            "INSERT INTO Customers (customer_id, first_name, last_name, email, phone, driver_license, address) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        conn.commit()
+        progress.add(size)
+    return progress
+
+
+def generate_fleet(conn, rng, cars, customers, rentals, first_day, last_day, mean_days, active_share, overdue_share,
+                   maintenance_per_year):
+    """Автомобили, их аренды и обслуживание - группами автомобилей, чтобы память не росла с объемом"""
+    progress = Progress("Cars, Rentals, Maintenance")
+    # Популярность автомобилей неодинакова: доля аренд из гамма-распределения
+    popularity = rng.gamma(4.0, size=cars)
+    counts_all = rng.multinomial(rentals, popularity / popularity.sum()) if cars else np.zeros(0, dtype=np.int64)
+    chunk = max(1, RENTALS_PER_CHUNK * cars // max(rentals, 1))
+    years = (last_day - first_day) / 365.25
+    last_year = int(np.datetime64(last_day, "D").astype("datetime64[Y]").astype(int)) + 1970
+    rental_id = 1
+    maintenance_id = 1
+
+    for first in range(0, cars, chunk):
+        counts = counts_all[first:first + chunk]
+        size = len(counts)
+        brands, models, car_years, colors, rates, fuels = generate_cars(rng, size, last_year)
+        car_index, starts, ends = plan_rentals(rng, counts, first_day, last_day, mean_days)
+        durations = ends - starts
+        total = len(car_index)
+        last = np.cumsum(counts)[counts > 0] - 1
+
+        # Последняя аренда части автомобилей еще не закрыта: в срок или уже просрочена
+        status_draw = rng.random(len(last))
+        overdue = last[status_draw < overdue_share]
+        on_time = last[(status_draw >= overdue_share) & (status_draw < overdue_share + active_share)]
+        starts[on_time] = np.maximum(starts[on_time], last_day - rng.integers(0, durations[on_time]))
+        starts[overdue] = np.maximum(starts[overdue], last_day - durations[overdue] - rng.integers(1, 15, len(overdue)))
+        active = np.zeros(total, dtype=bool)
+        active[on_time] = True
+        active[overdue] = True
+
+        # Закрытые аренды: возврат раньше или позже планового срока на пару дней
+        shift = rng.choice([-2, -1, 0, 0, 0, 0, 0, 0, 1, 2], total)
+        planned = np.where(active, starts + durations, np.maximum(ends + shift, starts + 1))
+        _, costs = rental_costs(starts, ends, planned, rates[car_index])
+
+        # Пробег: накопленный километраж внутри автомобиля поверх начального
+        start_mileage = rng.integers(0, 40000, size)
+        distance = durations * rng.integers(60, 400, total)
+        driven = np.cumsum(distance)
+        driven = driven - np.repeat(np.concatenate(([0], driven))[np.cumsum(counts) - counts], counts)
+        mileage_end = start_mileage[car_index] + driven
+        mileage_start = mileage_end - distance
+        mileage = start_mileage + np.bincount(car_index, np.where(active, 0, distance), minlength=size).astype(np.int64)
+        is_available = np.ones(size, dtype=np.int64)
+        is_available[car_index[active]] = 0
+
+        car_ids = range(first + 1, first + size + 1)
+        conn.executemany(
+            "INSERT INTO Cars (car_id, brand, model, year, color, license_plate, daily_rate, is_available, mileage, fuel_type) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            zip(car_ids, brands, models, car_years, colors, map(plate, range(first, first + size)), rates.tolist(),
+                is_available.tolist(), mileage.tolist(), fuels)
+        )
+
+        active_rows = active.tolist()
+        return_dates = date_strings(ends)
+        conn.executemany(
+            "INSERT INTO Rentals (rental_id, car_id, customer_id, rental_date, return_date, planned_return_date, total_cost, "
+            "mileage_start, mileage_end, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (rental_id + k, car_id, customer_id, rental_date, None, planned_date, None, m_start, None, "active")
+                if is_active else
+                (rental_id + k, car_id, customer_id, rental_date, return_date, planned_date, cost, m_start, m_end, "completed")
+                for k, (is_active, car_id, customer_id, rental_date, return_date, planned_date, cost, m_start, m_end)
+                in enumerate(zip(active_rows, (car_index + first + 1).tolist(), rng.integers(1, customers + 1, total).tolist(),
+                                 date_strings(starts), return_dates, date_strings(planned), np.round(costs, 2).tolist(),
+                                 mileage_start.tolist(), mileage_end.tolist()))
+            )
+        )
+        rental_id += total
+
+        # Обслуживание: в среднем maintenance_per_year раз в год, пробег - по доле прошедшего окна
+        visits = rng.poisson(maintenance_per_year * years, size)
+        owner = np.repeat(np.arange(size), visits)
+        days = rng.integers(first_day, last_day, len(owner))
+        order = np.lexsort((days, owner))
+        owner, days = owner[order], days[order]
+        fraction = (days - first_day) / max(last_day - first_day, 1)
+        visit_mileage = (start_mileage[owner] + fraction * (mileage - start_mileage)[owner]).astype(np.int64)
+        kinds = rng.integers(0, len(MAINTENANCE_TYPES), len(owner))
+        spread = rng.random(len(owner))
+        conn.executemany(
+            "INSERT INTO Maintenance (maintenance_id, car_id, maintenance_date, maintenance_type, description, cost, mileage) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (maintenance_id + k, car, day, MAINTENANCE_TYPES[kind][0], MAINTENANCE_TYPES[kind][1],
+                 float(round(MAINTENANCE_TYPES[kind][2] + u * (MAINTENANCE_TYPES[kind][3] - MAINTENANCE_TYPES[kind][2]), -2)), m)
+                for k, (car, day, kind, u, m) in enumerate(zip((owner + first + 1).tolist(), date_strings(days), kinds.tolist(),
+                                                               spread.tolist(), visit_mileage.tolist()))
+            )
+        )
+        maintenance_id += len(owner)
+        conn.commit()
+        progress.add(size + total + len(owner))
+
+    return progress
+
+
+def generate(db_path, cars, customers, rentals, seed=42, years=5, today=None, mean_days=4, active_share=0.2,
+             overdue_share=0.03, maintenance_per_year=2):
+    """Создать новую базу и заполнить ее синтетическими данными; вернуть строки сводки.
+
+    Одинаковые seed, today и размеры дают одинаковую базу. Данные пишутся в
+    таблицы без индексов и триггеров (схема версии 1), затем применяются
+    остальные миграции: они строят индексы и заполняют производные таблицы
+    одним проходом вместо построчной работы триггеров.
+    """
+    path = Path(db_path)
+    if path.exists():
+        raise GenerateError(f"Файл {path} уже существует (укажите --force для перезаписи)")
+    if customers < 1 and rentals:
+        raise GenerateError("Для аренд нужен хотя бы один клиент")
+    today = today or date.today()
+    last_day = (today - date(1970, 1, 1)).days
+    first_day = ((today - timedelta(days=round(365.25 * years))) - date(1970, 1, 1)).days
+    rng = np.random.default_rng(seed)
+
+    conn = connect(path, timed=False)
+    try:
+        migrate(conn, target=1)
+        # База создается заново - при сбое ее проще сгенерировать еще раз, fsync не нужен
+        conn.execute("PRAGMA synchronous = OFF")
+        # Индексы строятся сортировкой: большой кэш и параллельная сортировка; ANALYZE по выборке
+        conn.execute(f"PRAGMA cache_size = -{BUILD_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA threads = {min(os.cpu_count() or 1, 8)}")
+        conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+        summaries = [generate_customers(conn, rng, customers).summary()]
+        summaries.append(generate_fleet(conn, rng, cars, customers, rentals, first_day, last_day, mean_days,
+                                        active_share, overdue_share, maintenance_per_year).summary())
+
+        started = time.perf_counter()
+        applied = migrate(conn)
+        scan_overdue(conn, str(today))
+        summaries.append(f"Миграции {applied[0]}-{applied[-1]} (индексы и производные таблицы): "
+                         f"{time.perf_counter() - started:.2f} с")
+        return summaries
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Генерация синтетической базы проката автомобилей")
+    parser.add_argument("--db", default="car_rental_generated.db", help="Путь к создаваемой базе")
+    parser.add_argument("--cars", type=int, default=1000)
+    parser.add_argument("--customers", type=int, default=10000)
+    parser.add_argument("--rentals", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--years", type=float, default=5, help="Глубина истории аренд в годах")
+    parser.add_argument("--today", type=date.fromisoformat, help="Дата, на которую строится база (по умолчанию сегодня)")
+    parser.add_argument("--mean-days", type=float, default=4, help="Средняя длительность аренды в днях")
+    parser.add_argument("--active-share", type=float, default=0.2, help="Доля автомобилей с открытой арендой в срок")
+    parser.add_argument("--overdue-share", type=float, default=0.03, help="Доля автомобилей с просроченной арендой")
+    parser.add_argument("--maintenance-per-year", type=float, default=2)
+    parser.add_argument("--force", action="store_true", help="Перезаписать существующий файл базы")
+    args = parser.parse_args(argv)
+
+    if args.force:
+        for suffix in ("", "-wal", "-shm"):
+            Path(args.db + suffix).unlink(missing_ok=True)
+    started = time.perf_counter()
+    try:
+        summaries = generate(args.db, args.cars, args.customers, args.rentals, args.seed, args.years, args.today,
+                             args.mean_days, args.active_share, args.overdue_share, args.maintenance_per_year)
+    except (GenerateError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    for line in summaries:
+        print(line)
+    print(f"Всего: {time.perf_counter() - started:.2f} с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+import argparse
+import csv
+import json
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from bulk import existing_ids
+from db import DB_PATH, connect
+from migrations import migrate, restore_schema
+
+# Таблицы в порядке загрузки: сначала те, на которые ссылаются внешние ключи
+TABLE_ORDER = ["Cars", "Customers", "Rentals", "Maintenance"]
+
+# Внешние ключи: таблица -> [(столбец, родительская таблица, ключ родителя)]
+FOREIGN_KEYS = {
+    "Rentals": [("car_id", "Cars", "car_id"), ("customer_id", "Customers", "customer_id")],
+    "Maintenance": [("car_id", "Cars", "car_id")],
+}
+
+DEFAULT_BATCH_SIZE = 50000
+
+# Не чаще раза в столько секунд печатается прогресс (SQL-дамп может состоять из INSERT по одной строке)
+PROGRESS_INTERVAL = 1.0
+
+INSERT_RE = re.compile(r"^\s*INSERT\s+(?:OR\s+\w+\s+)?INTO\s+[\"`\[]?(\w+)", re.IGNORECASE)
+
+
+class LoadError(Exception):
+    pass
+
+
+class Progress:
+    """Вывод прогресса загрузки: строк всего и строк в секунду"""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.skipped = 0
+        self.started = time.perf_counter()
+        self.reported = self.started
+
+    def add(self, rows, skipped=0):
+        self.rows += rows
+        self.skipped += skipped
+        now = time.perf_counter()
+        if now - self.reported < PROGRESS_INTERVAL:
+            return
+        self.reported = now
+        elapsed = now - self.started
+        rate = self.rows / elapsed if elapsed > 0 else 0
+        print(f"  {self.name}: {self.rows} строк, {rate:.0f} строк/с", file=sys.stderr)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.rows / elapsed if elapsed > 0 else 0
+        line = f"{self.name}: загружено {self.rows} строк за {elapsed:.2f} с ({rate:.0f} строк/с)"
+        if self.skipped:
+            line += f", пропущено {self.skipped}"
+        return line
+
+
+def detect_table(path, table=None):
+    """Определить таблицу по параметру --table или по имени файла"""
+    name = table or path.stem
+    for known in TABLE_ORDER:
+        if known.lower() == name.lower():
+            return known
+    raise LoadError(f"Не удалось определить таблицу для файла {path} (укажите --table)")
+
+
+def read_records(path):
+    """Прочитать записи из CSV, JSON или NDJSON файла как словари"""
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.DictReader(f)
+    elif suffix in (".ndjson", ".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif suffix == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise LoadError(f"{path}: ожидается JSON-массив объектов")
+        yield from data
+    else:
+        raise LoadError(f"Неподдерживаемый формат файла: {path}")
+
+
+def read_sql_statements(path):
+    """Выделить INSERT-выражения из SQL-файла; прочие строки (подписи, комментарии) пропускаются"""
+    buffer = ""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if buffer or INSERT_RE.match(line):
+                buffer += line
+                if sqlite3.complete_statement(buffer):
+                    yield buffer
+                    buffer = ""
+    if buffer.strip():
+        raise LoadError(f"{path}: незавершенное SQL-выражение")
+
+
+def batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def table_columns(conn, table):
+    """Столбцы таблицы: имя -> признак NOT NULL"""
+    return {row[1]: bool(row[3]) for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def drop_schema(conn, tables):
+    """Снять вторичные индексы и построчные триггеры таблиц на время загрузки; вернуть их имена.
+
+    Триггеры (версии таблиц, журнал занятости, RentalStats, RevenueDaily, поиск
+    клиентов, просрочки) иначе срабатывали бы на каждую загружаемую строку;
+    их данные пересчитываются один раз в restore_schema. Определения пишутся
+    в DroppedSchema в одной транзакции с удалением: если процесс прервется
+    до rebuild_schema, migrate() вернет индексы и триггеры при следующем запуске.
+    """
+    placeholders = ", ".join("?" * len(tables))
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        objects = conn.execute(
+            f"SELECT name, type, tbl_name, sql FROM sqlite_master "
+            f"WHERE type IN ('index', 'trigger') AND sql IS NOT NULL AND tbl_name IN ({placeholders})",
+            tables
+        ).fetchall()
+        conn.executemany("INSERT OR REPLACE INTO DroppedSchema (name, type, tbl_name, sql) VALUES (?, ?, ?, ?)", objects)
+        for name, kind, _, _ in objects:
+            conn.execute(f'DROP {kind.upper()} "{name}"')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return [name for name, _, _, _ in objects]
+
+
+def rebuild_schema(conn):
+    """Вернуть снятые индексы и триггеры после загрузки и обновить статистику планировщика"""
+    restore_schema(conn)
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def load_records(conn, path, table, batch_size, skip_duplicates):
+    """Загрузить CSV/JSON файл пачками с проверкой внешних ключей для каждой пачки"""
+    columns_info = table_columns(conn, table)
+    progress = Progress(f"{path.name} -> {table}")
+    columns = None
+    sql = None
+
+    for batch in batches(read_records(path), batch_size):
+        if columns is None:
+            columns = list(batch[0].keys())
+            unknown = [c for c in columns if c not in columns_info]
+            if unknown:
+                raise LoadError(f"{path}: неизвестные столбцы таблицы {table}: {', '.join(unknown)}")
+            verb = "INSERT OR IGNORE" if skip_duplicates else "INSERT"
+            sql = f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+        rows = []
+        for record in batch:
+            # Пустые значения из CSV превращаем в NULL там, где это допустимо
+            rows.append(tuple(
+                None if record.get(c) == "" and not columns_info[c] else record.get(c)
+                for c in columns
+            ))
+
+        # Массовая проверка внешних ключей: один запрос на каждую ссылку в пачке
+        valid = [True] * len(rows)
+        for column, parent, parent_key in FOREIGN_KEYS.get(table, []):
+            if column not in columns:
+                continue
+            position = columns.index(column)
+            values = [int(row[position]) for row in rows if row[position] is not None]
+            known = existing_ids(conn, parent, parent_key, values)
+            for i, row in enumerate(rows):
+                if row[position] is None or int(row[position]) not in known:
+                    valid[i] = False
+        good_rows = [row for row, ok in zip(rows, valid) if ok]
+
+        try:
+            conn.executemany(sql, good_rows)
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            raise LoadError(f"{path}: ошибка загрузки пачки: {e}")
+        progress.add(len(good_rows), len(rows) - len(good_rows))
+
+    return progress
+
+
+def load_sql(conn, path):
+    """Выполнить INSERT-выражения из SQL-файла одной транзакцией"""
+    progress = Progress(path.name)
+    tables = set()
+    try:
+        for statement in read_sql_statements(path):
+            cursor = conn.execute(statement)
+            tables.add(INSERT_RE.match(statement).group(1))
+            progress.add(cursor.rowcount)
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        raise LoadError(f"{path}: ошибка выполнения SQL: {e}")
+
+    # Проверка ссылочной целостности загруженных строк одним проходом
+    for table in tables:
+        violations = conn.execute(f"PRAGMA foreign_key_check({table})").fetchall()
+        if violations:
+            print(f"  Внимание: {table}: {len(violations)} строк с неверными внешними ключами", file=sys.stderr)
+    return progress
+
+
+def load_files(db_path, files, table=None, batch_size=DEFAULT_BATCH_SIZE, skip_duplicates=False):
+    """Загрузить файлы в базу: индексы и триггеры снимаются на время загрузки и возвращаются один раз после нее"""
+    conn = connect(db_path, timed=False)
+    try:
+        migrate(conn)
+        # Загрузка офлайн - жертвуем надежностью fsync ради скорости
+        conn.execute("PRAGMA synchronous = OFF")
+
+        # SQL-файлы идут первыми: они сами задают порядок таблиц (как test_data.txt)
+        jobs = []
+        for path in map(Path, files):
+            if not path.is_file():
+                raise LoadError(f"Файл не найден: {path}")
+            if path.suffix.lower() in (".sql", ".txt"):
+                jobs.append((-1, path, None))
+            else:
+                target = detect_table(path, table)
+                jobs.append((TABLE_ORDER.index(target), path, target))
+        jobs.sort(key=lambda job: job[0])
+
+        drop_schema(conn, TABLE_ORDER)
+        summaries = []
+        try:
+            for _, path, target in jobs:
+                if target is None:
+                    summaries.append(load_sql(conn, path).summary())
+                else:
+                    summaries.append(load_records(conn, path, target, batch_size, skip_duplicates).summary())
+        finally:
+            rebuild_schema(conn)
+        return summaries
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Загрузка данных в базу проката автомобилей")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    load = subparsers.add_parser("load", help="Загрузить CSV/JSON/NDJSON/SQL файлы")
+    load.add_argument("files", nargs="+", help="Файлы для загрузки (cars.csv, rentals.json, test_data.txt, ...)")
+    load.add_argument("--db", default=DB_PATH, help="Путь к файлу базы данных")
+    load.add_argument("--table", help="Таблица для всех CSV/JSON файлов (по умолчанию - по имени файла)")
+    load.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Строк в одной транзакции")
+    load.add_argument("--skip-duplicates", action="store_true", help="Пропускать строки с дублирующимися уникальными полями")
+    args = parser.parse_args(argv)
+
+    try:
+        summaries = load_files(args.db, args.files, args.table, args.batch_size, args.skip_duplicates)
+    except (LoadError, OSError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    for line in summaries:
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
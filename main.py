@@ -1,640 +1,1011 @@
-from fastapi import FastAPI
-import sqlite3
-from datetime import date
-
-app = FastAPI()
-
-# Создаем базу данных и таблицы
-conn = sqlite3.connect("car_rental.db")
-cursor = conn.cursor()
-
-cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Cars (
-        car_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        brand TEXT NOT NULL,
-        model TEXT NOT NULL,
-        year INTEGER NOT NULL,
-        color TEXT NOT NULL,
-        license_plate TEXT UNIQUE NOT NULL,
-        daily_rate REAL NOT NULL,
-        is_available BOOLEAN DEFAULT 1,
-        mileage INTEGER DEFAULT 0,
-        fuel_type TEXT DEFAULT 'petrol'
-    )
-''')
-
-cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Customers (
-        customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        first_name TEXT NOT NULL,
-        last_name TEXT NOT NULL,
-        email TEXT UNIQUE NOT NULL,
-        phone TEXT NOT NULL,
-        driver_license TEXT UNIQUE NOT NULL,
-        address TEXT
-    )
-''')
-
-cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Rentals (
-        rental_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        car_id INTEGER NOT NULL,
-        customer_id INTEGER NOT NULL,
-        rental_date DATE NOT NULL,
-        return_date DATE,
-        planned_return_date DATE NOT NULL,
-        total_cost REAL,
-        mileage_start INTEGER NOT NULL,
-        mileage_end INTEGER,
-        status TEXT DEFAULT 'active',
-        FOREIGN KEY (car_id) REFERENCES Cars (car_id),
-        FOREIGN KEY (customer_id) REFERENCES Customers (customer_id)
-    )
-''')
-
-cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Maintenance (
-        maintenance_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        car_id INTEGER NOT NULL,
-        maintenance_date DATE NOT NULL,
-        maintenance_type TEXT NOT NULL,
-        description TEXT,
-        cost REAL NOT NULL,
-        mileage INTEGER NOT NULL,
-        FOREIGN KEY (car_id) REFERENCES Cars (car_id)
-    )
-''')
-
-conn.commit()
-conn.close()
-
-# Автомобили
-@app.post("/cars/")
-def create_car(brand: str, model: str, year: int, color: str, license_plate: str, daily_rate: float, mileage: int = 0, fuel_type: str = "petrol"):
-    """Добавление автомобиля"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "INSERT INTO Cars (brand, model, year, color, license_plate, daily_rate, mileage, fuel_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-            (brand, model, year, color, license_plate, daily_rate, mileage, fuel_type)
-        )
-        conn.commit()
-        car_id = cursor.lastrowid
-        return {"car_id": car_id, "message": "Автомобиль добавлен"}
-    except sqlite3.IntegrityError:
-        return {"error": "Автомобиль с таким номерным знаком уже существует"}
-    except Exception as e:
-        return {"error": f"Ошибка добавления автомобиля: {str(e)}"}
-    finally:
-        conn.close()
-
-@app.get("/cars/")
-def get_cars(available_only: bool = False):
-    """Получить все автомобили"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    
-    if available_only:
-        cursor.execute("SELECT car_id, brand, model, year, color, license_plate, daily_rate, is_available, mileage, fuel_type FROM Cars WHERE is_available = 1")
-    else:
-        cursor.execute("SELECT car_id, brand, model, year, color, license_plate, daily_rate, is_available, mileage, fuel_type FROM Cars")
-    
-    cars = cursor.fetchall()
-    conn.close()
-    
-    if not cars:
-        return {"error": "Список автомобилей пуст"}
-    
-    return [{
-        "car_id": c[0], 
-        "brand": c[1], 
-        "model": c[2], 
-        "year": c[3], 
-        "color": c[4], 
-        "license_plate": c[5], 
-        "daily_rate": c[6], 
-        "is_available": bool(c[7]),
-        "mileage": c[8],
-        "fuel_type": c[9]
-    } for c in cars]
-
-@app.put("/cars/{car_id}")
-def update_car(car_id: int, brand: str = None, model: str = None, year: int = None, color: str = None, 
-               license_plate: str = None, daily_rate: float = None, is_available: bool = None, 
-               mileage: int = None, fuel_type: str = None):
-    """Обновление информации об автомобиле"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    try:
-        # Проверяем существование автомобиля
-        cursor.execute("SELECT * FROM Cars WHERE car_id = ?", (car_id,))
-        car = cursor.fetchone()
-        
-        if not car:
-            return {"error": "Автомобиль не найден"}
-        
-        # Собираем поля для обновления
-        update_fields = []
-        update_values = []
-        
-        if brand is not None:
-            update_fields.append("brand = ?")
-            update_values.append(brand)
-        if model is not None:
-            update_fields.append("model = ?")
-            update_values.append(model)
-        if year is not None:
-            update_fields.append("year = ?")
-            update_values.append(year)
-        if color is not None:
-            update_fields.append("color = ?")
-            update_values.append(color)
-        if license_plate is not None:
-            update_fields.append("license_plate = ?")
-            update_values.append(license_plate)
-        if daily_rate is not None:
-            update_fields.append("daily_rate = ?")
-            update_values.append(daily_rate)
-        if is_available is not None:
-            update_fields.append("is_available = ?")
-            update_values.append(1 if is_available else 0)
-        if mileage is not None:
-            update_fields.append("mileage = ?")
-            update_values.append(mileage)
-        if fuel_type is not None:
-            update_fields.append("fuel_type = ?")
-            update_values.append(fuel_type)
-        
-        if not update_fields:
-            return {"error": "Нет данных для обновления"}
-        
-        update_values.append(car_id)
-        query = f"UPDATE Cars SET {', '.join(update_fields)} WHERE car_id = ?"
-        
-        cursor.execute(query, update_values)
-        conn.commit()
-        
-        return {"message": "Информация об автомобиле обновлена"}
-    except Exception as e:
-        return {"error": f"Ошибка обновления автомобиля: {str(e)}"}
-    finally:
-        conn.close()
-
-# Клиенты
-@app.post("/customers/")
-def create_customer(first_name: str, last_name: str, email: str, phone: str, driver_license: str, address: str = ""):
-    """Добавление клиента"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "INSERT INTO Customers (first_name, last_name, email, phone, driver_license, address) VALUES (?, ?, ?, ?, ?, ?)",
-            (first_name, last_name, email, phone, driver_license, address)
-        )
-        conn.commit()
-        customer_id = cursor.lastrowid
-        return {"customer_id": customer_id, "message": "Клиент добавлен"}
-    except sqlite3.IntegrityError:
-        return {"error": "Клиент с таким email или водительским удостоверением уже существует"}
-    except Exception as e:
-        return {"error": f"Ошибка добавления клиента: {str(e)}"}
-    finally:
-        conn.close()
-
-@app.get("/customers/")
-def get_customers():
-    """Получить всех клиентов"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT customer_id, first_name, last_name, email, phone, driver_license, address FROM Customers")
-    customers = cursor.fetchall()
-    conn.close()
-    
-    if not customers:
-        return {"error": "Список клиентов пуст"}
-    
-    return [{
-        "customer_id": c[0], 
-        "first_name": c[1], 
-        "last_name": c[2], 
-        "email": c[3], 
-        "phone": c[4], 
-        "driver_license": c[5], 
-        "address": c[6]
-    } for c in customers]
-
-@app.put("/customers/{customer_id}")
-def update_customer(customer_id: int, first_name: str = None, last_name: str = None, email: str = None, 
-                   phone: str = None, driver_license: str = None, address: str = None):
-    """Обновление информации о клиенте"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    try:
-        # Проверяем существование клиента
-        cursor.execute("SELECT * FROM Customers WHERE customer_id = ?", (customer_id,))
-        customer = cursor.fetchone()
-        
-        if not customer:
-            return {"error": "Клиент не найден"}
-        
-        # Собираем поля для обновления
-        update_fields = []
-        update_values = []
-        
-        if first_name is not None:
-            update_fields.append("first_name = ?")
-            update_values.append(first_name)
-        if last_name is not None:
-            update_fields.append("last_name = ?")
-            update_values.append(last_name)
-        if email is not None:
-            update_fields.append("email = ?")
-            update_values.append(email)
-        if phone is not None:
-            update_fields.append("phone = ?")
-            update_values.append(phone)
-        if driver_license is not None:
-            update_fields.append("driver_license = ?")
-            update_values.append(driver_license)
-        if address is not None:
-            update_fields.append("address = ?")
-            update_values.append(address)
-        
-        if not update_fields:
-            return {"error": "Нет данных для обновления"}
-        
-        update_values.append(customer_id)
-        query = f"UPDATE Customers SET {', '.join(update_fields)} WHERE customer_id = ?"
-        
-        cursor.execute(query, update_values)
-        conn.commit()
-        
-        return {"message": "Информация о клиенте обновлена"}
-    except Exception as e:
-        return {"error": f"Ошибка обновления клиента: {str(e)}"}
-    finally:
-        conn.close()
-
-# Аренда
-@app.post("/rentals/")
-def create_rental(car_id: int, customer_id: int, rental_date: str, planned_return_date: str, mileage_start: int):
-    """Создание записи об аренде"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    try:
-        # Проверяем существование автомобиля и клиента
-        cursor.execute("SELECT is_available FROM Cars WHERE car_id = ?", (car_id,))
-        car = cursor.fetchone()
-        
-        cursor.execute("SELECT 1 FROM Customers WHERE customer_id = ?", (customer_id,))
-        customer = cursor.fetchone()
-        
-        if not car:
-            return {"error": "Автомобиль не найден"}
-        if not customer:
-            return {"error": "Клиент не найден"}
-        if not car[0]:  # is_available
-            return {"error": "Автомобиль уже арендован"}
-        
-        cursor.execute(
-            "INSERT INTO Rentals (car_id, customer_id, rental_date, planned_return_date, mileage_start) VALUES (?, ?, ?, ?, ?)",
-            (car_id, customer_id, rental_date, planned_return_date, mileage_start)
-        )
-        
-        # Обновляем статус автомобиля
-        cursor.execute("UPDATE Cars SET is_available = 0 WHERE car_id = ?", (car_id,))
-        
-        conn.commit()
-        rental_id = cursor.lastrowid
-        return {"rental_id": rental_id, "message": "Аренда создана"}
-    except Exception as e:
-        return {"error": f"Ошибка создания аренды: {str(e)}"}
-    finally:
-        conn.close()
-
-@app.post("/rentals/{rental_id}/return")
-def return_rental(rental_id: int, return_date: str, mileage_end: int):
-    """Возврат арендованного автомобиля"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    try:
-        # Получаем информацию об аренде
-        cursor.execute("SELECT car_id, rental_date, planned_return_date, mileage_start FROM Rentals WHERE rental_id = ? AND status = 'active'", (rental_id,))
-        rental = cursor.fetchone()
-        
-        if not rental:
-            return {"error": "Активная аренда не найдена"}
-        
-        car_id, rental_date, planned_return_date, mileage_start = rental
-        
-        # Рассчитываем стоимость аренды
-        from datetime import datetime
-        rental_dt = datetime.strptime(rental_date, "%Y-%m-%d")
-        return_dt = datetime.strptime(return_date, "%Y-%m-%d")
-        planned_dt = datetime.strptime(planned_return_date, "%Y-%m-%d")
-        
-        days_rented = (return_dt - rental_dt).days
-        if days_rented < 1:
-            days_rented = 1
-        
-        # Получаем дневную ставку автомобиля
-        cursor.execute("SELECT daily_rate FROM Cars WHERE car_id = ?", (car_id,))
-        daily_rate = cursor.fetchone()[0]
-        
-        total_cost = days_rented * daily_rate
-        
-        # Добавляем штраф за просрочку, если есть
-        if return_dt > planned_dt:
-            overdue_days = (return_dt - planned_dt).days
-            penalty = overdue_days * daily_rate * 0.5  # 50% от дневной ставки за каждый день просрочки
-            total_cost += penalty
-        
-        # Обновляем запись аренды
-        cursor.execute(
-            "UPDATE Rentals SET return_date = ?, mileage_end = ?, total_cost = ?, status = 'completed' WHERE rental_id = ?",
-            (return_date, mileage_end, total_cost, rental_id)
-        )
-        
-        # Обновляем пробег и статус автомобиля
-        cursor.execute("UPDATE Cars SET mileage = ?, is_available = 1 WHERE car_id = ?", (mileage_end, car_id))
-        
-        conn.commit()
-        
-        return {
-            "message": "Автомобиль возвращен", 
-            "days_rented": days_rented,
-            "total_cost": total_cost,
-            "mileage_driven": mileage_end - mileage_start
-        }
-    except Exception as e:
-        return {"error": f"Ошибка возврата автомобиля: {str(e)}"}
-    finally:
-        conn.close()
-
-@app.get("/rentals/")
-def get_rentals(status: str = None):
-    """Получить все записи об аренде"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    
-    if status:
-        cursor.execute('''
-            SELECT r.rental_id, c.brand, c.model, c.license_plate, 
-                   cust.first_name, cust.last_name, r.rental_date, r.return_date, 
-                   r.planned_return_date, r.total_cost, r.status
-            FROM Rentals r
-            JOIN Cars c ON r.car_id = c.car_id
-            JOIN Customers cust ON r.customer_id = cust.customer_id
-            WHERE r.status = ?
-            ORDER BY r.rental_date DESC
-        ''', (status,))
-    else:
-        cursor.execute('''
-            SELECT r.rental_id, c.brand, c.model, c.license_plate, 
-                   cust.first_name, cust.last_name, r.rental_date, r.return_date, 
-                   r.planned_return_date, r.total_cost, r.status
-            FROM Rentals r
-            JOIN Cars c ON r.car_id = c.car_id
-            JOIN Customers cust ON r.customer_id = cust.customer_id
-            ORDER BY r.rental_date DESC
-        ''')
-    
-    rentals = cursor.fetchall()
-    conn.close()
-    
-    if not rentals:
-        return {"error": "Список аренд пуст"}
-    
-    return [{
-        "rental_id": r[0],
-        "car_brand": r[1],
-        "car_model": r[2],
-        "license_plate": r[3],
-        "customer_name": f"{r[4]} {r[5]}",
-        "rental_date": r[6],
-        "return_date": r[7],
-        "planned_return_date": r[8],
-        "total_cost": r[9],
-        "status": r[10]
-    } for r in rentals]
-
-# Техническое обслуживание
-@app.post("/maintenance/")
-def create_maintenance(car_id: int, maintenance_date: str, maintenance_type: str, cost: float, mileage: int, description: str = ""):
-    """Добавление записи о техническом обслуживании"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    try:
-        # Проверяем существование автомобиля
-        cursor.execute("SELECT 1 FROM Cars WHERE car_id = ?", (car_id,))
-        car = cursor.fetchone()
-        
-        if not car:
-            return {"error": "Автомобиль не найден"}
-        
-        cursor.execute(
-            "INSERT INTO Maintenance (car_id, maintenance_date, maintenance_type, description, cost, mileage) VALUES (?, ?, ?, ?, ?, ?)",
-            (car_id, maintenance_date, maintenance_type, description, cost, mileage)
-        )
-        conn.commit()
-        maintenance_id = cursor.lastrowid
-        return {"maintenance_id": maintenance_id, "message": "Запись о ТО добавлена"}
-    except Exception as e:
-        return {"error": f"Ошибка добавления записи о ТО: {str(e)}"}
-    finally:
-        conn.close()
-
-@app.get("/maintenance/{car_id}")
-def get_car_maintenance(car_id: int):
-    """Получить историю ТО для автомобиля"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT m.maintenance_id, m.maintenance_date, m.maintenance_type, m.description, m.cost, m.mileage
-        FROM Maintenance m
-        JOIN Cars c ON m.car_id = c.car_id
-        WHERE m.car_id = ?
-        ORDER BY m.maintenance_date DESC
-    ''', (car_id,))
-    maintenance_records = cursor.fetchall()
-    conn.close()
-    
-    if not maintenance_records:
-        return {"error": "Записи о ТО не найдены"}
-    
-    return [{
-        "maintenance_id": m[0],
-        "maintenance_date": m[1],
-        "maintenance_type": m[2],
-        "description": m[3],
-        "cost": m[4],
-        "mileage": m[5]
-    } for m in maintenance_records]
-
-# Статистика
-@app.get("/stats/rentals")
-def get_rental_stats():
-    """Получить статистику по арендам"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    
-    # Общее количество аренд
-    cursor.execute("SELECT COUNT(*) FROM Rentals")
-    total_rentals = cursor.fetchone()[0]
-    
-    # Активные аренды
-    cursor.execute("SELECT COUNT(*) FROM Rentals WHERE status = 'active'")
-    active_rentals = cursor.fetchone()[0]
-    
-    # Общий доход
-    cursor.execute("SELECT SUM(total_cost) FROM Rentals WHERE status = 'completed' AND total_cost IS NOT NULL")
-    total_revenue = cursor.fetchone()[0] or 0
-    
-    # Средняя продолжительность аренды
-    cursor.execute('''
-        SELECT AVG(julianday(return_date) - julianday(rental_date)) 
-        FROM Rentals 
-        WHERE status = 'completed' AND return_date IS NOT NULL
-    ''')
-    avg_rental_days = cursor.fetchone()[0] or 0
-    
-    conn.close()
-    
-    return {
-        "total_rentals": total_rentals,
-        "active_rentals": active_rentals,
-        "total_revenue": round(total_revenue, 2),
-        "avg_rental_days": round(avg_rental_days, 1)
-    }
-
-@app.get("/stats/cars")
-def get_car_stats():
-    """Получить статистику по автомобилям"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    
-    # Общее количество автомобилей
-    cursor.execute("SELECT COUNT(*) FROM Cars")
-    total_cars = cursor.fetchone()[0]
-    
-    # Доступные автомобили
-    cursor.execute("SELECT COUNT(*) FROM Cars WHERE is_available = 1")
-    available_cars = cursor.fetchone()[0]
-    
-    # Автомобили по маркам
-    cursor.execute("SELECT brand, COUNT(*) FROM Cars GROUP BY brand")
-    cars_by_brand = cursor.fetchall()
-    
-    # Самый популярный автомобиль
-    cursor.execute('''
-        SELECT c.brand, c.model, COUNT(r.rental_id) as rental_count
-        FROM Cars c
-        LEFT JOIN Rentals r ON c.car_id = r.car_id
-        GROUP BY c.car_id
-        ORDER BY rental_count DESC
-        LIMIT 1
-    ''')
-    popular_car = cursor.fetchone()
-    
-    conn.close()
-    
-    result = {
-        "total_cars": total_cars,
-        "available_cars": available_cars,
-        "cars_by_brand": [{"brand": c[0], "count": c[1]} for c in cars_by_brand]
-    }
-    
-    if popular_car and popular_car[2] > 0:
-        result["most_popular_car"] = {
-            "brand": popular_car[0],
-            "model": popular_car[1],
-            "rental_count": popular_car[2]
-        }
-    
-    return result
-
-# Удаление автомобиля
-@app.delete("/cars/{car_id}")
-def delete_car(car_id: int):
-    """Удаление автомобиля"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    try:
-        # Проверяем, нет ли активных аренд
-        cursor.execute("SELECT 1 FROM Rentals WHERE car_id = ? AND status = 'active'", (car_id,))
-        active_rental = cursor.fetchone()
-        
-        if active_rental:
-            return {"error": "Нельзя удалить автомобиль с активной арендой"}
-        
-        # Удаляем связанные записи
-        cursor.execute("DELETE FROM Maintenance WHERE car_id = ?", (car_id,))
-        cursor.execute("DELETE FROM Rentals WHERE car_id = ?", (car_id,))
-        cursor.execute("DELETE FROM Cars WHERE car_id = ?", (car_id,))
-        
-        conn.commit()
-        return {"message": "Автомобиль удален"}
-    except Exception as e:
-        return {"error": f"Ошибка удаления автомобиля: {str(e)}"}
-    finally:
-        conn.close()
-
-# Удаление клиента
-@app.delete("/customers/{customer_id}")
-def delete_customer(customer_id: int):
-    """Удаление клиента"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    try:
-        # Проверяем, нет ли активных аренд
-        cursor.execute("SELECT 1 FROM Rentals WHERE customer_id = ? AND status = 'active'", (customer_id,))
-        active_rental = cursor.fetchone()
-        
-        if active_rental:
-            return {"error": "Нельзя удалить клиента с активной арендой"}
-        
-        # Удаляем связанные записи об арендах
-        cursor.execute("DELETE FROM Rentals WHERE customer_id = ?", (customer_id,))
-        cursor.execute("DELETE FROM Customers WHERE customer_id = ?", (customer_id,))
-        
-        conn.commit()
-        return {"message": "Клиент удален"}
-    except Exception as e:
-        return {"error": f"Ошибка удаления клиента: {str(e)}"}
-    finally:
-        conn.close()
-
-# Удаление записи об аренде
-@app.delete("/rentals/{rental_id}")
-def delete_rental(rental_id: int):
-    """Удаление записи об аренде"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    try:
-        cursor.execute("DELETE FROM Rentals WHERE rental_id = ?", (rental_id,))
-        conn.commit()
-        return {"message": "Запись об аренде удалена"}
-    except Exception as e:
-        return {"error": f"Ошибка удаления записи об аренде: {str(e)}"}
-    finally:
-        conn.close()
-
-# Удаление записи о ТО
-@app.delete("/maintenance/{maintenance_id}")
-def delete_maintenance(maintenance_id: int):
-    """Удаление записи о техническом обслуживании"""
-    conn = sqlite3.connect("car_rental.db")
-    cursor = conn.cursor()
-    try:
-        cursor.execute("DELETE FROM Maintenance WHERE maintenance_id = ?", (maintenance_id,))
-        conn.commit()
-        return {"message": "Запись о ТО удалена"}
-    except Exception as e:
-        return {"error": f"Ошибка удаления записи о ТО: {str(e)}"}
-    finally:
-        conn.close()
-
-if __name__ == "__main__":
-    import uvicorn
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+import json
+import sqlite3
+from datetime import date
+from typing import List, Union
+
+from availability import availability_index
+from bulk import MAX_BULK_SIZE, bulk_insert, existing_ids
+from cache import cache, etag_matches, make_etag, table_versions
+from db import DB_PATH, connect, get_db, get_read_db, is_busy, pool, read_pool
+from export import EXPORT_FORMATS, stream_rows
+from metrics import METRICS_ENABLED, PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, render
+from migrations import migrate
+from overdue import run_scanner
+from pagination import decode_cursor, page_size, split_page
+from pricing import overdue_penalty, rental_cost, reprice
+from reports import utilization
+from reservations import active_rental_overlaps, find_conflicts, reservations_in_window, to_day
+from responses import FastJSONResponse
+from rows import CAR_COLUMNS, CAR_FIELDS, CUSTOMER_COLUMNS, CUSTOMER_FIELDS, RENTAL_FIELDS, car_row, customer_row, maintenance_row, rental_row
+from search import CAR_SORTS, car_search_query, fts_prefix_query, search_limit
+from schemas import (Car, CarCreate, CarPage, Customer, CustomerCreate, CustomerPage, MaintenanceCreate, MaintenanceRecord,
+                     Rental, RentalPage, RentalReturn)
+from writer import execute_write, writer
+
+@asynccontextmanager
+async def lifespan(app):
+    # Фоновый сканер просроченных аренд и писатель групповой фиксации работают, пока запущено приложение
+    if writer is not None:
+        writer.start()
+    scanner = asyncio.create_task(run_scanner(pool))
+    try:
+        yield
+    finally:
+        if writer is not None:
+            await asyncio.to_thread(writer.stop)
+        scanner.cancel()
+        try:
+            await scanner
+        except asyncio.CancelledError:
+            pass
+
+# Ответы сериализуются orjson; списки строк отдаются готовым FastJSONResponse, минуя jsonable_encoder
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Создаем базу данных, применяем миграции схемы и строим карту занятости автомобилей
+conn = connect(DB_PATH, timed=False)
+migrate(conn)
+availability_index.rebuild(conn)
+conn.close()
+
+# Автомобили
+@app.post("/cars/")
+def create_car(brand: str, model: str, year: int, color: str, license_plate: str, daily_rate: float, mileage: int = 0, fuel_type: str = "petrol", conn: sqlite3.Connection = Depends(get_db)):
+    """Добавление автомобиля"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO Cars (brand, model, year, color, license_plate, daily_rate, mileage, fuel_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (brand, model, year, color, license_plate, daily_rate, mileage, fuel_type)
+        )
+        conn.commit()
+        car_id = cursor.lastrowid
+        return {"car_id": car_id, "message": "Автомобиль добавлен"}
+    except sqlite3.IntegrityError:
+        return {"error": "Автомобиль с таким номерным знаком уже существует"}
+    except Exception as e:
+        return {"error": f"Ошибка добавления автомобиля: {str(e)}"}
+
+@app.post("/cars/bulk")
+def create_cars_bulk(cars: List[CarCreate], conn: sqlite3.Connection = Depends(get_db)):
+    """Массовое добавление автомобилей одной транзакцией"""
+    if len(cars) > MAX_BULK_SIZE:
+        return {"error": f"Слишком много записей (максимум {MAX_BULK_SIZE})"}
+    try:
+        rows = [(c.brand, c.model, c.year, c.color, c.license_plate, c.daily_rate, c.mileage, c.fuel_type) for c in cars]
+        return bulk_insert(conn, "Cars", "car_id",
+                           ("brand", "model", "year", "color", "license_plate", "daily_rate", "mileage", "fuel_type"), rows)
+    except Exception as e:
+        return {"error": f"Ошибка массового добавления автомобилей: {str(e)}"}
+
+@app.get("/cars/", responses={200: {"model": Union[List[Car], CarPage]}})
+def get_cars(request: Request, response: Response, available_only: bool = False, limit: int = None, after: str = None, format: str = None, conn: sqlite3.Connection = Depends(get_read_db)):
+    """Получить все автомобили (постранично, если задан limit или after; потоком, если задан format)"""
+    if format is not None and format not in EXPORT_FORMATS:
+        return {"error": "Неподдерживаемый формат выгрузки"}
+    # Условный запрос: если данные не менялись, отвечаем 304 без чтения строк
+    etag = make_etag("cars", table_versions(conn, "Cars"))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    cursor = conn.cursor()
+    paginate = limit is not None or after is not None
+    
+    conditions = []
+    params = []
+    if available_only:
+        conditions.append("is_available = 1")
+    if after is not None:
+        try:
+            last_car_id, = decode_cursor(after, 1)
+        except ValueError:
+            return {"error": "Некорректный курсор"}
+        conditions.append("car_id > ?")
+        params.append(last_car_id)
+    
+    query = f"SELECT {CAR_COLUMNS} FROM Cars"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY car_id"
+    if format is not None:
+        return stream_rows(conn, query, params, car_row, CAR_FIELDS, format, "cars", {"ETag": etag})
+    if paginate:
+        size = page_size(limit)
+        query += " LIMIT ?"
+        params.append(size + 1)
+    
+    cursor.row_factory = car_row
+    cursor.execute(query, params)
+    cars = cursor.fetchall()
+    
+    if paginate:
+        cars, next_cursor = split_page(cars, size, lambda c: (c["car_id"],))
+        return FastJSONResponse({"items": cars, "next_cursor": next_cursor}, headers={"ETag": etag})
+    if not cars:
+        return {"error": "Список автомобилей пуст"}
+    return FastJSONResponse(cars, headers={"ETag": etag})
+
+@app.get("/cars/available", responses={200: {"model": List[Car]}})
+def get_available_cars(date_from: str = Query(..., alias="from"), date_to: str = Query(..., alias="to"),
+                       fuel_type: str = None, max_rate: float = None, conn: sqlite3.Connection = Depends(get_read_db)):
+    """Найти автомобили, свободные весь период [from, to), по карте занятости в памяти"""
+    try:
+        car_ids = availability_index.find_available(conn, date_from, date_to, fuel_type, max_rate)
+    except ValueError:
+        return {"error": "Некорректный период поиска"}
+    
+    if not car_ids:
+        return {"error": "Нет свободных автомобилей"}
+    
+    cursor = conn.cursor()
+    cursor.row_factory = car_row
+    cursor.execute(
+        f"SELECT {CAR_COLUMNS} FROM Cars WHERE car_id IN (SELECT value FROM json_each(?)) ORDER BY car_id",
+        (json.dumps(car_ids),)
+    )
+    return FastJSONResponse(cursor.fetchall())
+
+@app.get("/cars/search", responses={200: {"model": List[Car]}})
+def search_cars(brand: str = None, model: str = None, fuel_type: str = None, year_min: int = None, year_max: int = None,
+                rate_min: float = None, rate_max: float = None, available_only: bool = False, sort: str = "daily_rate",
+                limit: int = None, conn: sqlite3.Connection = Depends(get_read_db)):
+    """Поиск автомобилей по марке, модели, типу топлива, диапазонам года и ставки (сортировка: car_id, daily_rate, year; "-" - по убыванию)"""
+    try:
+        query, params = car_search_query(brand, model, fuel_type, year_min, year_max, rate_min, rate_max,
+                                         available_only, sort, search_limit(limit))
+    except ValueError:
+        return {"error": f"Неподдерживаемая сортировка (доступны: {', '.join(CAR_SORTS)})"}
+    
+    cursor = conn.cursor()
+    cursor.row_factory = car_row
+    cars = cursor.execute(query, params).fetchall()
+    
+    if not cars:
+        return {"error": "Автомобили не найдены"}
+    
+    return FastJSONResponse(cars)
+
+@app.put("/cars/{car_id}")
+def update_car(car_id: int, brand: str = None, model: str = None, year: int = None, color: str = None, 
+               license_plate: str = None, daily_rate: float = None, is_available: bool = None, 
+               mileage: int = None, fuel_type: str = None, conn: sqlite3.Connection = Depends(get_db)):
+    """Обновление информации об автомобиле"""
+    cursor = conn.cursor()
+    try:
+        # Проверяем существование автомобиля
+        cursor.execute("SELECT * FROM Cars WHERE car_id = ?", (car_id,))
+        car = cursor.fetchone()
+        
+        if not car:
+            return {"error": "Автомобиль не найден"}
+        
+        # Собираем поля для обновления
+        update_fields = []
+        update_values = []
+        
+        if brand is not None:
+            update_fields.append("brand = ?")
+            update_values.append(brand)
+        if model is not None:
+            update_fields.append("model = ?")
+            update_values.append(model)
+        if year is not None:
+            update_fields.append("year = ?")
+            update_values.append(year)
+        if color is not None:
+            update_fields.append("color = ?")
+            update_values.append(color)
+        if license_plate is not None:
+            update_fields.append("license_plate = ?")
+            update_values.append(license_plate)
+        if daily_rate is not None:
+            update_fields.append("daily_rate = ?")
+            update_values.append(daily_rate)
+        if is_available is not None:
+            update_fields.append("is_available = ?")
+            update_values.append(1 if is_available else 0)
+        if mileage is not None:
+            update_fields.append("mileage = ?")
+            update_values.append(mileage)
+        if fuel_type is not None:
+            update_fields.append("fuel_type = ?")
+            update_values.append(fuel_type)
+        
+        if not update_fields:
+            return {"error": "Нет данных для обновления"}
+        
+        update_values.append(car_id)
+        query = f"UPDATE Cars SET {', '.join(update_fields)} WHERE car_id = ?"
+        
+        cursor.execute(query, update_values)
+        conn.commit()
+        
+        return {"message": "Информация об автомобиле обновлена"}
+    except Exception as e:
+        return {"error": f"Ошибка обновления автомобиля: {str(e)}"}
+
+# Клиенты
+@app.post("/customers/")
+def create_customer(first_name: str, last_name: str, email: str, phone: str, driver_license: str, address: str = "", conn: sqlite3.Connection = Depends(get_db)):
+    """Добавление клиента"""
+    def insert(conn):
+        return conn.execute(
+            "INSERT INTO Customers (first_name, last_name, email, phone, driver_license, address) VALUES (?, ?, ?, ?, ?, ?) RETURNING customer_id",
+            (first_name, last_name, email, phone, driver_license, address)
+        ).fetchone()[0]
+    
+    try:
+        customer_id = execute_write(conn, insert)
+        return {"customer_id": customer_id, "message": "Клиент добавлен"}
+    except sqlite3.IntegrityError:
+        return {"error": "Клиент с таким email или водительским удостоверением уже существует"}
+    except Exception as e:
+        return {"error": f"Ошибка добавления клиента: {str(e)}"}
+
+@app.post("/customers/bulk")
+def create_customers_bulk(customers: List[CustomerCreate], conn: sqlite3.Connection = Depends(get_db)):
+    """Массовое добавление клиентов одной транзакцией"""
+    if len(customers) > MAX_BULK_SIZE:
+        return {"error": f"Слишком много записей (максимум {MAX_BULK_SIZE})"}
+    try:
+        rows = [(c.first_name, c.last_name, c.email, c.phone, c.driver_license, c.address) for c in customers]
+        return bulk_insert(conn, "Customers", "customer_id",
+                           ("first_name", "last_name", "email", "phone", "driver_license", "address"), rows)
+    except Exception as e:
+        return {"error": f"Ошибка массового добавления клиентов: {str(e)}"}
+
+@app.get("/customers/search", responses={200: {"model": List[Customer]}})
+def search_customers(q: str, limit: int = None, conn: sqlite3.Connection = Depends(get_read_db)):
+    """Поиск клиентов по началу имени, фамилии, email, телефона или номера прав (лучшие совпадения первыми)"""
+    match = fts_prefix_query(q)
+    if match is None:
+        return {"error": "Пустой поисковый запрос"}
+    
+    cursor = conn.cursor()
+    cursor.row_factory = customer_row
+    cursor.execute('''
+        SELECT c.customer_id, c.first_name, c.last_name, c.email, c.phone, c.driver_license, c.address
+        FROM CustomerSearch s JOIN Customers c ON c.customer_id = s.rowid
+        WHERE CustomerSearch MATCH ?
+        ORDER BY s.rank
+        LIMIT ?
+    ''', (match, search_limit(limit)))
+    customers = cursor.fetchall()
+    
+    if not customers:
+        return {"error": "Клиенты не найдены"}
+    
+    return FastJSONResponse(customers)
+
+@app.get("/customers/", responses={200: {"model": Union[List[Customer], CustomerPage]}})
+def get_customers(request: Request, response: Response, limit: int = None, after: str = None, format: str = None, conn: sqlite3.Connection = Depends(get_read_db)):
+    """Получить всех клиентов (постранично, если задан limit или after; потоком, если задан format)"""
+    if format is not None and format not in EXPORT_FORMATS:
+        return {"error": "Неподдерживаемый формат выгрузки"}
+    # Условный запрос: если данные не менялись, отвечаем 304 без чтения строк
+    etag = make_etag("customers", table_versions(conn, "Customers"))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    cursor = conn.cursor()
+    paginate = limit is not None or after is not None
+    
+    query = f"SELECT {CUSTOMER_COLUMNS} FROM Customers"
+    params = []
+    if after is not None:
+        try:
+            last_customer_id, = decode_cursor(after, 1)
+        except ValueError:
+            return {"error": "Некорректный курсор"}
+        query += " WHERE customer_id > ?"
+        params.append(last_customer_id)
+    query += " ORDER BY customer_id"
+    if format is not None:
+        return stream_rows(conn, query, params, customer_row, CUSTOMER_FIELDS, format, "customers", {"ETag": etag})
+    if paginate:
+        size = page_size(limit)
+        query += " LIMIT ?"
+        params.append(size + 1)
+    
+    cursor.row_factory = customer_row
+    cursor.execute(query, params)
+    customers = cursor.fetchall()
+    
+    if paginate:
+        customers, next_cursor = split_page(customers, size, lambda c: (c["customer_id"],))
+        return FastJSONResponse({"items": customers, "next_cursor": next_cursor}, headers={"ETag": etag})
+    if not customers:
+        return {"error": "Список клиентов пуст"}
+    return FastJSONResponse(customers, headers={"ETag": etag})
+
+@app.put("/customers/{customer_id}")
+def update_customer(customer_id: int, first_name: str = None, last_name: str = None, email: str = None, 
+                   phone: str = None, driver_license: str = None, address: str = None, conn: sqlite3.Connection = Depends(get_db)):
+    """Обновление информации о клиенте"""
+    cursor = conn.cursor()
+    try:
+        # Проверяем существование клиента
+        cursor.execute("SELECT * FROM Customers WHERE customer_id = ?", (customer_id,))
+        customer = cursor.fetchone()
+        
+        if not customer:
+            return {"error": "Клиент не найден"}
+        
+        # Собираем поля для обновления
+        update_fields = []
+        update_values = []
+        
+        if first_name is not None:
+            update_fields.append("first_name = ?")
+            update_values.append(first_name)
+        if last_name is not None:
+            update_fields.append("last_name = ?")
+            update_values.append(last_name)
+        if email is not None:
+            update_fields.append("email = ?")
+            update_values.append(email)
+        if phone is not None:
+            update_fields.append("phone = ?")
+            update_values.append(phone)
+        if driver_license is not None:
+            update_fields.append("driver_license = ?")
+            update_values.append(driver_license)
+        if address is not None:
+            update_fields.append("address = ?")
+            update_values.append(address)
+        
+        if not update_fields:
+            return {"error": "Нет данных для обновления"}
+        
+        update_values.append(customer_id)
+        query = f"UPDATE Customers SET {', '.join(update_fields)} WHERE customer_id = ?"
+        
+        cursor.execute(query, update_values)
+        conn.commit()
+        
+        return {"message": "Информация о клиенте обновлена"}
+    except Exception as e:
+        return {"error": f"Ошибка обновления клиента: {str(e)}"}
+
+# Аренда
+@app.post("/rentals/")
+def create_rental(car_id: int, customer_id: int, rental_date: str, planned_return_date: str, mileage_start: int,
+                  reservation_id: int = None, conn: sqlite3.Connection = Depends(get_db)):
+    """Создание записи об аренде (в том числе по бронированию клиента)"""
+    try:
+        start_day, end_day = to_day(rental_date), to_day(planned_return_date)
+    except ValueError:
+        return {"error": "Некорректная дата"}
+    
+    def rent(conn):
+        cursor = conn.cursor()
+        # Все проверки - в условии одного UPDATE: дважды выдать автомобиль невозможно
+        cursor.execute('''
+            UPDATE Cars SET is_available = 0
+            WHERE car_id = ? AND is_available = 1
+              AND EXISTS (SELECT 1 FROM Customers WHERE customer_id = ?)
+              AND (? IS NULL OR EXISTS (
+                  SELECT 1 FROM Reservations
+                  WHERE reservation_id = ? AND car_id = Cars.car_id AND customer_id = ? AND status = 'active'))
+              AND NOT EXISTS (
+                  SELECT 1 FROM ReservationIndex
+                  WHERE car_min <= Cars.car_id AND car_max >= Cars.car_id AND start_day <= ? AND end_day >= ?
+                    AND id IS NOT ?)
+            RETURNING car_id
+        ''', (car_id, customer_id, reservation_id, reservation_id, customer_id, end_day - 1, start_day, reservation_id))
+        if cursor.fetchone() is None:
+            # Медленный путь: выясняем, какое из условий не выполнено (ничего не изменено)
+            car = cursor.execute("SELECT is_available FROM Cars WHERE car_id = ?", (car_id,)).fetchone()
+            if not car:
+                return JSONResponse(content={"error": "Автомобиль не найден"})
+            if not cursor.execute("SELECT 1 FROM Customers WHERE customer_id = ?", (customer_id,)).fetchone():
+                return JSONResponse(content={"error": "Клиент не найден"})
+            if not car[0]:
+                return JSONResponse(status_code=409, content={"error": "Автомобиль уже арендован"})
+            if reservation_id is not None and not cursor.execute(
+                "SELECT 1 FROM Reservations WHERE reservation_id = ? AND car_id = ? AND customer_id = ? AND status = 'active'",
+                (reservation_id, car_id, customer_id)
+            ).fetchone():
+                return JSONResponse(content={"error": "Бронирование не найдено"})
+            return JSONResponse(status_code=409, content={"error": "Автомобиль забронирован на этот период"})
+        
+        cursor.execute(
+            "INSERT INTO Rentals (car_id, customer_id, rental_date, planned_return_date, mileage_start) VALUES (?, ?, ?, ?, ?) RETURNING rental_id",
+            (car_id, customer_id, rental_date, planned_return_date, mileage_start)
+        )
+        rental_id = cursor.fetchone()[0]
+        
+        # Закрываем использованное бронирование
+        if reservation_id is not None:
+            cursor.execute("UPDATE Reservations SET status = 'fulfilled' WHERE reservation_id = ?", (reservation_id,))
+        return {"rental_id": rental_id, "message": "Аренда создана"}
+    
+    try:
+        # Блокировка записи берется сразу (BEGIN IMMEDIATE): без повышения блокировки посреди транзакции
+        return execute_write(conn, rent)
+    except sqlite3.OperationalError as e:
+        # 409 - только занятая база: прочие ошибки SQLite не маскируются под конфликт
+        if not is_busy(e):
+            return {"error": f"Ошибка создания аренды: {str(e)}"}
+        return JSONResponse(status_code=409, content={"error": f"База данных занята, повторите запрос: {str(e)}"})
+    except Exception as e:
+        return {"error": f"Ошибка создания аренды: {str(e)}"}
+
+@app.get("/rentals/overdue")
+def get_overdue_rentals(conn: sqlite3.Connection = Depends(get_read_db)):
+    """Получить просроченные аренды, найденные сканером, с начисленным на сегодня штрафом"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT r.rental_id, c.car_id, c.brand, c.model, c.license_plate, cu.first_name || ' ' || cu.last_name,
+               r.rental_date, r.planned_return_date, c.daily_rate, o.detected_at
+        FROM OverdueRentals o
+        JOIN Rentals r ON o.rental_id = r.rental_id
+        JOIN Cars c ON r.car_id = c.car_id
+        JOIN Customers cu ON r.customer_id = cu.customer_id
+        WHERE r.status = 'active'
+        ORDER BY r.planned_return_date, r.rental_id
+    ''')
+    rentals = cursor.fetchall()
+    
+    if not rentals:
+        return {"error": "Просроченных аренд нет"}
+    
+    today = str(date.today())
+    result = []
+    for r in rentals:
+        overdue_days, penalty = overdue_penalty(r[7], today, r[8])
+        result.append({
+            "rental_id": r[0],
+            "car_id": r[1],
+            "car_brand": r[2],
+            "car_model": r[3],
+            "license_plate": r[4],
+            "customer_name": r[5],
+            "rental_date": r[6],
+            "planned_return_date": r[7],
+            "overdue_days": overdue_days,
+            "penalty": penalty,
+            "detected_at": r[9]
+        })
+    return result
+
+@app.post("/rentals/{rental_id}/return")
+def return_rental(rental_id: int, return_date: str, mileage_end: int, conn: sqlite3.Connection = Depends(get_db)):
+    """Возврат арендованного автомобиля"""
+    cursor = conn.cursor()
+    try:
+        # Получаем информацию об аренде
+        cursor.execute("SELECT car_id, rental_date, planned_return_date, mileage_start FROM Rentals WHERE rental_id = ? AND status = 'active'", (rental_id,))
+        rental = cursor.fetchone()
+        
+        if not rental:
+            return {"error": "Активная аренда не найдена"}
+        
+        car_id, rental_date, planned_return_date, mileage_start = rental
+        
+        # Получаем дневную ставку автомобиля
+        cursor.execute("SELECT daily_rate FROM Cars WHERE car_id = ?", (car_id,))
+        daily_rate = cursor.fetchone()[0]
+        
+        # Рассчитываем стоимость аренды вместе со штрафом за просрочку
+        days_rented, total_cost = rental_cost(rental_date, return_date, planned_return_date, daily_rate)
+        
+        # Обновляем запись аренды
+        cursor.execute(
+            "UPDATE Rentals SET return_date = ?, mileage_end = ?, total_cost = ?, status = 'completed' WHERE rental_id = ?",
+            (return_date, mileage_end, total_cost, rental_id)
+        )
+        
+        # Обновляем пробег и статус автомобиля
+        cursor.execute("UPDATE Cars SET mileage = ?, is_available = 1 WHERE car_id = ?", (mileage_end, car_id))
+        
+        conn.commit()
+        
+        return {
+            "message": "Автомобиль возвращен", 
+            "days_rented": days_rented,
+            "total_cost": total_cost,
+            "mileage_driven": mileage_end - mileage_start
+        }
+    except Exception as e:
+        return {"error": f"Ошибка возврата автомобиля: {str(e)}"}
+
+@app.post("/rentals/return/batch")
+def return_rentals_batch(returns: List[RentalReturn], conn: sqlite3.Connection = Depends(get_db)):
+    """Пакетный возврат автомобилей: расчет стоимости за один проход и одна транзакция на весь пакет"""
+    if len(returns) > MAX_BULK_SIZE:
+        return {"error": f"Слишком много записей (максимум {MAX_BULK_SIZE})"}
+    
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        # Активные аренды пакета вместе с дневными ставками - одним запросом
+        cursor.execute('''
+            SELECT r.rental_id, r.car_id, r.rental_date, r.planned_return_date, r.mileage_start, c.daily_rate
+            FROM Rentals r JOIN Cars c ON r.car_id = c.car_id
+            WHERE r.rental_id IN (SELECT value FROM json_each(?)) AND r.status = 'active'
+        ''', (json.dumps([item.rental_id for item in returns]),))
+        rentals = {row[0]: row[1:] for row in cursor.fetchall()}
+        
+        results = []
+        rental_updates = []
+        car_updates = []
+        for index, item in enumerate(returns):
+            rental = rentals.pop(item.rental_id, None)
+            if rental is None:
+                results.append({"index": index, "rental_id": item.rental_id, "error": "Активная аренда не найдена"})
+                continue
+            car_id, rental_date, planned_return_date, mileage_start, daily_rate = rental
+            try:
+                days_rented, total_cost = rental_cost(rental_date, item.return_date, planned_return_date, daily_rate)
+            except ValueError:
+                results.append({"index": index, "rental_id": item.rental_id, "error": "Некорректная дата"})
+                continue
+            
+            rental_updates.append((item.return_date, item.mileage_end, total_cost, item.rental_id))
+            car_updates.append((item.mileage_end, car_id))
+            results.append({
+                "index": index,
+                "rental_id": item.rental_id,
+                "days_rented": days_rented,
+                "total_cost": total_cost,
+                "mileage_driven": item.mileage_end - mileage_start
+            })
+        
+        cursor.executemany(
+            "UPDATE Rentals SET return_date = ?, mileage_end = ?, total_cost = ?, status = 'completed' WHERE rental_id = ?",
+            rental_updates
+        )
+        cursor.executemany("UPDATE Cars SET mileage = ?, is_available = 1 WHERE car_id = ?", car_updates)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return {"error": f"Ошибка пакетного возврата: {str(e)}"}
+    
+    failed = sum(1 for item in results if "error" in item)
+    return {"returned": len(results) - failed, "failed": failed, "results": results}
+
+@app.get("/rentals/", responses={200: {"model": Union[List[Rental], RentalPage]}})
+def get_rentals(request: Request, response: Response, status: str = None, limit: int = None, after: str = None, format: str = None, conn: sqlite3.Connection = Depends(get_read_db)):
+    """Получить все записи об аренде (постранично, если задан limit или after; потоком, если задан format)"""
+    if format is not None and format not in EXPORT_FORMATS:
+        return {"error": "Неподдерживаемый формат выгрузки"}
+    # Условный запрос: если данные не менялись, отвечаем 304 без чтения строк
+    etag = make_etag("rentals", table_versions(conn, "Rentals", "Cars", "Customers"))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    cursor = conn.cursor()
+    paginate = limit is not None or after is not None
+    
+    conditions = []
+    params = []
+    if status:
+        conditions.append("r.status = ?")
+        params.append(status)
+    if after is not None:
+        # Ключ страницы - (rental_date, rental_id), сортировка по убыванию
+        try:
+            last_date, last_rental_id = decode_cursor(after, 2)
+        except ValueError:
+            return {"error": "Некорректный курсор"}
+        conditions.append("(r.rental_date, r.rental_id) < (?, ?)")
+        params.extend([last_date, last_rental_id])
+    
+    query = '''
+        SELECT r.rental_id, c.brand, c.model, c.license_plate, 
+               cust.first_name || ' ' || cust.last_name, r.rental_date, r.return_date, 
+               r.planned_return_date, r.total_cost, r.status
+        FROM Rentals r
+        JOIN Cars c ON r.car_id = c.car_id
+        JOIN Customers cust ON r.customer_id = cust.customer_id
+    '''
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY r.rental_date DESC, r.rental_id DESC"
+    if format is not None:
+        return stream_rows(conn, query, params, rental_row, RENTAL_FIELDS, format, "rentals", {"ETag": etag})
+    if paginate:
+        size = page_size(limit)
+        query += " LIMIT ?"
+        params.append(size + 1)
+    
+    cursor.row_factory = rental_row
+    cursor.execute(query, params)
+    rentals = cursor.fetchall()
+    
+    if paginate:
+        rentals, next_cursor = split_page(rentals, size, lambda r: (r["rental_date"], r["rental_id"]))
+        return FastJSONResponse({"items": rentals, "next_cursor": next_cursor}, headers={"ETag": etag})
+    if not rentals:
+        return {"error": "Список аренд пуст"}
+    return FastJSONResponse(rentals, headers={"ETag": etag})
+
+# Бронирования
+@app.post("/reservations/")
+def create_reservation(car_id: int, customer_id: int, start_date: str, end_date: str, conn: sqlite3.Connection = Depends(get_db)):
+    """Бронирование автомобиля на период [start_date, end_date)"""
+    try:
+        if to_day(end_date) <= to_day(start_date):
+            return {"error": "Дата окончания бронирования должна быть позже даты начала"}
+    except ValueError:
+        return {"error": "Некорректная дата"}
+    
+    cursor = conn.cursor()
+    try:
+        # Блокируем запись, чтобы проверка пересечений и вставка были атомарными
+        cursor.execute("BEGIN IMMEDIATE")
+        
+        cursor.execute("SELECT 1 FROM Cars WHERE car_id = ?", (car_id,))
+        if not cursor.fetchone():
+            return {"error": "Автомобиль не найден"}
+        cursor.execute("SELECT 1 FROM Customers WHERE customer_id = ?", (customer_id,))
+        if not cursor.fetchone():
+            return {"error": "Клиент не найден"}
+        
+        if find_conflicts(conn, car_id, start_date, end_date):
+            return {"error": "Автомобиль уже забронирован на этот период"}
+        if active_rental_overlaps(conn, car_id, start_date, end_date):
+            return {"error": "Автомобиль арендован в этот период"}
+        
+        cursor.execute(
+            "INSERT INTO Reservations (car_id, customer_id, start_date, end_date) VALUES (?, ?, ?, ?)",
+            (car_id, customer_id, start_date, end_date)
+        )
+        reservation_id = cursor.lastrowid
+        conn.commit()
+        return {"reservation_id": reservation_id, "message": "Бронирование создано"}
+    except Exception as e:
+        return {"error": f"Ошибка создания бронирования: {str(e)}"}
+
+@app.get("/reservations/")
+def get_reservations(car_id: int = None, date_from: str = Query(None, alias="from"), date_to: str = Query(None, alias="to"),
+                     conn: sqlite3.Connection = Depends(get_read_db)):
+    """Получить активные бронирования, затрагивающие период (по умолчанию - с сегодняшнего дня)"""
+    date_from = date_from or str(date.today())
+    date_to = date_to or "9999-12-31"
+    try:
+        reservations = reservations_in_window(conn, date_from, date_to, car_id)
+    except ValueError:
+        return {"error": "Некорректная дата"}
+    
+    if not reservations:
+        return {"error": "Бронирования не найдены"}
+    
+    return [{
+        "reservation_id": r[0],
+        "car_id": r[1],
+        "customer_id": r[2],
+        "start_date": r[3],
+        "end_date": r[4],
+        "status": r[5]
+    } for r in reservations]
+
+@app.post("/reservations/{reservation_id}/cancel")
+def cancel_reservation(reservation_id: int, conn: sqlite3.Connection = Depends(get_db)):
+    """Отмена бронирования"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE Reservations SET status = 'cancelled' WHERE reservation_id = ? AND status = 'active'", (reservation_id,))
+        if cursor.rowcount == 0:
+            return {"error": "Активное бронирование не найдено"}
+        conn.commit()
+        return {"message": "Бронирование отменено"}
+    except Exception as e:
+        return {"error": f"Ошибка отмены бронирования: {str(e)}"}
+
+@app.delete("/reservations/{reservation_id}")
+def delete_reservation(reservation_id: int, conn: sqlite3.Connection = Depends(get_db)):
+    """Удаление бронирования"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM Reservations WHERE reservation_id = ?", (reservation_id,))
+        conn.commit()
+        return {"message": "Бронирование удалено"}
+    except Exception as e:
+        return {"error": f"Ошибка удаления бронирования: {str(e)}"}
+
+# Техническое обслуживание
+@app.post("/maintenance/")
+def create_maintenance(car_id: int, maintenance_date: str, maintenance_type: str, cost: float, mileage: int, description: str = "", conn: sqlite3.Connection = Depends(get_db)):
+    """Добавление записи о техническом обслуживании"""
+    def insert(conn):
+        # Запись добавляется, только если автомобиль существует
+        row = conn.execute(
+            "INSERT INTO Maintenance (car_id, maintenance_date, maintenance_type, description, cost, mileage) "
+            "SELECT ?, ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM Cars WHERE car_id = ?) RETURNING maintenance_id",
+            (car_id, maintenance_date, maintenance_type, description, cost, mileage, car_id)
+        ).fetchone()
+        return row[0] if row else None
+    
+    try:
+        maintenance_id = execute_write(conn, insert)
+        if maintenance_id is None:
+            return {"error": "Автомобиль не найден"}
+        return {"maintenance_id": maintenance_id, "message": "Запись о ТО добавлена"}
+    except Exception as e:
+        return {"error": f"Ошибка добавления записи о ТО: {str(e)}"}
+
+@app.post("/maintenance/bulk")
+def create_maintenance_bulk(records: List[MaintenanceCreate], conn: sqlite3.Connection = Depends(get_db)):
+    """Массовое добавление записей о техническом обслуживании одной транзакцией"""
+    if len(records) > MAX_BULK_SIZE:
+        return {"error": f"Слишком много записей (максимум {MAX_BULK_SIZE})"}
+    try:
+        # Проверяем существование автомобилей одним запросом
+        known_cars = existing_ids(conn, "Cars", "car_id", [m.car_id for m in records])
+        rejected = {i: "Автомобиль не найден" for i, m in enumerate(records) if m.car_id not in known_cars}
+        rows = [(m.car_id, m.maintenance_date, m.maintenance_type, m.description, m.cost, m.mileage) for m in records]
+        return bulk_insert(conn, "Maintenance", "maintenance_id",
+                           ("car_id", "maintenance_date", "maintenance_type", "description", "cost", "mileage"), rows, rejected)
+    except Exception as e:
+        return {"error": f"Ошибка массового добавления записей о ТО: {str(e)}"}
+
+@app.get("/maintenance/{car_id}", responses={200: {"model": List[MaintenanceRecord]}})
+def get_car_maintenance(car_id: int, conn: sqlite3.Connection = Depends(get_read_db)):
+    """Получить историю ТО для автомобиля"""
+    cursor = conn.cursor()
+    cursor.row_factory = maintenance_row
+    cursor.execute('''
+        SELECT m.maintenance_id, m.maintenance_date, m.maintenance_type, m.description, m.cost, m.mileage
+        FROM Maintenance m
+        JOIN Cars c ON m.car_id = c.car_id
+        WHERE m.car_id = ?
+        ORDER BY m.maintenance_date DESC
+    ''', (car_id,))
+    maintenance_records = cursor.fetchall()
+    
+    if not maintenance_records:
+        return {"error": "Записи о ТО не найдены"}
+    
+    return FastJSONResponse(maintenance_records)
+
+# Статистика
+@app.get("/stats/rentals")
+def get_rental_stats(conn: sqlite3.Connection = Depends(get_read_db)):
+    """Получить статистику по арендам"""
+    cursor = conn.cursor()
+    
+    # Сводная строка поддерживается триггерами на Rentals (см. migrations.py)
+    cursor.execute("SELECT total_rentals, active_rentals, total_revenue, completed_days, completed_returns FROM RentalStats WHERE id = 1")
+    total_rentals, active_rentals, total_revenue, completed_days, completed_returns = cursor.fetchone()
+    
+    # Средняя продолжительность аренды
+    avg_rental_days = completed_days / completed_returns if completed_returns else 0
+    
+    return {
+        "total_rentals": total_rentals,
+        "active_rentals": active_rentals,
+        "total_revenue": round(total_revenue, 2),
+        "avg_rental_days": round(avg_rental_days, 1)
+    }
+
+# Начало периода для группировки дневной выручки и поле группировки
+REVENUE_PERIODS = {
+    "day": "rd.day",
+    "week": "date(rd.day, '-6 days', 'weekday 1')",
+    "month": "strftime('%Y-%m-01', rd.day)",
+}
+REVENUE_GROUPS = {
+    "brand": "c.brand",
+    "fuel_type": "c.fuel_type",
+    "car": "rd.car_id",
+}
+
+@app.get("/stats/revenue")
+def get_revenue_stats(granularity: str = "day", group_by: str = None, date_from: str = Query(None, alias="from"),
+                      date_to: str = Query(None, alias="to"), conn: sqlite3.Connection = Depends(get_read_db)):
+    """Выручка по дням, неделям или месяцам (по дате возврата), с разбивкой по марке, типу топлива или автомобилю"""
+    if granularity not in REVENUE_PERIODS:
+        return {"error": "Неподдерживаемая детализация (day, week, month)"}
+    if group_by is not None and group_by not in REVENUE_GROUPS:
+        return {"error": "Неподдерживаемая группировка (brand, fuel_type, car)"}
+    
+    period = REVENUE_PERIODS[granularity]
+    group = REVENUE_GROUPS[group_by] if group_by else "NULL"
+    conditions = []
+    params = []
+    if date_from is not None:
+        conditions.append("rd.day >= ?")
+        params.append(date_from)
+    if date_to is not None:
+        conditions.append("rd.day < ?")
+        params.append(date_to)
+    
+    # Читаем готовые дневные суммы из RevenueDaily, а не строки Rentals
+    query = f"SELECT {period} AS period, {group} AS grp, SUM(rd.rentals), SUM(rd.revenue) FROM RevenueDaily rd"
+    if group_by in ("brand", "fuel_type"):
+        query += " JOIN Cars c ON rd.car_id = c.car_id"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " GROUP BY period, grp ORDER BY period, grp"
+    rows = conn.execute(query, params).fetchall()
+    
+    if not rows:
+        return {"error": "Нет выручки за период"}
+    
+    result = []
+    for period_start, grp, rentals, revenue in rows:
+        item = {"period": period_start, "rentals": rentals, "revenue": round(revenue, 2)}
+        if group_by:
+            item[group_by] = grp
+        result.append(item)
+    return result
+
+@app.get("/stats/utilization")
+def get_utilization_stats(date_from: str = Query(..., alias="from"), date_to: str = Query(..., alias="to"),
+                          least_first: bool = False, limit: int = None, conn: sqlite3.Connection = Depends(get_read_db)):
+    """Загрузка автомобилей за период [from, to): доля дней в аренде по каждому автомобилю"""
+    if limit is not None and limit < 1:
+        return {"error": "limit должен быть положительным"}
+    try:
+        report = utilization(conn, date_from, date_to, least_first, limit)
+    except ValueError:
+        return {"error": "Некорректный период"}
+    
+    if not report:
+        return {"error": "Список автомобилей пуст"}
+    
+    return report
+
+@app.get("/stats/cars")
+def get_car_stats(conn: sqlite3.Connection = Depends(get_read_db)):
+    """Получить статистику по автомобилям"""
+    # Результат кэшируется до первой записи в Cars или Rentals
+    versions = table_versions(conn, "Cars", "Rentals")
+    return cache.get_or_compute("car_stats", versions, lambda: compute_car_stats(conn))
+
+def compute_car_stats(conn):
+    """Статистика по автомобилям одним запросом: группы по маркам и самый популярный автомобиль"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT 'brand', brand, NULL, COUNT(*), SUM(is_available = 1)
+        FROM Cars
+        GROUP BY brand
+        UNION ALL
+        SELECT * FROM (
+            SELECT 'popular', c.brand, c.model, COUNT(*) AS rental_count, NULL
+            FROM Rentals r
+            JOIN Cars c ON c.car_id = r.car_id
+            GROUP BY r.car_id
+            ORDER BY rental_count DESC, r.car_id
+            LIMIT 1
+        )
+    ''')
+    rows = cursor.fetchall()
+    
+    cars_by_brand = [row for row in rows if row[0] == 'brand']
+    popular_car = next((row for row in rows if row[0] == 'popular'), None)
+    
+    result = {
+        "total_cars": sum(c[3] for c in cars_by_brand),
+        "available_cars": sum(c[4] for c in cars_by_brand),
+        "cars_by_brand": [{"brand": c[1], "count": c[3]} for c in cars_by_brand]
+    }
+    
+    if popular_car:
+        result["most_popular_car"] = {
+            "brand": popular_car[1],
+            "model": popular_car[2],
+            "rental_count": popular_car[3]
+        }
+    
+    return result
+
+@app.post("/admin/reprice")
+def reprice_rentals(dry_run: bool = True, car_id: int = None, date_from: str = Query(None, alias="from"),
+                    date_to: str = Query(None, alias="to"), conn: sqlite3.Connection = Depends(get_db)):
+    """Пересчитать стоимость завершенных аренд по текущим тарифам (по умолчанию - только показать разницу)"""
+    try:
+        return reprice(conn, dry_run, car_id, date_from, date_to)
+    except ValueError:
+        return {"error": "Некорректная дата в записях аренды"}
+    except Exception as e:
+        return {"error": f"Ошибка переоценки аренд: {str(e)}"}
+
+@app.get("/stats/cache")
+def get_cache_stats():
+    """Получить счетчики попаданий и промахов кэша"""
+    return cache.stats()
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Метрики в текстовом формате Prometheus"""
+    cache_stats = cache.stats()
+    pools = {"write": pool.stats(), "read": read_pool.stats()}
+    snapshot = [
+        ("car_rental_cache_hits_total", "counter", "Попадания в кэш результатов", cache_stats["hits"]),
+        ("car_rental_cache_misses_total", "counter", "Промахи кэша результатов", cache_stats["misses"]),
+        ("car_rental_cache_hit_ratio", "gauge", "Доля попаданий в кэш результатов", cache_stats["hit_ratio"]),
+        ("car_rental_cache_entries", "gauge", "Записей в кэше результатов", cache_stats["entries"]),
+        ("car_rental_db_pool_connections", "gauge", "Соединения пулов: размер, открытые и свободные",
+         {(("pool", name), ("state", state)): value for name, stats in pools.items() for state, value in stats.items()}),
+    ]
+    if writer is not None:
+        snapshot += [
+            ("car_rental_group_commit_batches_total", "counter", "Зафиксированные пачки групповой фиксации", writer.batches),
+            ("car_rental_group_commit_operations_total", "counter", "Операции в пачках групповой фиксации", writer.operations),
+        ]
+    return PlainTextResponse(render(snapshot), media_type=PROMETHEUS_CONTENT_TYPE)
+
+# Удаление автомобиля
+@app.delete("/cars/{car_id}")
+def delete_car(car_id: int, conn: sqlite3.Connection = Depends(get_db)):
+    """Удаление автомобиля"""
+    cursor = conn.cursor()
+    try:
+        # Проверяем, нет ли активных аренд
+        cursor.execute("SELECT 1 FROM Rentals WHERE car_id = ? AND status = 'active'", (car_id,))
+        active_rental = cursor.fetchone()
+        
+        if active_rental:
+            return {"error": "Нельзя удалить автомобиль с активной арендой"}
+        
+        # Удаляем связанные записи
+        cursor.execute("DELETE FROM Maintenance WHERE car_id = ?", (car_id,))
+        cursor.execute("DELETE FROM Rentals WHERE car_id = ?", (car_id,))
+        cursor.execute("DELETE FROM Reservations WHERE car_id = ?", (car_id,))
+        cursor.execute("DELETE FROM Cars WHERE car_id = ?", (car_id,))
+        
+        conn.commit()
+        return {"message": "Автомобиль удален"}
+    except Exception as e:
+        return {"error": f"Ошибка удаления автомобиля: {str(e)}"}
+
+# Удаление клиента
+@app.delete("/customers/{customer_id}")
+def delete_customer(customer_id: int, conn: sqlite3.Connection = Depends(get_db)):
+    """Удаление клиента"""
+    cursor = conn.cursor()
+    try:
+        # Проверяем, нет ли активных аренд
+        cursor.execute("SELECT 1 FROM Rentals WHERE customer_id = ? AND status = 'active'", (customer_id,))
+        active_rental = cursor.fetchone()
+        
+        if active_rental:
+            return {"error": "Нельзя удалить клиента с активной арендой"}
+        
+        # Удаляем связанные записи об арендах и бронированиях
+        cursor.execute("DELETE FROM Rentals WHERE customer_id = ?", (customer_id,))
+        cursor.execute("DELETE FROM Reservations WHERE customer_id = ?", (customer_id,))
+        cursor.execute("DELETE FROM Customers WHERE customer_id = ?", (customer_id,))
+        
+        conn.commit()
+        return {"message": "Клиент удален"}
+    except Exception as e:
+        return {"error": f"Ошибка удаления клиента: {str(e)}"}
+
+# Удаление записи об аренде
+@app.delete("/rentals/{rental_id}")
+def delete_rental(rental_id: int, conn: sqlite3.Connection = Depends(get_db)):
+    """Удаление записи об аренде"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM Rentals WHERE rental_id = ?", (rental_id,))
+        conn.commit()
+        return {"message": "Запись об аренде удалена"}
+    except Exception as e:
+        return {"error": f"Ошибка удаления записи об аренде: {str(e)}"}
+
+# Удаление записи о ТО
+@app.delete("/maintenance/{maintenance_id}")
+def delete_maintenance(maintenance_id: int, conn: sqlite3.Connection = Depends(get_db)):
+    """Удаление записи о техническом обслуживании"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM Maintenance WHERE maintenance_id = ?", (maintenance_id,))
+        conn.commit()
+        return {"message": "Запись о ТО удалена"}
+    except Exception as e:
+        return {"error": f"Ошибка удаления записи о ТО: {str(e)}"}
+
+if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
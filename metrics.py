@@ -0,0 +1,244 @@
+import os
+import re
+import sqlite3
+from bisect import bisect_left
+from functools import lru_cache
+from time import perf_counter
+
+# Сбор метрик можно отключить переменной окружения (соединения и запросы тогда не оборачиваются)
+METRICS_ENABLED = os.environ.get("CAR_RENTAL_METRICS", "1") == "1"
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы корзин гистограмм: время HTTP-запроса, время SQL-выражения и ожидания (с), строк в ответе списка
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0)
+ROWS_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000)
+
+# Не более стольких различных меток выражений получают свою гистограмму, остальные учитываются как "other"
+# (метка - операция и таблица, поэтому на практике их несколько десятков)
+MAX_STATEMENTS = 500
+
+# Ключ ASGI scope, в который ответ списка записывает число строк (см. responses.FastJSONResponse)
+ROWS_SCOPE_KEY = "car_rental.rows"
+
+# Выражения, время которых - ожидание блокировки записи SQLite
+LOCK_STATEMENTS = {"BEGIN IMMEDIATE", "BEGIN EXCLUSIVE"}
+
+# Выражения управления транзакцией учитываются по ключевым словам (BEGIN IMMEDIATE, SAVEPOINT, ROLLBACK TO)
+TRANSACTION_VERBS = {"BEGIN", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE"}
+
+WHITESPACE_RE = re.compile(r"\s+")
+# Основная таблица выражения: после первого FROM (SELECT, DELETE), INTO (INSERT, REPLACE) или UPDATE
+TABLE_RE = {
+    "SELECT": re.compile(r"\bFROM\s+[\"`\[]?(\w+)", re.IGNORECASE),
+    "WITH": re.compile(r"\bFROM\s+[\"`\[]?(\w+)", re.IGNORECASE),
+    "DELETE": re.compile(r"\bFROM\s+[\"`\[]?(\w+)", re.IGNORECASE),
+    "INSERT": re.compile(r"\bINTO\s+[\"`\[]?(\w+)", re.IGNORECASE),
+    "REPLACE": re.compile(r"\bINTO\s+[\"`\[]?(\w+)", re.IGNORECASE),
+    "UPDATE": re.compile(r"^\s*UPDATE\s+(?:OR\s+\w+\s+)?[\"`\[]?(\w+)", re.IGNORECASE),
+}
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами.
+
+    Наблюдение - инкремент элемента заранее созданного списка без блокировок и
+    новых объектов; при гонке потоков изредка может потеряться одно наблюдение,
+    для метрик это приемлемо.
+    """
+
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Family:
+    """Метрика с набором меток: гистограммы или счетчики по значениям меток"""
+
+    def __init__(self, name, help_text, label_names, buckets=None, limit=None):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.limit = limit
+        self._children = {}
+
+    def labels(self, *values):
+        """Гистограмма для значений меток (создается при первом обращении)"""
+        child = self._children.get(values)
+        if child is None:
+            if self.limit is not None and len(self._children) >= self.limit:
+                values = ("other",) * len(values)
+            # setdefault атомарен: параллельные потоки получат один и тот же объект
+            child = self._children.setdefault(values, Histogram(self.buckets))
+        return child
+
+    def inc(self, values, amount=1):
+        """Увеличить счетчик для значений меток"""
+        self._children[values] = self._children.get(values, 0) + amount
+
+    def render(self, lines):
+        kind = "counter" if self.buckets is None else "histogram"
+        lines.append(f"# HELP {self.name} {self.help_text}")
+        lines.append(f"# TYPE {self.name} {kind}")
+        for values, child in list(self._children.items()):
+            labels = ",".join(f'{name}="{escape(value)}"' for name, value in zip(self.label_names, values))
+            suffix = f"{{{labels}}}" if labels else ""
+            if self.buckets is None:
+                lines.append(f"{self.name}{suffix} {child}")
+                continue
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            cumulative += child.counts[-1]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{suffix} {child.sum}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+requests_total = Family("car_rental_http_requests_total", "Число HTTP-запросов", ("method", "route", "status"))
+request_duration = Family("car_rental_http_request_duration_seconds", "Время обработки HTTP-запроса",
+                          ("method", "route"), REQUEST_BUCKETS)
+list_rows = Family("car_rental_list_rows", "Строк в ответе списка", ("method", "route"), ROWS_BUCKETS)
+sql_duration = Family("car_rental_sql_duration_seconds", "Время выполнения SQL-выражения (для SELECT - до первой строки)",
+                      ("statement",), SQL_BUCKETS, limit=MAX_STATEMENTS)
+lock_wait = Family("car_rental_db_lock_wait_seconds", "Ожидание блокировки записи (BEGIN IMMEDIATE)", (), SQL_BUCKETS)
+pool_wait = Family("car_rental_db_pool_wait_seconds", "Ожидание соединения из пула", ("pool",), SQL_BUCKETS)
+
+FAMILIES = [requests_total, request_duration, list_rows, sql_duration, lock_wait, pool_wait]
+
+
+@lru_cache(maxsize=2048)
+def statement_label(sql):
+    """Метка SQL-выражения: операция и основная таблица ("SELECT Cars", "UPDATE Rentals").
+
+    Текст запроса в метку не попадает: варианты фильтров поиска не плодят ряды.
+    None - выражение не учитывается (PRAGMA, DDL, ANALYZE).
+    """
+    text = WHITESPACE_RE.sub(" ", sql).strip()
+    verb = text.split(" ", 1)[0].upper()
+    if verb in TRANSACTION_VERBS:
+        words = text.upper().rstrip(";").split()
+        if verb == "BEGIN":
+            return " ".join(words[:2])
+        return "ROLLBACK TO" if verb == "ROLLBACK" and "TO" in words else verb
+    pattern = TABLE_RE.get(verb)
+    if pattern is None:
+        return None
+    match = pattern.search(text)
+    return f"{'SELECT' if verb == 'WITH' else verb} {match.group(1) if match else '?'}"
+
+
+def observe_statement(sql, elapsed):
+    label = statement_label(sql)
+    if label is None:
+        return
+    sql_duration.labels(label).observe(elapsed)
+    if label in LOCK_STATEMENTS:
+        lock_wait.labels().observe(elapsed)
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Курсор, замеряющий время execute/executemany по тексту выражения"""
+
+    def execute(self, sql, parameters=()):
+        started = perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            observe_statement(sql, perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            observe_statement(sql, perf_counter() - started)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Соединение, все выражения и фиксации которого проходят через TimedCursor"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        started = perf_counter()
+        try:
+            super().commit()
+        finally:
+            observe_statement("COMMIT", perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: число и время запросов по шаблону маршрута, строк в ответах списков"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Шаблон маршрута (/rentals/{rental_id}/return), а не путь - число рядов метрик ограничено
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            request_duration.labels(method, route).observe(perf_counter() - started)
+            requests_total.inc((method, route, str(status)))
+            rows = scope.get(ROWS_SCOPE_KEY)
+            if rows is not None:
+                list_rows.labels(method, route).observe(rows)
+
+
+def render(snapshot=()):
+    """Все метрики в текстовом формате Prometheus.
+
+    snapshot - значения, снятые в момент запроса: [(имя, тип, справка, значение
+    или {((метка, значение), ...): значение})].
+    """
+    lines = []
+    for family in FAMILIES:
+        family.render(lines)
+    for name, kind, help_text, values in snapshot:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in values.items():
+            label_text = ",".join(f'{k}="{escape(v)}"' for k, v in labels)
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    lines.append("")
+    return "\n".join(lines)
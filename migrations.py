@@ -0,0 +1,660 @@
+import argparse
+import sqlite3
+
+from db import DB_PATH, connect
+
+# Вклад одной строки Rentals в сводную таблицу RentalStats ({r} - NEW, OLD или Rentals)
+RENTAL_STATS_TERMS = {
+    "total_rentals": "1",
+    "active_rentals": "CASE WHEN {r}.status = 'active' THEN 1 ELSE 0 END",
+    "total_revenue": "CASE WHEN {r}.status = 'completed' THEN COALESCE({r}.total_cost, 0) ELSE 0 END",
+    "completed_days": "CASE WHEN {r}.status = 'completed' THEN COALESCE(julianday({r}.return_date) - julianday({r}.rental_date), 0) ELSE 0 END",
+    "completed_returns": "CASE WHEN {r}.status = 'completed' AND julianday({r}.return_date) - julianday({r}.rental_date) IS NOT NULL THEN 1 ELSE 0 END",
+}
+
+
+def rental_stats_backfill_sql():
+    """Пересчет RentalStats по всей таблице Rentals"""
+    columns = list(RENTAL_STATS_TERMS)
+    backfill = ", ".join(f"COALESCE(SUM({RENTAL_STATS_TERMS[c].format(r='Rentals')}), 0)" for c in columns)
+    return f'''
+        INSERT OR REPLACE INTO RentalStats (id, {", ".join(columns)})
+        SELECT 1, {backfill} FROM Rentals;
+    '''
+
+
+def rental_stats_sql():
+    """Таблица RentalStats, ее первичное заполнение и триггеры, поддерживающие ее при изменениях Rentals"""
+    columns = list(RENTAL_STATS_TERMS)
+    add_new = ", ".join(f"{c} = {c} + ({RENTAL_STATS_TERMS[c].format(r='NEW')})" for c in columns)
+    sub_old = ", ".join(f"{c} = {c} - ({RENTAL_STATS_TERMS[c].format(r='OLD')})" for c in columns)
+    replace = ", ".join(
+        f"{c} = {c} - ({RENTAL_STATS_TERMS[c].format(r='OLD')}) + ({RENTAL_STATS_TERMS[c].format(r='NEW')})"
+        for c in columns
+    )
+    return f'''
+        CREATE TABLE IF NOT EXISTS RentalStats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_rentals INTEGER NOT NULL DEFAULT 0,
+            active_rentals INTEGER NOT NULL DEFAULT 0,
+            total_revenue REAL NOT NULL DEFAULT 0,
+            completed_days REAL NOT NULL DEFAULT 0,
+            completed_returns INTEGER NOT NULL DEFAULT 0
+        );
+        {rental_stats_backfill_sql()}
+        CREATE TRIGGER IF NOT EXISTS trg_rental_stats_insert AFTER INSERT ON Rentals
+        BEGIN
+            UPDATE RentalStats SET {add_new} WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_rental_stats_update
+        AFTER UPDATE OF rental_date, return_date, total_cost, status ON Rentals
+        BEGIN
+            UPDATE RentalStats SET {replace} WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_rental_stats_delete AFTER DELETE ON Rentals
+        BEGIN
+            UPDATE RentalStats SET {sub_old} WHERE id = 1;
+        END;
+    '''
+
+
+def table_versions_sql(tables):
+    """Таблица TableVersions и триггеры, увеличивающие версию таблиц tables при любом их изменении"""
+    script = '''
+        CREATE TABLE IF NOT EXISTS TableVersions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+    '''
+    for table in tables:
+        script += f"\n        INSERT OR IGNORE INTO TableVersions (table_name, version) VALUES ('{table}', 0);\n"
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            script += f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_version_{event.lower()} AFTER {event} ON {table}
+        BEGIN
+            UPDATE TableVersions SET version = version + 1 WHERE table_name = '{table}';
+        END;
+'''
+    return script
+
+
+# Аренда, учитываемая в выручке ({r} - NEW, OLD или Rentals)
+REVENUE_COMPLETED = "{r}.status = 'completed' AND {r}.return_date IS NOT NULL"
+
+
+def revenue_daily_backfill_sql():
+    """Заполнение RevenueDaily по всей таблице Rentals"""
+    return f'''
+        INSERT OR REPLACE INTO RevenueDaily (day, car_id, rentals, revenue)
+        SELECT return_date, car_id, COUNT(*), COALESCE(SUM(total_cost), 0) FROM Rentals
+        WHERE {REVENUE_COMPLETED.format(r="Rentals")}
+        GROUP BY return_date, car_id;
+    '''
+
+
+def revenue_daily_sql():
+    """Таблица RevenueDaily (выручка по дню возврата и автомобилю), ее заполнение и триггеры на Rentals"""
+    completed = REVENUE_COMPLETED
+    add = '''
+            INSERT INTO RevenueDaily (day, car_id, rentals, revenue)
+            SELECT NEW.return_date, NEW.car_id, 1, COALESCE(NEW.total_cost, 0) WHERE {condition}
+            ON CONFLICT (day, car_id) DO UPDATE SET
+                rentals = rentals + excluded.rentals,
+                revenue = revenue + excluded.revenue;'''.format(condition=completed.format(r="NEW"))
+    subtract = '''
+            UPDATE RevenueDaily SET rentals = rentals - 1, revenue = revenue - COALESCE(OLD.total_cost, 0)
+            WHERE day = OLD.return_date AND car_id = OLD.car_id AND {condition};
+            DELETE FROM RevenueDaily WHERE day = OLD.return_date AND car_id = OLD.car_id AND rentals = 0;'''.format(
+        condition=completed.format(r="OLD"))
+    return f'''
+        CREATE TABLE IF NOT EXISTS RevenueDaily (
+            day DATE NOT NULL,
+            car_id INTEGER NOT NULL,
+            rentals INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, car_id)
+        ) WITHOUT ROWID;
+        {revenue_daily_backfill_sql()}
+        CREATE TRIGGER IF NOT EXISTS trg_revenue_daily_insert AFTER INSERT ON Rentals
+        BEGIN{add}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_revenue_daily_update
+        AFTER UPDATE OF car_id, return_date, total_cost, status ON Rentals
+        BEGIN{subtract}{add}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_revenue_daily_delete AFTER DELETE ON Rentals
+        BEGIN{subtract}
+        END;
+    '''
+
+
+# Дни аренды в отчете о загрузке: номер дня (от 1970-01-01) начала и конца, конец не включается;
+# активная аренда длится до плановой даты возврата, неверная дата дает NULL. {r} - префикс
+# столбцов ('NEW.', 'r.' или пустая строка: в выражениях индекса точка запрещена)
+RENTAL_START_DAY = "CAST(julianday({r}rental_date) - 2440587.5 AS INTEGER)"
+RENTAL_END_DAY = ("CAST(julianday(CASE WHEN {r}status = 'active' THEN {r}planned_return_date "
+                  "ELSE {r}return_date END) - 2440587.5 AS INTEGER)")
+
+
+def rental_overlaps_backfill_sql():
+    """Пересчет RentalOverlaps по всей таблице Rentals: аренды автомобиля идут по началу,
+    пересечение - начало раньше наибольшего конца предыдущих"""
+    return f'''
+        DELETE FROM RentalOverlaps;
+        INSERT INTO RentalOverlaps (car_id)
+        SELECT DISTINCT car_id FROM (
+            SELECT car_id, start_day, MAX(end_day) OVER (
+                PARTITION BY car_id ORDER BY start_day ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+            ) AS reach
+            FROM (
+                SELECT car_id, {RENTAL_START_DAY.format(r="")} AS start_day, {RENTAL_END_DAY.format(r="")} AS end_day
+                FROM Rentals WHERE status IN ('active', 'completed')
+            )
+            WHERE end_day > start_day
+        )
+        WHERE start_day < reach;
+    '''
+
+
+def rental_overlaps_sql():
+    """Индекс дней аренды по автомобилю, таблица RentalOverlaps (автомобили с пересекающимися
+    арендами), ее заполнение и триггеры на Rentals"""
+    start, end = RENTAL_START_DAY.format(r="NEW."), RENTAL_END_DAY.format(r="NEW.")
+    other_start, other_end = RENTAL_START_DAY.format(r="r."), RENTAL_END_DAY.format(r="r.")
+    flag = f'''
+            INSERT OR IGNORE INTO RentalOverlaps (car_id)
+            SELECT NEW.car_id FROM Rentals r
+            WHERE r.car_id = NEW.car_id AND r.rental_id != NEW.rental_id AND r.status IN ('active', 'completed')
+              AND {other_start} < {end} AND {other_end} > {start}
+              AND {end} > {start} AND {other_end} > {other_start}
+            LIMIT 1;'''
+    return f'''
+        -- Отчет о загрузке (reports.utilization) суммирует дни аренд автомобиля прямо по индексу,
+        -- не вычисляя дат: выражения в запросе те же, что в индексе
+        DROP INDEX IF EXISTS idx_rentals_utilization;
+        DELETE FROM DroppedSchema WHERE name = 'idx_rentals_utilization';
+        CREATE INDEX IF NOT EXISTS idx_rentals_car_days
+            ON Rentals (car_id, {RENTAL_START_DAY.format(r="")}, {RENTAL_END_DAY.format(r="")}, status);
+
+        -- Сумма верна, только если аренды автомобиля не пересекаются; остальные автомобили
+        -- отчет считает проходом по интервалам. Удаление аренды отметку не снимает: лишняя
+        -- отметка стоит только времени, а пропущенная исказила бы отчет
+        CREATE TABLE IF NOT EXISTS RentalOverlaps (
+            car_id INTEGER PRIMARY KEY
+        );
+        {rental_overlaps_backfill_sql()}
+        CREATE TRIGGER IF NOT EXISTS trg_rental_overlaps_insert AFTER INSERT ON Rentals
+        WHEN NEW.status IN ('active', 'completed')
+        BEGIN{flag}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_rental_overlaps_update
+        AFTER UPDATE OF car_id, rental_date, return_date, planned_return_date, status ON Rentals
+        WHEN NEW.status IN ('active', 'completed')
+        BEGIN{flag}
+        END;
+
+        ANALYZE Rentals;
+    '''
+
+
+# Поля клиента, по которым идет полнотекстовый поиск
+CUSTOMER_SEARCH_COLUMNS = ("first_name", "last_name", "email", "phone", "driver_license")
+
+
+def customer_search_sql():
+    """FTS5-индекс CustomerSearch над Customers (внешнее содержимое), его заполнение и триггеры синхронизации"""
+    columns = ", ".join(CUSTOMER_SEARCH_COLUMNS)
+    new_values = ", ".join(f"NEW.{c}" for c in CUSTOMER_SEARCH_COLUMNS)
+    old_values = ", ".join(f"OLD.{c}" for c in CUSTOMER_SEARCH_COLUMNS)
+    return f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS CustomerSearch USING fts5(
+            {columns},
+            content = 'Customers',
+            content_rowid = 'customer_id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        );
+
+        INSERT INTO CustomerSearch (CustomerSearch) VALUES ('rebuild');
+
+        CREATE TRIGGER IF NOT EXISTS trg_customer_search_insert AFTER INSERT ON Customers
+        BEGIN
+            INSERT INTO CustomerSearch (rowid, {columns}) VALUES (NEW.customer_id, {new_values});
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_customer_search_update AFTER UPDATE OF {columns} ON Customers
+        BEGIN
+            INSERT INTO CustomerSearch (CustomerSearch, rowid, {columns}) VALUES ('delete', OLD.customer_id, {old_values});
+            INSERT INTO CustomerSearch (rowid, {columns}) VALUES (NEW.customer_id, {new_values});
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_customer_search_delete AFTER DELETE ON Customers
+        BEGIN
+            INSERT INTO CustomerSearch (CustomerSearch, rowid, {columns}) VALUES ('delete', OLD.customer_id, {old_values});
+        END;
+    '''
+
+
+# Размер журнала AvailabilityLog: более старые записи удаляются триггером
+AVAILABILITY_LOG_RETENTION = 10000
+
+
+def availability_log_sql():
+    """Журнал интервалов занятости (+1 занят, -1 освобожден) для карты доступности в памяти.
+
+    Аренда занимает автомобиль на [rental_date, planned_return_date), бронирование -
+    на [start_date, end_date); в журнал попадают только записи в статусе 'active'.
+    Записи вида 'car' сообщают о добавлении, удалении или смене тарифа автомобиля.
+    """
+    script = f'''
+        CREATE TABLE IF NOT EXISTS AvailabilityLog (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            car_id INTEGER NOT NULL,
+            start_date DATE,
+            end_date DATE,
+            delta INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TRIGGER IF NOT EXISTS trg_availability_log_retention AFTER INSERT ON AvailabilityLog
+        BEGIN
+            DELETE FROM AvailabilityLog WHERE seq <= NEW.seq - {AVAILABILITY_LOG_RETENTION};
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_cars_availability_insert AFTER INSERT ON Cars
+        BEGIN
+            INSERT INTO AvailabilityLog (kind, car_id) VALUES ('car', NEW.car_id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_cars_availability_update AFTER UPDATE OF daily_rate, fuel_type ON Cars
+        BEGIN
+            INSERT INTO AvailabilityLog (kind, car_id) VALUES ('car', NEW.car_id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_cars_availability_delete AFTER DELETE ON Cars
+        BEGIN
+            INSERT INTO AvailabilityLog (kind, car_id) VALUES ('car', OLD.car_id);
+        END;
+    '''
+    for table, kind, start, end, columns in (
+        ("Rentals", "rental", "rental_date", "planned_return_date", "car_id, rental_date, planned_return_date, status"),
+        ("Reservations", "reservation", "start_date", "end_date", "car_id, start_date, end_date, status"),
+    ):
+        script += f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{kind}_availability_insert AFTER INSERT ON {table}
+        WHEN NEW.status = 'active'
+        BEGIN
+            INSERT INTO AvailabilityLog (kind, car_id, start_date, end_date, delta)
+            VALUES ('{kind}', NEW.car_id, NEW.{start}, NEW.{end}, 1);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_{kind}_availability_update AFTER UPDATE OF {columns} ON {table}
+        BEGIN
+            INSERT INTO AvailabilityLog (kind, car_id, start_date, end_date, delta)
+            SELECT '{kind}', OLD.car_id, OLD.{start}, OLD.{end}, -1 WHERE OLD.status = 'active';
+            INSERT INTO AvailabilityLog (kind, car_id, start_date, end_date, delta)
+            SELECT '{kind}', NEW.car_id, NEW.{start}, NEW.{end}, 1 WHERE NEW.status = 'active';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_{kind}_availability_delete AFTER DELETE ON {table}
+        WHEN OLD.status = 'active'
+        BEGIN
+            INSERT INTO AvailabilityLog (kind, car_id, start_date, end_date, delta)
+            VALUES ('{kind}', OLD.car_id, OLD.{start}, OLD.{end}, -1);
+        END;
+'''
+    return script
+
+
+# Миграции схемы: (версия, описание, SQL). Применяются строго по порядку,
+# каждая в своей транзакции, номер примененной версии пишется в schema_version.
+MIGRATIONS = [
+    (1, "Начальная схема", '''
+        CREATE TABLE IF NOT EXISTS Cars (
+            car_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            brand TEXT NOT NULL,
+            model TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            color TEXT NOT NULL,
+            license_plate TEXT UNIQUE NOT NULL,
+            daily_rate REAL NOT NULL,
+            is_available BOOLEAN DEFAULT 1,
+            mileage INTEGER DEFAULT 0,
+            fuel_type TEXT DEFAULT 'petrol'
+        );
+
+        CREATE TABLE IF NOT EXISTS Customers (
+            customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            phone TEXT NOT NULL,
+            driver_license TEXT UNIQUE NOT NULL,
+            address TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS Rentals (
+            rental_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            car_id INTEGER NOT NULL,
+            customer_id INTEGER NOT NULL,
+            rental_date DATE NOT NULL,
+            return_date DATE,
+            planned_return_date DATE NOT NULL,
+            total_cost REAL,
+            mileage_start INTEGER NOT NULL,
+            mileage_end INTEGER,
+            status TEXT DEFAULT 'active',
+            FOREIGN KEY (car_id) REFERENCES Cars (car_id),
+            FOREIGN KEY (customer_id) REFERENCES Customers (customer_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS Maintenance (
+            maintenance_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            car_id INTEGER NOT NULL,
+            maintenance_date DATE NOT NULL,
+            maintenance_type TEXT NOT NULL,
+            description TEXT,
+            cost REAL NOT NULL,
+            mileage INTEGER NOT NULL,
+            FOREIGN KEY (car_id) REFERENCES Cars (car_id)
+        );
+    '''),
+    (2, "Индексы для частых запросов", '''
+        CREATE INDEX IF NOT EXISTS idx_rentals_status_date ON Rentals (status, rental_date);
+        CREATE INDEX IF NOT EXISTS idx_rentals_car_status ON Rentals (car_id, status);
+        CREATE INDEX IF NOT EXISTS idx_rentals_customer_status ON Rentals (customer_id, status);
+        CREATE INDEX IF NOT EXISTS idx_rentals_planned_return ON Rentals (planned_return_date);
+        CREATE INDEX IF NOT EXISTS idx_maintenance_car_date ON Maintenance (car_id, maintenance_date);
+        ANALYZE;
+    '''),
+    (3, "Индекс для постраничного вывода аренд", '''
+        CREATE INDEX IF NOT EXISTS idx_rentals_date ON Rentals (rental_date);
+        ANALYZE;
+    '''),
+    (4, "Сводная статистика аренд", rental_stats_sql()),
+    (5, "Версии записи таблиц", table_versions_sql(["Cars", "Customers", "Rentals", "Maintenance"])),
+    (6, "Бронирования и R*Tree-индекс периодов", '''
+        CREATE TABLE IF NOT EXISTS Reservations (
+            reservation_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            car_id INTEGER NOT NULL,
+            customer_id INTEGER NOT NULL,
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            status TEXT DEFAULT 'active',
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (car_id) REFERENCES Cars (car_id),
+            FOREIGN KEY (customer_id) REFERENCES Customers (customer_id)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_reservations_customer ON Reservations (customer_id);
+        CREATE INDEX IF NOT EXISTS idx_reservations_car ON Reservations (car_id);
+
+        -- Активные бронирования: дни [start_day, end_day] включительно и car_id
+        CREATE VIRTUAL TABLE IF NOT EXISTS ReservationIndex USING rtree_i32(
+            id, start_day, end_day, car_min, car_max
+        );
+
+        CREATE TRIGGER IF NOT EXISTS trg_reservations_index_insert AFTER INSERT ON Reservations
+        WHEN NEW.status = 'active'
+        BEGIN
+            INSERT INTO ReservationIndex (id, start_day, end_day, car_min, car_max)
+            VALUES (
+                NEW.reservation_id,
+                CAST(julianday(NEW.start_date) - 2440587.5 AS INTEGER),
+                CAST(julianday(NEW.end_date) - 2440587.5 AS INTEGER) - 1,
+                NEW.car_id,
+                NEW.car_id
+            );
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_reservations_index_update AFTER UPDATE ON Reservations
+        BEGIN
+            DELETE FROM ReservationIndex WHERE id = OLD.reservation_id;
+            INSERT INTO ReservationIndex (id, start_day, end_day, car_min, car_max)
+            SELECT
+                NEW.reservation_id,
+                CAST(julianday(NEW.start_date) - 2440587.5 AS INTEGER),
+                CAST(julianday(NEW.end_date) - 2440587.5 AS INTEGER) - 1,
+                NEW.car_id,
+                NEW.car_id
+            WHERE NEW.status = 'active';
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_reservations_index_delete AFTER DELETE ON Reservations
+        BEGIN
+            DELETE FROM ReservationIndex WHERE id = OLD.reservation_id;
+        END;
+    ''' + table_versions_sql(["Reservations"])),
+    (7, "Журнал изменений занятости автомобилей", availability_log_sql()),
+    (8, "Ежедневная выручка по автомобилям", revenue_daily_sql()),
+    (9, "Просроченные аренды", '''
+        CREATE INDEX IF NOT EXISTS idx_rentals_status_planned ON Rentals (status, planned_return_date);
+
+        CREATE TABLE IF NOT EXISTS OverdueRentals (
+            rental_id INTEGER PRIMARY KEY,
+            detected_at DATE NOT NULL
+        );
+
+        -- Граница последнего прохода сканера: аренды с плановым возвратом раньше нее уже учтены
+        CREATE TABLE IF NOT EXISTS OverdueScan (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            scanned_until DATE
+        );
+        INSERT OR IGNORE INTO OverdueScan (id, scanned_until) VALUES (1, NULL);
+
+        -- Аренды, уже просроченные на момент записи, сканер не увидит - их учитывают триггеры
+        CREATE TRIGGER IF NOT EXISTS trg_overdue_insert AFTER INSERT ON Rentals
+        WHEN NEW.status = 'active' AND NEW.planned_return_date < (SELECT scanned_until FROM OverdueScan WHERE id = 1)
+        BEGIN
+            INSERT OR IGNORE INTO OverdueRentals (rental_id, detected_at) VALUES (NEW.rental_id, date('now', 'localtime'));
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_overdue_update AFTER UPDATE OF status, planned_return_date ON Rentals
+        BEGIN
+            DELETE FROM OverdueRentals
+            WHERE rental_id = OLD.rental_id
+              AND (NEW.status != 'active' OR NEW.planned_return_date >= (SELECT scanned_until FROM OverdueScan WHERE id = 1));
+            INSERT OR IGNORE INTO OverdueRentals (rental_id, detected_at)
+            SELECT NEW.rental_id, date('now', 'localtime')
+            WHERE NEW.status = 'active' AND NEW.planned_return_date < (SELECT scanned_until FROM OverdueScan WHERE id = 1);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_overdue_delete AFTER DELETE ON Rentals
+        BEGIN
+            DELETE FROM OverdueRentals WHERE rental_id = OLD.rental_id;
+        END;
+
+        ANALYZE;
+    '''),
+    (10, "Полнотекстовый поиск клиентов", customer_search_sql()),
+    (11, "Индексы для поиска автомобилей", '''
+        CREATE INDEX IF NOT EXISTS idx_cars_brand_model ON Cars (brand, model, year);
+        CREATE INDEX IF NOT EXISTS idx_cars_fuel_rate ON Cars (fuel_type, daily_rate);
+        CREATE INDEX IF NOT EXISTS idx_cars_available_rate ON Cars (is_available, daily_rate);
+        CREATE INDEX IF NOT EXISTS idx_cars_rate ON Cars (daily_rate);
+        CREATE INDEX IF NOT EXISTS idx_cars_year ON Cars (year);
+        ANALYZE;
+    '''),
+    (12, "Покрывающий индекс для отчета о загрузке", '''
+        -- Отчет читает аренды окна только из индекса, без обращения к строкам таблицы
+        CREATE INDEX IF NOT EXISTS idx_rentals_utilization
+            ON Rentals (status, rental_date, car_id, return_date, planned_return_date);
+        ANALYZE;
+    '''),
+    (13, "Индексы поиска автомобилей по фильтру и столбцу сортировки", '''
+        -- Для каждого фильтра-равенства поиска (search.car_search_query) - индекс по ставке и по году
+        CREATE INDEX IF NOT EXISTS idx_cars_brand_rate ON Cars (brand, daily_rate);
+        CREATE INDEX IF NOT EXISTS idx_cars_brand_year ON Cars (brand, year);
+        CREATE INDEX IF NOT EXISTS idx_cars_model_rate ON Cars (model, daily_rate);
+        CREATE INDEX IF NOT EXISTS idx_cars_model_year ON Cars (model, year);
+        CREATE INDEX IF NOT EXISTS idx_cars_fuel_year ON Cars (fuel_type, year);
+        CREATE INDEX IF NOT EXISTS idx_cars_available_year ON Cars (is_available, year);
+        ANALYZE Cars;
+    '''),
+    (14, "Определения индексов, снятых загрузчиком", '''
+        -- Загрузчик (loader.drop_schema) записывает сюда индексы в той же транзакции, что и удаляет их
+        CREATE TABLE IF NOT EXISTS DroppedIndexes (
+            name TEXT PRIMARY KEY,
+            sql TEXT NOT NULL
+        );
+    '''),
+    (15, "Снятые загрузчиком триггеры вместе с индексами", '''
+        -- Загрузчик снимает на время загрузки и построчные триггеры, см. restore_schema
+        ALTER TABLE DroppedIndexes RENAME TO DroppedSchema;
+        ALTER TABLE DroppedSchema ADD COLUMN type TEXT NOT NULL DEFAULT 'index';
+        ALTER TABLE DroppedSchema ADD COLUMN tbl_name TEXT;
+    '''),
+    (16, "Дни аренды по автомобилю для отчета о загрузке", rental_overlaps_sql()),
+]
+
+
+def split_statements(script):
+    """Разбить SQL-скрипт на отдельные выражения (с учетом тел триггеров)"""
+    statements = []
+    buffer = ""
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ""
+    if buffer.strip():
+        statements.append(buffer.strip())
+    return statements
+
+
+def current_version(conn):
+    """Текущая версия схемы (0 - миграции еще не применялись)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrate(conn, target=None):
+    """Применить недостающие миграции (до версии target), вернуть список примененных версий"""
+    applied = []
+    current_version(conn)
+
+    for version, description, script in MIGRATIONS:
+        if target is not None and version > target:
+            break
+
+        # Блокируем запись, чтобы параллельно стартующие процессы не применили миграцию дважды
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            already = conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,)).fetchone()
+            if not already:
+                for statement in split_statements(script):
+                    conn.execute(statement)
+                conn.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                    (version, description)
+                )
+                applied.append(version)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    restore_schema(conn)
+    return applied
+
+
+def refresh_derived_sql(tables):
+    """Пересчет данных, которые триггеры на tables ведут построчно, одним проходом.
+
+    Нужен после загрузки со снятыми триггерами (loader.drop_schema): итог тот же,
+    что дали бы триггеры, но без работы на каждую строку.
+    """
+    script = ""
+    if "Rentals" in tables:
+        script += rental_stats_backfill_sql()
+        script += "\n        DELETE FROM RevenueDaily;\n" + revenue_daily_backfill_sql()
+        script += '''
+        INSERT OR IGNORE INTO OverdueRentals (rental_id, detected_at)
+        SELECT rental_id, date('now', 'localtime') FROM Rentals
+        WHERE status = 'active' AND planned_return_date < (SELECT scanned_until FROM OverdueScan WHERE id = 1);
+    ''' + rental_overlaps_backfill_sql()
+    if "Customers" in tables:
+        script += "\n        INSERT INTO CustomerSearch (CustomerSearch) VALUES ('rebuild');\n"
+    if "Cars" in tables or "Rentals" in tables:
+        # Запись 'car' заставляет карту занятости перестроиться целиком
+        script += "\n        INSERT INTO AvailabilityLog (kind, car_id) VALUES ('car', 0);\n"
+    names = ", ".join(f"'{table}'" for table in tables)
+    script += f"\n        UPDATE TableVersions SET version = version + 1 WHERE table_name IN ({names});\n"
+    return script
+
+
+def restore_schema(conn):
+    """Вернуть индексы и триггеры, снятые загрузчиком; вернуть их имена.
+
+    Сначала создаются индексы, затем пересчитываются производные данные таблиц
+    со снятыми триггерами (refresh_derived_sql) и создаются сами триггеры - всё
+    в одной транзакции. Если загрузка прервалась, то же делает следующий migrate().
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'DroppedSchema'").fetchone()
+    if not exists or not conn.execute("SELECT 1 FROM DroppedSchema LIMIT 1").fetchone():
+        return []
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        dropped = conn.execute("SELECT name, type, tbl_name, sql FROM DroppedSchema ORDER BY name").fetchall()
+        missing = [
+            (name, kind, table, sql) for name, kind, table, sql in dropped
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?", (kind, name)).fetchone()
+        ]
+        for _, kind, _, sql in missing:
+            if kind == "index":
+                conn.execute(sql)
+        trigger_tables = sorted({table for _, kind, table, _ in missing if kind == "trigger"})
+        if trigger_tables:
+            for statement in split_statements(refresh_derived_sql(trigger_tables)):
+                conn.execute(statement)
+        for _, kind, _, sql in missing:
+            if kind == "trigger":
+                conn.execute(sql)
+        conn.execute("DELETE FROM DroppedSchema")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return [name for name, _, _, _ in dropped]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Миграции схемы базы данных проката")
+    parser.add_argument("command", choices=["migrate", "status"], nargs="?", default="migrate")
+    parser.add_argument("--db", default=DB_PATH, help="Путь к файлу базы данных")
+    parser.add_argument("--target", type=int, default=None, help="Применить миграции до указанной версии")
+    args = parser.parse_args()
+
+    conn = connect(args.db, timed=False)
+    try:
+        if args.command == "status":
+            version = current_version(conn)
+            print(f"Текущая версия схемы: {version}")
+            for number, description, _ in MIGRATIONS:
+                mark = "x" if number <= version else " "
+                print(f"  [{mark}] {number}: {description}")
+        else:
+            applied = migrate(conn, args.target)
+            if applied:
+                print(f"Применены миграции: {', '.join(str(v) for v in applied)}")
+            else:
+                print("Схема уже актуальна")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
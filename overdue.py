@@ -0,0 +1,50 @@
+import asyncio
+import logging
+import os
+from datetime import date
+
+# Период между проходами сканера просроченных аренд, в секундах
+SCAN_INTERVAL = float(os.environ.get("CAR_RENTAL_OVERDUE_SCAN_SECONDS", "300"))
+
+logger = logging.getLogger(__name__)
+
+
+def scan_overdue(conn, today=None):
+    """Отметить аренды, плановый возврат которых прошел со времени прошлого прохода.
+
+    Читается только диапазон индекса (status, planned_return_date) между
+    прошлой границей и сегодняшним днем. Возвращает число новых записей.
+    """
+    today = today or str(date.today())
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        scanned_until = conn.execute("SELECT scanned_until FROM OverdueScan WHERE id = 1").fetchone()[0]
+        cursor = conn.execute('''
+            INSERT OR IGNORE INTO OverdueRentals (rental_id, detected_at)
+            SELECT rental_id, ? FROM Rentals
+            WHERE status = 'active' AND planned_return_date >= ? AND planned_return_date < ?
+        ''', (today, scanned_until or "", today))
+        found = cursor.rowcount
+        conn.execute("UPDATE OverdueScan SET scanned_until = ? WHERE id = 1 AND (scanned_until IS NULL OR scanned_until < ?)",
+                     (today, today))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return found
+
+
+async def run_scanner(pool, interval=SCAN_INTERVAL):
+    """Фоновая задача: проход сканера сразу и затем каждые interval секунд"""
+    def scan():
+        with pool.connection() as conn:
+            return scan_overdue(conn)
+
+    while True:
+        try:
+            found = await asyncio.to_thread(scan)
+            if found:
+                logger.info("Найдено просроченных аренд: %d", found)
+        except Exception:
+            logger.exception("Ошибка сканирования просроченных аренд")
+        await asyncio.sleep(interval)
@@ -0,0 +1,38 @@
+import base64
+import json
+
+# Размер страницы по умолчанию и верхняя граница для параметра limit
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def page_size(limit):
+    """Нормализовать запрошенный размер страницы"""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(*values):
+    """Упаковать ключ последней строки страницы в непрозрачный курсор"""
+    raw = json.dumps(values, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    """Распаковать курсор из size значений; ValueError, если курсор поврежден"""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Некорректный курсор")
+    if not all(isinstance(v, (str, int, float)) and not isinstance(v, bool) for v in values):
+        raise ValueError("Некорректный курсор")
+    return values
+
+
+def split_page(rows, size, key):
+    """Отрезать лишнюю строку (запрос делается с LIMIT size + 1) и построить next_cursor"""
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    return rows, encode_cursor(*key(rows[-1]))
@@ -0,0 +1,104 @@
+import numpy as np
+
+from reservations import to_day
+
+# Минимальный оплачиваемый срок аренды в днях
+MIN_RENTAL_DAYS = 1
+
+# Штраф за каждый день просрочки - доля дневной ставки
+OVERDUE_PENALTY_RATE = 0.5
+
+# Сколько измененных аренд показывать в отчете переоценки
+REPRICE_SAMPLE_SIZE = 20
+
+# Изменения стоимости меньше копейки считаются погрешностью округления
+COST_TOLERANCE = 0.005
+
+
+def rental_cost(rental_date, return_date, planned_return_date, daily_rate):
+    """Стоимость одной аренды: (оплаченные дни, итог); ValueError при неверной дате"""
+    return_day = to_day(return_date)
+    days_rented = max(return_day - to_day(rental_date), MIN_RENTAL_DAYS)
+    overdue_days = max(return_day - to_day(planned_return_date), 0)
+    return days_rented, days_rented * daily_rate + overdue_days * daily_rate * OVERDUE_PENALTY_RATE
+
+
+def overdue_penalty(planned_return_date, as_of, daily_rate):
+    """Штраф за просрочку на дату as_of: (дни просрочки, сумма); ValueError при неверной дате"""
+    overdue_days = max(to_day(as_of) - to_day(planned_return_date), 0)
+    return overdue_days, overdue_days * daily_rate * OVERDUE_PENALTY_RATE
+
+
+def rental_costs(rental_days, return_days, planned_days, daily_rates):
+    """То же правило для целых столбцов аренд: массивы номеров дней и ставок"""
+    days_rented = np.maximum(return_days - rental_days, MIN_RENTAL_DAYS)
+    overdue_days = np.maximum(return_days - planned_days, 0)
+    return days_rented, days_rented * daily_rates + overdue_days * daily_rates * OVERDUE_PENALTY_RATE
+
+
+def to_days(dates):
+    """Столбец дат YYYY-MM-DD в массив номеров дней (ValueError при неверной дате)"""
+    return np.array(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+def reprice(conn, dry_run=True, car_id=None, date_from=None, date_to=None, sample=REPRICE_SAMPLE_SIZE):
+    """Пересчитать стоимость завершенных аренд по текущим ставкам автомобилей.
+
+    Расчет идет по столбцам NumPy, а не построчно; при dry_run возвращается
+    только разница, иначе измененные суммы записываются одной транзакцией.
+    """
+    conditions = ["r.status = 'completed'", "r.return_date IS NOT NULL"]
+    params = []
+    if car_id is not None:
+        conditions.append("r.car_id = ?")
+        params.append(car_id)
+    if date_from is not None:
+        conditions.append("r.rental_date >= ?")
+        params.append(date_from)
+    if date_to is not None:
+        conditions.append("r.rental_date < ?")
+        params.append(date_to)
+
+    # При записи блокируем базу до чтения, чтобы разница считалась по актуальным данным
+    conn.execute("BEGIN" if dry_run else "BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(f'''
+            SELECT r.rental_id, r.rental_date, r.return_date, r.planned_return_date, r.total_cost, c.daily_rate
+            FROM Rentals r JOIN Cars c ON r.car_id = c.car_id
+            WHERE {" AND ".join(conditions)}
+        ''', params).fetchall()
+
+        changes = []
+        total_before = total_after = 0.0
+        if rows:
+            rental_ids, rental_dates, return_dates, planned_dates, old_costs, daily_rates = zip(*rows)
+            rental_ids = np.array(rental_ids, dtype=np.int64)
+            old_costs = np.array([np.nan if cost is None else cost for cost in old_costs], dtype=np.float64)
+            _, new_costs = rental_costs(to_days(rental_dates), to_days(return_dates), to_days(planned_dates),
+                                        np.array(daily_rates, dtype=np.float64))
+
+            changed = np.isnan(old_costs) | (np.abs(new_costs - old_costs) > COST_TOLERANCE)
+            total_before = float(np.nansum(old_costs))
+            total_after = float(new_costs.sum())
+            changes = list(zip(rental_ids[changed].tolist(), old_costs[changed].tolist(), new_costs[changed].tolist()))
+
+            if not dry_run:
+                conn.executemany("UPDATE Rentals SET total_cost = ? WHERE rental_id = ?",
+                                 [(new_cost, rental_id) for rental_id, _, new_cost in changes])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return {
+        "dry_run": dry_run,
+        "rentals": len(rows),
+        "changed": len(changes),
+        "total_before": round(total_before, 2),
+        "total_after": round(total_after, 2),
+        "difference": round(total_after - total_before, 2),
+        "changes": [
+            {"rental_id": rental_id, "old_cost": None if np.isnan(old_cost) else old_cost, "new_cost": new_cost}
+            for rental_id, old_cost, new_cost in changes[:sample]
+        ]
+    }
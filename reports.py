@@ -0,0 +1,107 @@
+from itertools import chain
+
+import numpy as np
+
+from migrations import RENTAL_END_DAY, RENTAL_START_DAY
+from reservations import to_day
+
+
+def occupied_days(car_rows, starts, ends, car_count, window_days):
+    """Число занятых дней окна [0, window_days) для каждого автомобиля.
+
+    car_rows, starts, ends - массивы интервалов аренды (номер строки автомобиля
+    и дни относительно начала окна, конец не включается). Пересекающиеся
+    аренды одного автомобиля считаются один раз: интервалы сортируются и
+    каждый добавляет только часть, выходящую за максимальный конец предыдущих.
+    Чтобы накопленный максимум не переходил между автомобилями, дни сдвигаются
+    на car_row * (window_days + 1) - интервалы разных автомобилей не перекрываются.
+    """
+    span = window_days + 1
+    starts = np.clip(starts, 0, window_days)
+    ends = np.clip(ends, 0, window_days)
+    keep = starts < ends
+    if not keep.any():
+        return np.zeros(car_count, dtype=np.int64)
+
+    # Сдвинутое начало и длина упаковываются в один ключ: сортируется один массив, без argsort
+    offsets = car_rows[keep].astype(np.int64) * span
+    keys = (starts[keep] + offsets) * span + (ends[keep] - starts[keep])
+    keys.sort()
+    starts, lengths = np.divmod(keys, span)
+    ends = starts + lengths
+
+    reach = np.maximum.accumulate(ends)
+    previous = np.empty_like(reach)
+    previous[0] = -1
+    previous[1:] = reach[:-1]
+    covered = np.maximum(ends - np.maximum(starts, previous), 0)
+    return np.bincount(starts // span, weights=covered, minlength=car_count).astype(np.int64)
+
+
+def car_rows(car_ids, ids):
+    """Строки автомобилей (car_ids отсортирован) для ids и маска известных: аренды удаленных автомобилей отбрасываются"""
+    rows = np.minimum(np.searchsorted(car_ids, ids), len(car_ids) - 1)
+    return rows, car_ids[rows] == ids
+
+
+def utilization(conn, date_from, date_to, least_first=False, limit=None):
+    """Доля дней периода [date_from, date_to), когда автомобиль был в аренде.
+
+    Завершенные аренды занимают дни до даты возврата, активные - до
+    плановой даты возврата; аренды с неверными датами не учитываются.
+    Дни аренд, обрезанные окном, суммирует по автомобилю SQLite из индекса
+    idx_rentals_car_days; для автомобилей с пересекающимися арендами
+    (RentalOverlaps) сумма завысила бы занятость, их интервалы читаются и
+    считаются occupied_days. ValueError при неверной дате, пустом периоде или limit < 1.
+    """
+    window_start = to_day(date_from)
+    window_days = to_day(date_to) - window_start
+    if window_days <= 0:
+        raise ValueError("Пустой период")
+    if limit is not None and limit < 1:
+        raise ValueError("limit должен быть положительным")
+
+    start_day, end_day = RENTAL_START_DAY.format(r=""), RENTAL_END_DAY.format(r="")
+    window = f"status IN ('active', 'completed') AND {start_day} < :stop AND {end_day} > :start"
+    params = {"start": window_start, "stop": window_start + window_days}
+    cars = conn.execute("SELECT car_id, brand, model FROM Cars ORDER BY car_id").fetchall()
+    # Обрезка окном через CASE, а не MIN/MAX: без вызова функций на каждую аренду запрос заметно быстрее
+    totals = conn.execute(f'''
+        SELECT car_id, SUM(CASE WHEN {end_day} > :stop THEN :stop ELSE {end_day} END
+                           - CASE WHEN {start_day} < :start THEN :start ELSE {start_day} END)
+        FROM Rentals INDEXED BY idx_rentals_car_days
+        WHERE {window} AND {end_day} > {start_day}
+        GROUP BY car_id
+    ''', params).fetchall()
+    overlapping = conn.execute(f'''
+        SELECT car_id, {start_day} - :start, {end_day} - :start
+        FROM Rentals INDEXED BY idx_rentals_car_days
+        WHERE car_id IN (SELECT car_id FROM RentalOverlaps) AND {window}
+    ''', params).fetchall()
+
+    car_ids = np.array([car[0] for car in cars], dtype=np.int64)
+    days = np.zeros(len(cars), dtype=np.int64)
+    if totals and len(cars):
+        columns = np.fromiter(chain.from_iterable(totals), dtype=np.int64, count=2 * len(totals)).reshape(-1, 2)
+        rows, known = car_rows(car_ids, columns[:, 0])
+        days[rows[known]] = columns[known, 1]
+    if overlapping and len(cars):
+        columns = np.fromiter(chain.from_iterable(overlapping), dtype=np.int64,
+                              count=3 * len(overlapping)).reshape(-1, 3)
+        rows, known = car_rows(car_ids, columns[:, 0])
+        exact = occupied_days(rows[known], columns[known, 1], columns[known, 2], len(cars), window_days)
+        rows = np.unique(rows[known])
+        days[rows] = exact[rows]
+
+    order = np.argsort(days, kind="stable") if least_first else np.arange(len(cars))
+    if limit is not None:
+        order = order[:limit]
+    # Числа переводятся в int одним tolist(), доля считается один раз на каждое встречающееся число дней
+    percents = {rented_days: round(100.0 * rented_days / window_days, 1) for rented_days in np.unique(days).tolist()}
+    return [{
+        "car_id": car_id,
+        "brand": brand,
+        "model": model,
+        "rented_days": rented_days,
+        "utilization": percents[rented_days]
+    } for (car_id, brand, model), rented_days in zip(map(cars.__getitem__, order.tolist()), days[order].tolist())]
@@ -0,0 +1,49 @@
+from datetime import date
+
+# Начало отсчета номеров дней; то же значение используется триггерами в SQL
+EPOCH = date(1970, 1, 1)
+
+
+def to_day(value):
+    """Номер дня для даты в формате YYYY-MM-DD (ValueError при неверной дате)"""
+    return (date.fromisoformat(value) - EPOCH).days
+
+
+def find_conflicts(conn, car_id, start_date, end_date, exclude_id=None):
+    """Активные бронирования автомобиля, пересекающиеся с периодом [start_date, end_date).
+
+    Поиск идет по R*Tree-индексу ReservationIndex, где каждое бронирование
+    хранится прямоугольником (дни, car_id), поэтому стоимость не растет
+    линейно с историей бронирований.
+    """
+    rows = conn.execute('''
+        SELECT id FROM ReservationIndex
+        WHERE car_min <= ? AND car_max >= ? AND start_day <= ? AND end_day >= ?
+    ''', (car_id, car_id, to_day(end_date) - 1, to_day(start_date))).fetchall()
+    return [row[0] for row in rows if row[0] != exclude_id]
+
+
+def active_rental_overlaps(conn, car_id, start_date, end_date):
+    """Пересекается ли период с текущей арендой автомобиля.
+
+    Аренда занимает автомобиль до плановой даты возврата, а если она наступила,
+    а автомобиль не вернули, - без ограничения, до фактического возврата.
+    """
+    row = conn.execute('''
+        SELECT 1 FROM Rentals
+        WHERE car_id = ? AND status = 'active'
+          AND rental_date < ? AND (planned_return_date > ? OR planned_return_date <= ?)
+    ''', (car_id, end_date, start_date, str(date.today()))).fetchone()
+    return row is not None
+
+
+def reservations_in_window(conn, start_date, end_date, car_id=None):
+    """Активные бронирования, затрагивающие окно [start_date, end_date), для одного или всех автомобилей"""
+    car_min, car_max = (car_id, car_id) if car_id is not None else (-2**31, 2**31 - 1)
+    return conn.execute('''
+        SELECT res.reservation_id, res.car_id, res.customer_id, res.start_date, res.end_date, res.status
+        FROM ReservationIndex idx
+        JOIN Reservations res ON res.reservation_id = idx.id
+        WHERE idx.car_min <= ? AND idx.car_max >= ? AND idx.start_day <= ? AND idx.end_day >= ?
+        ORDER BY res.start_date, res.reservation_id
+    ''', (car_max, car_min, to_day(end_date) - 1, to_day(start_date))).fetchall()
@@ -0,0 +1,32 @@
+from fastapi.responses import JSONResponse
+
+from metrics import ROWS_SCOPE_KEY
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен, без него работает стандартный json
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ, сериализуемый orjson (если установлен) без промежуточного jsonable_encoder.
+
+    Для списков (и конвертов {"items": [...]}) запоминает число строк - его
+    учитывает MetricsMiddleware.
+    """
+
+    rows = None
+
+    def render(self, content):
+        if isinstance(content, list):
+            self.rows = len(content)
+        elif isinstance(content, dict) and isinstance(content.get("items"), list):
+            self.rows = len(content["items"])
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+    async def __call__(self, scope, receive, send):
+        if self.rows is not None:
+            scope[ROWS_SCOPE_KEY] = self.rows
+        await super().__call__(scope, receive, send)
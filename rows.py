@@ -0,0 +1,28 @@
+# Поля строк ответа в порядке столбцов SELECT
+CAR_FIELDS = ("car_id", "brand", "model", "year", "color", "license_plate", "daily_rate", "is_available", "mileage", "fuel_type")
+CUSTOMER_FIELDS = ("customer_id", "first_name", "last_name", "email", "phone", "driver_license", "address")
+RENTAL_FIELDS = ("rental_id", "car_brand", "car_model", "license_plate", "customer_name", "rental_date", "return_date", "planned_return_date", "total_cost", "status")
+MAINTENANCE_FIELDS = ("maintenance_id", "maintenance_date", "maintenance_type", "description", "cost", "mileage")
+
+# Списки столбцов для SELECT, согласованные с полями выше
+CAR_COLUMNS = "car_id, brand, model, year, color, license_plate, daily_rate, is_available, mileage, fuel_type"
+CUSTOMER_COLUMNS = "customer_id, first_name, last_name, email, phone, driver_license, address"
+
+
+def fields_row(fields):
+    """Фабрика строк для cursor.row_factory: строка сразу становится словарем ответа"""
+    def factory(cursor, row):
+        return dict(zip(fields, row))
+    return factory
+
+
+def car_row(cursor, row):
+    """Строка Cars: is_available хранится числом, а в ответе - логическое значение"""
+    car = dict(zip(CAR_FIELDS, row))
+    car["is_available"] = bool(car["is_available"])
+    return car
+
+
+customer_row = fields_row(CUSTOMER_FIELDS)
+rental_row = fields_row(RENTAL_FIELDS)
+maintenance_row = fields_row(MAINTENANCE_FIELDS)
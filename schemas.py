@@ -0,0 +1,101 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+# Входные данные для массовой загрузки
+class CarCreate(BaseModel):
+    brand: str
+    model: str
+    year: int
+    color: str
+    license_plate: str
+    daily_rate: float
+    mileage: int = 0
+    fuel_type: str = "petrol"
+
+
+class CustomerCreate(BaseModel):
+    first_name: str
+    last_name: str
+    email: str
+    phone: str
+    driver_license: str
+    address: str = ""
+
+
+class MaintenanceCreate(BaseModel):
+    car_id: int
+    maintenance_date: str
+    maintenance_type: str
+    cost: float
+    mileage: int
+    description: str = ""
+
+
+# Возврат автомобиля в пакетной обработке
+class RentalReturn(BaseModel):
+    rental_id: int
+    return_date: str
+    mileage_end: int
+
+
+# Модели ответов (описание схемы в OpenAPI; поля совпадают с rows.py)
+class Car(BaseModel):
+    car_id: int
+    brand: str
+    model: str
+    year: int
+    color: str
+    license_plate: str
+    daily_rate: float
+    is_available: bool
+    mileage: int
+    fuel_type: str
+
+
+class Customer(BaseModel):
+    customer_id: int
+    first_name: str
+    last_name: str
+    email: str
+    phone: str
+    driver_license: str
+    address: Optional[str] = None
+
+
+class Rental(BaseModel):
+    rental_id: int
+    car_brand: str
+    car_model: str
+    license_plate: str
+    customer_name: str
+    rental_date: str
+    return_date: Optional[str] = None
+    planned_return_date: str
+    total_cost: Optional[float] = None
+    status: str
+
+
+class MaintenanceRecord(BaseModel):
+    maintenance_id: int
+    maintenance_date: str
+    maintenance_type: str
+    description: Optional[str] = None
+    cost: float
+    mileage: int
+
+
+class CarPage(BaseModel):
+    items: List[Car]
+    next_cursor: Optional[str] = None
+
+
+class CustomerPage(BaseModel):
+    items: List[Customer]
+    next_cursor: Optional[str] = None
+
+
+class RentalPage(BaseModel):
+    items: List[Rental]
+    next_cursor: Optional[str] = None
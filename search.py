@@ -0,0 +1,113 @@
+import re
+
+from rows import CAR_COLUMNS
+
+# Число результатов поиска по умолчанию и верхняя граница
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# Слова запроса: буквы и цифры, как их делит токенизатор unicode61
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def search_limit(limit):
+    """Нормализовать запрошенное число результатов поиска"""
+    if limit is None:
+        return DEFAULT_SEARCH_LIMIT
+    return max(1, min(limit, MAX_SEARCH_LIMIT))
+
+
+def fts_prefix_query(q):
+    """Строка запроса FTS5: каждое слово ищется как префикс, все слова обязательны.
+
+    Слова берутся в кавычки, поэтому операторы FTS5 из пользовательского
+    ввода не интерпретируются. None, если в запросе нет ни одного слова.
+    """
+    terms = TERM_RE.findall(q or "")
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+# Поддерживаемые сортировки; car_id замыкает порядок, чтобы он был однозначным
+CAR_SORTS = {
+    "car_id": "car_id",
+    "daily_rate": "daily_rate, car_id",
+    "-daily_rate": "daily_rate DESC, car_id DESC",
+    "year": "year, car_id",
+    "-year": "year DESC, car_id DESC",
+}
+
+
+# Индексы поиска (миграции 11 и 13): для фильтра-равенства - по столбцу сортировки,
+# чтобы строки шли из индекса уже упорядоченными; для диапазона - по самому столбцу
+CAR_EQUALITY_INDEXES = {
+    "brand": {"daily_rate": "idx_cars_brand_rate", "year": "idx_cars_brand_year"},
+    "model": {"daily_rate": "idx_cars_model_rate", "year": "idx_cars_model_year"},
+    "fuel_type": {"daily_rate": "idx_cars_fuel_rate", "year": "idx_cars_fuel_year"},
+    "is_available": {"daily_rate": "idx_cars_available_rate", "year": "idx_cars_available_year"},
+}
+CAR_RANGE_INDEXES = {"daily_rate": "idx_cars_rate", "year": "idx_cars_year"}
+
+
+def car_search_index(equalities, ranges, sort):
+    """Индекс поиска автомобилей; None - обход таблицы в порядке car_id (без фильтров).
+
+    equalities - столбцы с условием равенства (марка, модель, топливо, доступность),
+    ranges - столбцы с диапазоном. Марка с моделью ищутся по idx_cars_brand_model,
+    иначе берется индекс первого равенства по столбцу сортировки (для car_id - по
+    столбцу диапазона, если он есть), без равенств - индекс диапазона.
+    """
+    order_column = sort.lstrip("-")
+    if order_column == "car_id":
+        order_column = ranges[0] if ranges else None
+    if "brand" in equalities and "model" in equalities:
+        return "idx_cars_brand_model"
+    if equalities:
+        return CAR_EQUALITY_INDEXES[equalities[0]][order_column or "daily_rate"]
+    if ranges and order_column not in ranges:
+        order_column = ranges[0]
+    return CAR_RANGE_INDEXES.get(order_column)
+
+
+def car_search_query(brand=None, model=None, fuel_type=None, year_min=None, year_max=None,
+                     rate_min=None, rate_max=None, available_only=False, sort="daily_rate", limit=DEFAULT_SEARCH_LIMIT):
+    """Собрать параметризованный запрос поиска автомобилей: (sql, params); ValueError при неизвестной сортировке.
+
+    Индекс задается явно (INDEXED BY): со статистикой ANALYZE планировщик
+    предпочитает обойти индекс сортировки целиком вместо поиска по фильтру.
+    Любой фильтр дает SEARCH по индексу, без фильтров таблица или индекс
+    обходятся в порядке сортировки до LIMIT.
+    """
+    if sort not in CAR_SORTS:
+        raise ValueError(f"Неизвестная сортировка: {sort}")
+
+    conditions = []
+    params = []
+    equalities = []
+    for column, value in (("brand", brand), ("model", model), ("fuel_type", fuel_type)):
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+            equalities.append(column)
+    if available_only:
+        conditions.append("is_available = 1")
+        equalities.append("is_available")
+    ranges = []
+    for column, operator, value in (("year", ">=", year_min), ("year", "<=", year_max),
+                                    ("daily_rate", ">=", rate_min), ("daily_rate", "<=", rate_max)):
+        if value is not None:
+            conditions.append(f"{column} {operator} ?")
+            params.append(value)
+            if column not in ranges:
+                ranges.append(column)
+
+    sql = f"SELECT {CAR_COLUMNS} FROM Cars"
+    index = car_search_index(equalities, ranges, sort)
+    if index:
+        sql += f" INDEXED BY {index}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {CAR_SORTS[sort]} LIMIT ?"
+    params.append(limit)
+    return sql, params
@@ -1,626 +1,1864 @@
-import unittest
-import requests
-import time
-from datetime import date, timedelta
-
-
-class TestCarRentalAPI(unittest.TestCase):
-    BASE_URL = "http://localhost:8000"
-    
-    def setUp(self):
-        self.timestamp = int(time.time())
-        self.created_ids = {
-            'cars': [],
-            'customers': [],
-            'rentals': [],
-            'maintenance': []
-        }
-
-    def tearDown(self):
-        # Очистка созданных данных после каждого теста
-        for maintenance_id in self.created_ids['maintenance']:
-            try:
-                requests.delete(f"{self.BASE_URL}/maintenance/{maintenance_id}")
-            except:
-                pass
-        
-        for rental_id in self.created_ids['rentals']:
-            try:
-                requests.delete(f"{self.BASE_URL}/rentals/{rental_id}")
-            except:
-                pass
-        
-        for customer_id in self.created_ids['customers']:
-            try:
-                requests.delete(f"{self.BASE_URL}/customers/{customer_id}")
-            except:
-                pass
-        
-        for car_id in self.created_ids['cars']:
-            try:
-                requests.delete(f"{self.BASE_URL}/cars/{car_id}")
-            except:
-                pass
-
-    def test_01_get_cars(self):
-        """Тест получения всех автомобилей"""
-        response = requests.get(f"{self.BASE_URL}/cars/")
-        self.assertEqual(response.status_code, 200)
-        self.assertIsInstance(response.json(), (list, dict))
-
-    def test_02_get_available_cars(self):
-        """Тест получения только доступных автомобилей"""
-        response = requests.get(f"{self.BASE_URL}/cars/", params={"available_only": True})
-        self.assertEqual(response.status_code, 200)
-        self.assertIsInstance(response.json(), (list, dict))
-
-    def test_03_create_car(self):
-        """Тест создания автомобиля"""
-        data = {
-            'brand': f'Brand_{self.timestamp}',
-            'model': f'Model_{self.timestamp}',
-            'year': 2020 + (self.timestamp % 5),
-            'color': 'Red',
-            'license_plate': f'TEST{self.timestamp}',
-            'daily_rate': 2000.0 + (self.timestamp % 1000),
-            'mileage': 15000,
-            'fuel_type': 'petrol'
-        }
-        response = requests.post(f"{self.BASE_URL}/cars/", params=data)
-        self.assertEqual(response.status_code, 200)
-        car_id = response.json().get('car_id')
-        if car_id:
-            self.created_ids['cars'].append(car_id)
-
-    def test_04_update_car(self):
-        """Тест обновления автомобиля"""
-        # Сначала создаем автомобиль
-        create_data = {
-            'brand': 'Toyota',
-            'model': 'Camry',
-            'year': 2022,
-            'color': 'Black',
-            'license_plate': f'UPDATE{self.timestamp}',
-            'daily_rate': 2500.0,
-            'mileage': 10000,
-            'fuel_type': 'petrol'
-        }
-        create_response = requests.post(f"{self.BASE_URL}/cars/", params=create_data)
-        self.assertEqual(create_response.status_code, 200)
-        car_id = create_response.json().get('car_id')
-        
-        if car_id:
-            self.created_ids['cars'].append(car_id)
-            
-            # Обновляем автомобиль
-            update_data = {
-                'daily_rate': 2700.0,
-                'mileage': 12000,
-                'color': 'Dark Gray'
-            }
-            update_response = requests.put(f"{self.BASE_URL}/cars/{car_id}", params=update_data)
-            self.assertEqual(update_response.status_code, 200)
-
-    def test_05_get_customers(self):
-        """Тест получения всех клиентов"""
-        response = requests.get(f"{self.BASE_URL}/customers/")
-        self.assertEqual(response.status_code, 200)
-        self.assertIsInstance(response.json(), (list, dict))
-
-    def test_06_create_customer(self):
-        """Тест создания клиента"""
-        data = {
-            'first_name': f'John_{self.timestamp}',
-            'last_name': f'Doe_{self.timestamp}',
-            'email': f'john.doe{self.timestamp}@test.com',
-            'phone': f'+7916{self.timestamp % 1000000:06d}',
-            'driver_license': f'DL{self.timestamp}',
-            'address': f'Test address {self.timestamp}'
-        }
-        response = requests.post(f"{self.BASE_URL}/customers/", params=data)
-        self.assertEqual(response.status_code, 200)
-        customer_id = response.json().get('customer_id')
-        if customer_id:
-            self.created_ids['customers'].append(customer_id)
-
-    def test_07_update_customer(self):
-        """Тест обновления клиента"""
-        # Сначала создаем клиента
-        create_data = {
-            'first_name': 'Alice',
-            'last_name': 'Smith',
-            'email': f'alice.smith{self.timestamp}@test.com',
-            'phone': '+79160000001',
-            'driver_license': f'DL_UPDATE{self.timestamp}',
-            'address': 'Original address'
-        }
-        create_response = requests.post(f"{self.BASE_URL}/customers/", params=create_data)
-        self.assertEqual(create_response.status_code, 200)
-        customer_id = create_response.json().get('customer_id')
-        
-        if customer_id:
-            self.created_ids['customers'].append(customer_id)
-            
-            # Обновляем клиента
-            update_data = {
-                'phone': '+79169998877',
-                'address': f'Updated address {self.timestamp}'
-            }
-            update_response = requests.put(f"{self.BASE_URL}/customers/{customer_id}", params=update_data)
-            self.assertEqual(update_response.status_code, 200)
-
-    def test_08_get_rentals(self):
-        """Тест получения всех аренд"""
-        response = requests.get(f"{self.BASE_URL}/rentals/")
-        self.assertEqual(response.status_code, 200)
-        self.assertIsInstance(response.json(), (list, dict))
-
-    def test_09_create_rental(self):
-        """Тест создания аренды"""
-        # Сначала создаем автомобиль и клиента
-        car_data = {
-            'brand': 'Honda',
-            'model': 'Civic',
-            'year': 2023,
-            'color': 'White',
-            'license_plate': f'RENTAL{self.timestamp}',
-            'daily_rate': 1800.0,
-            'mileage': 5000,
-            'fuel_type': 'petrol'
-        }
-        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
-        car_id = car_response.json().get('car_id')
-        
-        customer_data = {
-            'first_name': 'Bob',
-            'last_name': 'Johnson',
-            'email': f'bob.johnson{self.timestamp}@test.com',
-            'phone': '+79160000002',
-            'driver_license': f'DL_RENTAL{self.timestamp}',
-            'address': 'Rental test address'
-        }
-        customer_response = requests.post(f"{self.BASE_URL}/customers/", params=customer_data)
-        customer_id = customer_response.json().get('customer_id')
-        
-        if car_id and customer_id:
-            self.created_ids['cars'].append(car_id)
-            self.created_ids['customers'].append(customer_id)
-            
-            # Создаем аренду
-            rental_data = {
-                'car_id': car_id,
-                'customer_id': customer_id,
-                'rental_date': str(date.today()),
-                'planned_return_date': str(date.today() + timedelta(days=3)),
-                'mileage_start': 5000
-            }
-            response = requests.post(f"{self.BASE_URL}/rentals/", params=rental_data)
-            self.assertEqual(response.status_code, 200)
-            rental_id = response.json().get('rental_id')
-            if rental_id:
-                self.created_ids['rentals'].append(rental_id)
-
-    def test_10_return_rental(self):
-        """Тест возврата автомобиля"""
-        # Сначала создаем автомобиль, клиента и аренду
-        car_data = {
-            'brand': 'Nissan',
-            'model': 'Altima',
-            'year': 2021,
-            'color': 'Blue',
-            'license_plate': f'RETURN{self.timestamp}',
-            'daily_rate': 2200.0,
-            'mileage': 20000,
-            'fuel_type': 'petrol'
-        }
-        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
-        car_id = car_response.json().get('car_id')
-        
-        customer_data = {
-            'first_name': 'Carol',
-            'last_name': 'Wilson',
-            'email': f'carol.wilson{self.timestamp}@test.com',
-            'phone': '+79160000003',
-            'driver_license': f'DL_RETURN{self.timestamp}',
-            'address': 'Return test address'
-        }
-        customer_response = requests.post(f"{self.BASE_URL}/customers/", params=customer_data)
-        customer_id = customer_response.json().get('customer_id')
-        
-        if car_id and customer_id:
-            self.created_ids['cars'].append(car_id)
-            self.created_ids['customers'].append(customer_id)
-            
-            # Создаем аренду
-            rental_data = {
-                'car_id': car_id,
-                'customer_id': customer_id,
-                'rental_date': str(date.today() - timedelta(days=2)),
-                'planned_return_date': str(date.today() + timedelta(days=1)),
-                'mileage_start': 20000
-            }
-            rental_response = requests.post(f"{self.BASE_URL}/rentals/", params=rental_data)
-            rental_id = rental_response.json().get('rental_id')
-            
-            if rental_id:
-                self.created_ids['rentals'].append(rental_id)
-                
-                # Возвращаем автомобиль
-                return_data = {
-                    'return_date': str(date.today()),
-                    'mileage_end': 20300
-                }
-                return_response = requests.post(f"{self.BASE_URL}/rentals/{rental_id}/return", params=return_data)
-                self.assertEqual(return_response.status_code, 200)
-                self.assertIn('total_cost', return_response.json())
-
-    def test_11_create_maintenance(self):
-        """Тест создания записи ТО"""
-        # Сначала создаем автомобиль
-        car_data = {
-            'brand': 'BMW',
-            'model': 'X5',
-            'year': 2020,
-            'color': 'Black',
-            'license_plate': f'MAINT{self.timestamp}',
-            'daily_rate': 3500.0,
-            'mileage': 30000,
-            'fuel_type': 'diesel'
-        }
-        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
-        car_id = car_response.json().get('car_id')
-        
-        if car_id:
-            self.created_ids['cars'].append(car_id)
-            
-            # Создаем запись ТО
-            maintenance_data = {
-                'car_id': car_id,
-                'maintenance_date': str(date.today()),
-                'maintenance_type': 'Замена масла',
-                'cost': 5000.0,
-                'mileage': 30000,
-                'description': f'Плановое ТО {self.timestamp}'
-            }
-            response = requests.post(f"{self.BASE_URL}/maintenance/", params=maintenance_data)
-            self.assertEqual(response.status_code, 200)
-            maintenance_id = response.json().get('maintenance_id')
-            if maintenance_id:
-                self.created_ids['maintenance'].append(maintenance_id)
-
-    def test_12_get_car_maintenance(self):
-        """Тест получения истории ТО автомобиля"""
-        # Сначала создаем автомобиль и запись ТО
-        car_data = {
-            'brand': 'Audi',
-            'model': 'A4',
-            'year': 2019,
-            'color': 'Silver',
-            'license_plate': f'MAINT_HIST{self.timestamp}',
-            'daily_rate': 2800.0,
-            'mileage': 40000,
-            'fuel_type': 'petrol'
-        }
-        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
-        car_id = car_response.json().get('car_id')
-        
-        if car_id:
-            self.created_ids['cars'].append(car_id)
-            
-            # Создаем запись ТО
-            maintenance_data = {
-                'car_id': car_id,
-                'maintenance_date': str(date.today()),
-                'maintenance_type': 'Технический осмотр',
-                'cost': 3000.0,
-                'mileage': 40000,
-                'description': 'Регулярный техосмотр'
-            }
-            maintenance_response = requests.post(f"{self.BASE_URL}/maintenance/", params=maintenance_data)
-            maintenance_id = maintenance_response.json().get('maintenance_id')
-            if maintenance_id:
-                self.created_ids['maintenance'].append(maintenance_id)
-            
-            # Получаем историю ТО
-            response = requests.get(f"{self.BASE_URL}/maintenance/{car_id}")
-            self.assertEqual(response.status_code, 200)
-
-    def test_13_get_rental_stats(self):
-        """Тест получения статистики аренд"""
-        response = requests.get(f"{self.BASE_URL}/stats/rentals")
-        self.assertEqual(response.status_code, 200)
-        stats = response.json()
-        self.assertIsInstance(stats, dict)
-        self.assertIn('total_rentals', stats)
-
-    def test_14_get_car_stats(self):
-        """Тест получения статистики автомобилей"""
-        response = requests.get(f"{self.BASE_URL}/stats/cars")
-        self.assertEqual(response.status_code, 200)
-        stats = response.json()
-        self.assertIsInstance(stats, dict)
-        self.assertIn('total_cars', stats)
-
-    def test_15_delete_car(self):
-        """Тест удаления автомобиля"""
-        # Сначала создаем автомобиль
-        create_data = {
-            'brand': 'Ford',
-            'model': 'Focus',
-            'year': 2022,
-            'color': 'Green',
-            'license_plate': f'DELETE{self.timestamp}',
-            'daily_rate': 1900.0,
-            'mileage': 10000,
-            'fuel_type': 'petrol'
-        }
-        create_response = requests.post(f"{self.BASE_URL}/cars/", params=create_data)
-        self.assertEqual(create_response.status_code, 200)
-        car_id = create_response.json().get('car_id')
-        
-        if car_id:
-            # Удаляем автомобиль
-            delete_response = requests.delete(f"{self.BASE_URL}/cars/{car_id}")
-            self.assertEqual(delete_response.status_code, 200)
-
-    def test_16_delete_customer(self):
-        """Тест удаления клиента"""
-        # Сначала создаем клиента
-        create_data = {
-            'first_name': 'David',
-            'last_name': 'Brown',
-            'email': f'david.brown{self.timestamp}@test.com',
-            'phone': '+79160000004',
-            'driver_license': f'DL_DELETE{self.timestamp}',
-            'address': 'Delete test address'
-        }
-        create_response = requests.post(f"{self.BASE_URL}/customers/", params=create_data)
-        self.assertEqual(create_response.status_code, 200)
-        customer_id = create_response.json().get('customer_id')
-        
-        if customer_id:
-            # Удаляем клиента
-            delete_response = requests.delete(f"{self.BASE_URL}/customers/{customer_id}")
-            self.assertEqual(delete_response.status_code, 200)
-
-    def test_17_delete_rental(self):
-        """Тест удаления аренды"""
-        # Сначала создаем автомобиль, клиента и аренду
-        car_data = {
-            'brand': 'Kia',
-            'model': 'Rio',
-            'year': 2023,
-            'color': 'Yellow',
-            'license_plate': f'DEL_RENT{self.timestamp}',
-            'daily_rate': 1600.0,
-            'mileage': 7000,
-            'fuel_type': 'petrol'
-        }
-        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
-        car_id = car_response.json().get('car_id')
-        
-        customer_data = {
-            'first_name': 'Emma',
-            'last_name': 'Davis',
-            'email': f'emma.davis{self.timestamp}@test.com',
-            'phone': '+79160000005',
-            'driver_license': f'DL_DEL_RENT{self.timestamp}',
-            'address': 'Delete rental test address'
-        }
-        customer_response = requests.post(f"{self.BASE_URL}/customers/", params=customer_data)
-        customer_id = customer_response.json().get('customer_id')
-        
-        if car_id and customer_id:
-            self.created_ids['cars'].append(car_id)
-            self.created_ids['customers'].append(customer_id)
-            
-            # Создаем аренду
-            rental_data = {
-                'car_id': car_id,
-                'customer_id': customer_id,
-                'rental_date': str(date.today()),
-                'planned_return_date': str(date.today() + timedelta(days=2)),
-                'mileage_start': 7000
-            }
-            rental_response = requests.post(f"{self.BASE_URL}/rentals/", params=rental_data)
-            rental_id = rental_response.json().get('rental_id')
-            
-            if rental_id:
-                # Удаляем аренду
-                delete_response = requests.delete(f"{self.BASE_URL}/rentals/{rental_id}")
-                self.assertEqual(delete_response.status_code, 200)
-
-    def test_18_delete_maintenance(self):
-        """Тест удаления записи ТО"""
-        # Сначала создаем автомобиль и запись ТО
-        car_data = {
-            'brand': 'Hyundai',
-            'model': 'Elantra',
-            'year': 2021,
-            'color': 'Orange',
-            'license_plate': f'DEL_MAINT{self.timestamp}',
-            'daily_rate': 1700.0,
-            'mileage': 25000,
-            'fuel_type': 'petrol'
-        }
-        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
-        car_id = car_response.json().get('car_id')
-        
-        if car_id:
-            self.created_ids['cars'].append(car_id)
-            
-            # Создаем запись ТО
-            maintenance_data = {
-                'car_id': car_id,
-                'maintenance_date': str(date.today()),
-                'maintenance_type': 'Замена тормозных колодок',
-                'cost': 8000.0,
-                'mileage': 25000,
-                'description': 'Замена передних тормозных колодок'
-            }
-            maintenance_response = requests.post(f"{self.BASE_URL}/maintenance/", params=maintenance_data)
-            maintenance_id = maintenance_response.json().get('maintenance_id')
-            
-            if maintenance_id:
-                # Удаляем запись ТО
-                delete_response = requests.delete(f"{self.BASE_URL}/maintenance/{maintenance_id}")
-                self.assertEqual(delete_response.status_code, 200)
-
-    def test_19_complete_workflow(self):
-        """Тест полного рабочего процесса аренды"""
-        # 1. Создаем автомобиль
-        car_data = {
-            'brand': 'Mercedes',
-            'model': 'C-Class',
-            'year': 2023,
-            'color': 'Black',
-            'license_plate': f'WORKFLOW{self.timestamp}',
-            'daily_rate': 4000.0,
-            'mileage': 8000,
-            'fuel_type': 'petrol'
-        }
-        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
-        self.assertEqual(car_response.status_code, 200)
-        car_id = car_response.json().get('car_id')
-        
-        # 2. Создаем клиента
-        customer_data = {
-            'first_name': 'Frank',
-            'last_name': 'Miller',
-            'email': f'frank.miller{self.timestamp}@test.com',
-            'phone': '+79160000006',
-            'driver_license': f'DL_WORKFLOW{self.timestamp}',
-            'address': 'Workflow test address'
-        }
-        customer_response = requests.post(f"{self.BASE_URL}/customers/", params=customer_data)
-        self.assertEqual(customer_response.status_code, 200)
-        customer_id = customer_response.json().get('customer_id')
-        
-        if car_id and customer_id:
-            self.created_ids['cars'].append(car_id)
-            self.created_ids['customers'].append(customer_id)
-            
-            # 3. Создаем аренду
-            rental_data = {
-                'car_id': car_id,
-                'customer_id': customer_id,
-                'rental_date': str(date.today() - timedelta(days=1)),
-                'planned_return_date': str(date.today() + timedelta(days=2)),
-                'mileage_start': 8000
-            }
-            rental_response = requests.post(f"{self.BASE_URL}/rentals/", params=rental_data)
-            self.assertEqual(rental_response.status_code, 200)
-            rental_id = rental_response.json().get('rental_id')
-            
-            if rental_id:
-                self.created_ids['rentals'].append(rental_id)
-                
-                # 4. Проверяем, что автомобиль стал недоступен
-                available_cars_response = requests.get(f"{self.BASE_URL}/cars/", params={"available_only": True})
-                self.assertEqual(available_cars_response.status_code, 200)
-                
-                # 5. Возвращаем автомобиль
-                return_data = {
-                    'return_date': str(date.today()),
-                    'mileage_end': 8150
-                }
-                return_response = requests.post(f"{self.BASE_URL}/rentals/{rental_id}/return", params=return_data)
-                self.assertEqual(return_response.status_code, 200)
-                
-                # 6. Создаем запись ТО
-                maintenance_data = {
-                    'car_id': car_id,
-                    'maintenance_date': str(date.today()),
-                    'maintenance_type': 'Мойка и чистка',
-                    'cost': 1500.0,
-                    'mileage': 8150,
-                    'description': 'После аренды'
-                }
-                maintenance_response = requests.post(f"{self.BASE_URL}/maintenance/", params=maintenance_data)
-                self.assertEqual(maintenance_response.status_code, 200)
-                maintenance_id = maintenance_response.json().get('maintenance_id')
-                
-                if maintenance_id:
-                    self.created_ids['maintenance'].append(maintenance_id)
-                
-                # 7. Проверяем статистику
-                rental_stats_response = requests.get(f"{self.BASE_URL}/stats/rentals")
-                self.assertEqual(rental_stats_response.status_code, 200)
-                
-                car_stats_response = requests.get(f"{self.BASE_URL}/stats/cars")
-                self.assertEqual(car_stats_response.status_code, 200)
-                
-                # 8. Проверяем данные
-                cars_response = requests.get(f"{self.BASE_URL}/cars/")
-                self.assertEqual(cars_response.status_code, 200)
-                
-                customers_response = requests.get(f"{self.BASE_URL}/customers/")
-                self.assertEqual(customers_response.status_code, 200)
-                
-                rentals_response = requests.get(f"{self.BASE_URL}/rentals/")
-                self.assertEqual(rentals_response.status_code, 200)
-                
-                maintenance_response = requests.get(f"{self.BASE_URL}/maintenance/{car_id}")
-                self.assertEqual(maintenance_response.status_code, 200)
-
-    def test_20_rental_with_overdue(self):
-        """Тест аренды с просрочкой возврата"""
-        # Создаем автомобиль и клиента
-        car_data = {
-            'brand': 'Volkswagen',
-            'model': 'Golf',
-            'year': 2022,
-            'color': 'Blue',
-            'license_plate': f'OVERDUE{self.timestamp}',
-            'daily_rate': 2300.0,
-            'mileage': 12000,
-            'fuel_type': 'petrol'
-        }
-        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
-        car_id = car_response.json().get('car_id')
-        
-        customer_data = {
-            'first_name': 'Grace',
-            'last_name': 'Taylor',
-            'email': f'grace.taylor{self.timestamp}@test.com',
-            'phone': '+79160000007',
-            'driver_license': f'DL_OVERDUE{self.timestamp}',
-            'address': 'Overdue test address'
-        }
-        customer_response = requests.post(f"{self.BASE_URL}/customers/", params=customer_data)
-        customer_id = customer_response.json().get('customer_id')
-        
-        if car_id and customer_id:
-            self.created_ids['cars'].append(car_id)
-            self.created_ids['customers'].append(customer_id)
-            
-            # Создаем аренду с прошлой датой
-            rental_data = {
-                'car_id': car_id,
-                'customer_id': customer_id,
-                'rental_date': str(date.today() - timedelta(days=5)),
-                'planned_return_date': str(date.today() - timedelta(days=2)),  # Просрочка на 3 дня
-                'mileage_start': 12000
-            }
-            rental_response = requests.post(f"{self.BASE_URL}/rentals/", params=rental_data)
-            rental_id = rental_response.json().get('rental_id')
-            
-            if rental_id:
-                self.created_ids['rentals'].append(rental_id)
-                
-                # Возвращаем с просрочкой
-                return_data = {
-                    'return_date': str(date.today()),
-                    'mileage_end': 12300
-                }
-                return_response = requests.post(f"{self.BASE_URL}/rentals/{rental_id}/return", params=return_data)
-                self.assertEqual(return_response.status_code, 200)
-                
-                # Проверяем, что в ответе есть информация о стоимости
-                response_data = return_response.json()
-                self.assertIn('total_cost', response_data)
-                self.assertIn('days_rented', response_data)
-
-
-if __name__ == '__main__':
+import csv
+import itertools
+import json
+import os
+import re
+import tempfile
+import unittest
+import requests
+import sqlite3
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from availability import AvailabilityIndex
+from db import DB_PATH, ConnectionPool, is_busy
+from generate_data import generate
+from loader import TABLE_ORDER, drop_schema, load_files
+from migrations import MIGRATIONS, migrate
+from overdue import scan_overdue
+from reservations import active_rental_overlaps
+from search import CAR_SORTS, car_search_query
+from writer import GroupCommitWriter
+
+
+def metric_value(text, line_prefix):
+    """Значение метрики из ответа /metrics по началу строки (имя с метками); 0, если ряда нет"""
+    values = [float(line.rsplit(' ', 1)[1]) for line in text.splitlines() if line.startswith(line_prefix + ' ')]
+    return values[0] if values else 0
+
+
+class TestCarRentalAPI(unittest.TestCase):
+    BASE_URL = "http://localhost:8000"
+    
+    def setUp(self):
+        self.timestamp = int(time.time())
+        self.created_ids = {
+            'cars': [],
+            'customers': [],
+            'rentals': [],
+            'maintenance': []
+        }
+
+    def tearDown(self):
+        # Очистка созданных данных после каждого теста
+        for maintenance_id in self.created_ids['maintenance']:
+            try:
+                requests.delete(f"{self.BASE_URL}/maintenance/{maintenance_id}")
+            except:
+                pass
+        
+        for rental_id in self.created_ids['rentals']:
+            try:
+                requests.delete(f"{self.BASE_URL}/rentals/{rental_id}")
+            except:
+                pass
+        
+        for customer_id in self.created_ids['customers']:
+            try:
+                requests.delete(f"{self.BASE_URL}/customers/{customer_id}")
+            except:
+                pass
+        
+        for car_id in self.created_ids['cars']:
+            try:
+                requests.delete(f"{self.BASE_URL}/cars/{car_id}")
+            except:
+                pass
+
+    def test_01_get_cars(self):
+        """Тест получения всех автомобилей"""
+        response = requests.get(f"{self.BASE_URL}/cars/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.json(), (list, dict))
+
+    def test_02_get_available_cars(self):
+        """Тест получения только доступных автомобилей"""
+        response = requests.get(f"{self.BASE_URL}/cars/", params={"available_only": True})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.json(), (list, dict))
+
+    def test_03_create_car(self):
+        """Тест создания автомобиля"""
+        data = {
+            'brand': f'Brand_{self.timestamp}',
+            'model': f'Model_{self.timestamp}',
+            'year': 2020 + (self.timestamp % 5),
+            'color': 'Red',
+            'license_plate': f'TEST{self.timestamp}',
+            'daily_rate': 2000.0 + (self.timestamp % 1000),
+            'mileage': 15000,
+            'fuel_type': 'petrol'
+        }
+        response = requests.post(f"{self.BASE_URL}/cars/", params=data)
+        self.assertEqual(response.status_code, 200)
+        car_id = response.json().get('car_id')
+        if car_id:
+            self.created_ids['cars'].append(car_id)
+
+    def test_04_update_car(self):
+        """Тест обновления автомобиля"""
+        # Сначала создаем автомобиль
+        create_data = {
+            'brand': 'Toyota',
+            'model': 'Camry',
+            'year': 2022,
+            'color': 'Black',
+            'license_plate': f'UPDATE{self.timestamp}',
+            'daily_rate': 2500.0,
+            'mileage': 10000,
+            'fuel_type': 'petrol'
+        }
+        create_response = requests.post(f"{self.BASE_URL}/cars/", params=create_data)
+        self.assertEqual(create_response.status_code, 200)
+        car_id = create_response.json().get('car_id')
+        
+        if car_id:
+            self.created_ids['cars'].append(car_id)
+            
+            # Обновляем автомобиль
+            update_data = {
+                'daily_rate': 2700.0,
+                'mileage': 12000,
+                'color': 'Dark Gray'
+            }
+            update_response = requests.put(f"{self.BASE_URL}/cars/{car_id}", params=update_data)
+            self.assertEqual(update_response.status_code, 200)
+
+    def test_05_get_customers(self):
+        """Тест получения всех клиентов"""
+        response = requests.get(f"{self.BASE_URL}/customers/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.json(), (list, dict))
+
+    def test_06_create_customer(self):
+        """Тест создания клиента"""
+        data = {
+            'first_name': f'John_{self.timestamp}',
+            'last_name': f'Doe_{self.timestamp}',
+            'email': f'john.doe{self.timestamp}@test.com',
+            'phone': f'+7916{self.timestamp % 1000000:06d}',
+            'driver_license': f'DL{self.timestamp}',
+            'address': f'Test address {self.timestamp}'
+        }
+        response = requests.post(f"{self.BASE_URL}/customers/", params=data)
+        self.assertEqual(response.status_code, 200)
+        customer_id = response.json().get('customer_id')
+        if customer_id:
+            self.created_ids['customers'].append(customer_id)
+
+    def test_07_update_customer(self):
+        """Тест обновления клиента"""
+        # Сначала создаем клиента
+        create_data = {
+            'first_name': 'Alice',
+            'last_name': 'Smith',
+            'email': f'alice.smith{self.timestamp}@test.com',
+            'phone': '+79160000001',
+            'driver_license': f'DL_UPDATE{self.timestamp}',
+            'address': 'Original address'
+        }
+        create_response = requests.post(f"{self.BASE_URL}/customers/", params=create_data)
+        self.assertEqual(create_response.status_code, 200)
+        customer_id = create_response.json().get('customer_id')
+        
+        if customer_id:
+            self.created_ids['customers'].append(customer_id)
+            
+            # Обновляем клиента
+            update_data = {
+                'phone': '+79169998877',
+                'address': f'Updated address {self.timestamp}'
+            }
+            update_response = requests.put(f"{self.BASE_URL}/customers/{customer_id}", params=update_data)
+            self.assertEqual(update_response.status_code, 200)
+
+    def test_08_get_rentals(self):
+        """Тест получения всех аренд"""
+        response = requests.get(f"{self.BASE_URL}/rentals/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.json(), (list, dict))
+
+    def test_09_create_rental(self):
+        """Тест создания аренды"""
+        # Сначала создаем автомобиль и клиента
+        car_data = {
+            'brand': 'Honda',
+            'model': 'Civic',
+            'year': 2023,
+            'color': 'White',
+            'license_plate': f'RENTAL{self.timestamp}',
+            'daily_rate': 1800.0,
+            'mileage': 5000,
+            'fuel_type': 'petrol'
+        }
+        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
+        car_id = car_response.json().get('car_id')
+        
+        customer_data = {
+            'first_name': 'Bob',
+            'last_name': 'Johnson',
+            'email': f'bob.johnson{self.timestamp}@test.com',
+            'phone': '+79160000002',
+            'driver_license': f'DL_RENTAL{self.timestamp}',
+            'address': 'Rental test address'
+        }
+        customer_response = requests.post(f"{self.BASE_URL}/customers/", params=customer_data)
+        customer_id = customer_response.json().get('customer_id')
+        
+        if car_id and customer_id:
+            self.created_ids['cars'].append(car_id)
+            self.created_ids['customers'].append(customer_id)
+            
+            # Создаем аренду
+            rental_data = {
+                'car_id': car_id,
+                'customer_id': customer_id,
+                'rental_date': str(date.today()),
+                'planned_return_date': str(date.today() + timedelta(days=3)),
+                'mileage_start': 5000
+            }
+            response = requests.post(f"{self.BASE_URL}/rentals/", params=rental_data)
+            self.assertEqual(response.status_code, 200)
+            rental_id = response.json().get('rental_id')
+            if rental_id:
+                self.created_ids['rentals'].append(rental_id)
+
+    def test_10_return_rental(self):
+        """Тест возврата автомобиля"""
+        # Сначала создаем автомобиль, клиента и аренду
+        car_data = {
+            'brand': 'Nissan',
+            'model': 'Altima',
+            'year': 2021,
+            'color': 'Blue',
+            'license_plate': f'RETURN{self.timestamp}',
+            'daily_rate': 2200.0,
+            'mileage': 20000,
+            'fuel_type': 'petrol'
+        }
+        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
+        car_id = car_response.json().get('car_id')
+        
+        customer_data = {
+            'first_name': 'Carol',
+            'last_name': 'Wilson',
+            'email': f'carol.wilson{self.timestamp}@test.com',
+            'phone': '+79160000003',
+            'driver_license': f'DL_RETURN{self.timestamp}',
+            'address': 'Return test address'
+        }
+        customer_response = requests.post(f"{self.BASE_URL}/customers/", params=customer_data)
+        customer_id = customer_response.json().get('customer_id')
+        
+        if car_id and customer_id:
+            self.created_ids['cars'].append(car_id)
+            self.created_ids['customers'].append(customer_id)
+            
+            # Создаем аренду
+            rental_data = {
+                'car_id': car_id,
+                'customer_id': customer_id,
+                'rental_date': str(date.today() - timedelta(days=2)),
+                'planned_return_date': str(date.today() + timedelta(days=1)),
+                'mileage_start': 20000
+            }
+            rental_response = requests.post(f"{self.BASE_URL}/rentals/", params=rental_data)
+            rental_id = rental_response.json().get('rental_id')
+            
+            if rental_id:
+                self.created_ids['rentals'].append(rental_id)
+                
+                # Возвращаем автомобиль
+                return_data = {
+                    'return_date': str(date.today()),
+                    'mileage_end': 20300
+                }
+                return_response = requests.post(f"{self.BASE_URL}/rentals/{rental_id}/return", params=return_data)
+                self.assertEqual(return_response.status_code, 200)
+                self.assertIn('total_cost', return_response.json())
+
+    def test_11_create_maintenance(self):
+        """Тест создания записи ТО"""
+        # Сначала создаем автомобиль
+        car_data = {
+            'brand': 'BMW',
+            'model': 'X5',
+            'year': 2020,
+            'color': 'Black',
+            'license_plate': f'MAINT{self.timestamp}',
+            'daily_rate': 3500.0,
+            'mileage': 30000,
+            'fuel_type': 'diesel'
+        }
+        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
+        car_id = car_response.json().get('car_id')
+        
+        if car_id:
+            self.created_ids['cars'].append(car_id)
+            
+            # Создаем запись ТО
+            maintenance_data = {
+                'car_id': car_id,
+                'maintenance_date': str(date.today()),
+                'maintenance_type': 'Замена масла',
+                'cost': 5000.0,
+                'mileage': 30000,
+                'description': f'Плановое ТО {self.timestamp}'
+            }
+            response = requests.post(f"{self.BASE_URL}/maintenance/", params=maintenance_data)
+            self.assertEqual(response.status_code, 200)
+            maintenance_id = response.json().get('maintenance_id')
+            if maintenance_id:
+                self.created_ids['maintenance'].append(maintenance_id)
+
+    def test_12_get_car_maintenance(self):
+        """Тест получения истории ТО автомобиля"""
+        # Сначала создаем автомобиль и запись ТО
+        car_data = {
+            'brand': 'Audi',
+            'model': 'A4',
+            'year': 2019,
+            'color': 'Silver',
+            'license_plate': f'MAINT_HIST{self.timestamp}',
+            'daily_rate': 2800.0,
+            'mileage': 40000,
+            'fuel_type': 'petrol'
+        }
+        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
+        car_id = car_response.json().get('car_id')
+        
+        if car_id:
+            self.created_ids['cars'].append(car_id)
+            
+            # Создаем запись ТО
+            maintenance_data = {
+                'car_id': car_id,
+                'maintenance_date': str(date.today()),
+                'maintenance_type': 'Технический осмотр',
+                'cost': 3000.0,
+                'mileage': 40000,
+                'description': 'Регулярный техосмотр'
+            }
+            maintenance_response = requests.post(f"{self.BASE_URL}/maintenance/", params=maintenance_data)
+            maintenance_id = maintenance_response.json().get('maintenance_id')
+            if maintenance_id:
+                self.created_ids['maintenance'].append(maintenance_id)
+            
+            # Получаем историю ТО
+            response = requests.get(f"{self.BASE_URL}/maintenance/{car_id}")
+            self.assertEqual(response.status_code, 200)
+
+    def test_13_get_rental_stats(self):
+        """Тест получения статистики аренд"""
+        response = requests.get(f"{self.BASE_URL}/stats/rentals")
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()
+        self.assertIsInstance(stats, dict)
+        self.assertIn('total_rentals', stats)
+
+    def test_14_get_car_stats(self):
+        """Тест получения статистики автомобилей"""
+        response = requests.get(f"{self.BASE_URL}/stats/cars")
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()
+        self.assertIsInstance(stats, dict)
+        self.assertIn('total_cars', stats)
+
+    def test_15_delete_car(self):
+        """Тест удаления автомобиля"""
+        # Сначала создаем автомобиль
+        create_data = {
+            'brand': 'Ford',
+            'model': 'Focus',
+            'year': 2022,
+            'color': 'Green',
+            'license_plate': f'DELETE{self.timestamp}',
+            'daily_rate': 1900.0,
+            'mileage': 10000,
+            'fuel_type': 'petrol'
+        }
+        create_response = requests.post(f"{self.BASE_URL}/cars/", params=create_data)
+        self.assertEqual(create_response.status_code, 200)
+        car_id = create_response.json().get('car_id')
+        
+        if car_id:
+            # Удаляем автомобиль
+            delete_response = requests.delete(f"{self.BASE_URL}/cars/{car_id}")
+            self.assertEqual(delete_response.status_code, 200)
+
+    def test_16_delete_customer(self):
+        """Тест удаления клиента"""
+        # Сначала создаем клиента
+        create_data = {
+            'first_name': 'David',
+            'last_name': 'Brown',
+            'email': f'david.brown{self.timestamp}@test.com',
+            'phone': '+79160000004',
+            'driver_license': f'DL_DELETE{self.timestamp}',
+            'address': 'Delete test address'
+        }
+        create_response = requests.post(f"{self.BASE_URL}/customers/", params=create_data)
+        self.assertEqual(create_response.status_code, 200)
+        customer_id = create_response.json().get('customer_id')
+        
+        if customer_id:
+            # Удаляем клиента
+            delete_response = requests.delete(f"{self.BASE_URL}/customers/{customer_id}")
+            self.assertEqual(delete_response.status_code, 200)
+
+    def test_17_delete_rental(self):
+        """Тест удаления аренды"""
+        # Сначала создаем автомобиль, клиента и аренду
+        car_data = {
+            'brand': 'Kia',
+            'model': 'Rio',
+            'year': 2023,
+            'color': 'Yellow',
+            'license_plate': f'DEL_RENT{self.timestamp}',
+            'daily_rate': 1600.0,
+            'mileage': 7000,
+            'fuel_type': 'petrol'
+        }
+        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
+        car_id = car_response.json().get('car_id')
+        
+        customer_data = {
+            'first_name': 'Emma',
+            'last_name': 'Davis',
+            'email': f'emma.davis{self.timestamp}@test.com',
+            'phone': '+79160000005',
+            'driver_license': f'DL_DEL_RENT{self.timestamp}',
+            'address': 'Delete rental test address'
+        }
+        customer_response = requests.post(f"{self.BASE_URL}/customers/", params=customer_data)
+        customer_id = customer_response.json().get('customer_id')
+        
+        if car_id and customer_id:
+            self.created_ids['cars'].append(car_id)
+            self.created_ids['customers'].append(customer_id)
+            
+            # Создаем аренду
+            rental_data = {
+                'car_id': car_id,
+                'customer_id': customer_id,
+                'rental_date': str(date.today()),
+                'planned_return_date': str(date.today() + timedelta(days=2)),
+                'mileage_start': 7000
+            }
+            rental_response = requests.post(f"{self.BASE_URL}/rentals/", params=rental_data)
+            rental_id = rental_response.json().get('rental_id')
+            
+            if rental_id:
+                # Удаляем аренду
+                delete_response = requests.delete(f"{self.BASE_URL}/rentals/{rental_id}")
+                self.assertEqual(delete_response.status_code, 200)
+
+    def test_18_delete_maintenance(self):
+        """Тест удаления записи ТО"""
+        # Сначала создаем автомобиль и запись ТО
+        car_data = {
+            'brand': 'Hyundai',
+            'model': 'Elantra',
+            'year': 2021,
+            'color': 'Orange',
+            'license_plate': f'DEL_MAINT{self.timestamp}',
+            'daily_rate': 1700.0,
+            'mileage': 25000,
+            'fuel_type': 'petrol'
+        }
+        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
+        car_id = car_response.json().get('car_id')
+        
+        if car_id:
+            self.created_ids['cars'].append(car_id)
+            
+            # Создаем запись ТО
+            maintenance_data = {
+                'car_id': car_id,
+                'maintenance_date': str(date.today()),
+                'maintenance_type': 'Замена тормозных колодок',
+                'cost': 8000.0,
+                'mileage': 25000,
+                'description': 'Замена передних тормозных колодок'
+            }
+            maintenance_response = requests.post(f"{self.BASE_URL}/maintenance/", params=maintenance_data)
+            maintenance_id = maintenance_response.json().get('maintenance_id')
+            
+            if maintenance_id:
+                # Удаляем запись ТО
+                delete_response = requests.delete(f"{self.BASE_URL}/maintenance/{maintenance_id}")
+                self.assertEqual(delete_response.status_code, 200)
+
+    def test_19_complete_workflow(self):
+        """Тест полного рабочего процесса аренды"""
+        # 1. Создаем автомобиль
+        car_data = {
+            'brand': 'Mercedes',
+            'model': 'C-Class',
+            'year': 2023,
+            'color': 'Black',
+            'license_plate': f'WORKFLOW{self.timestamp}',
+            'daily_rate': 4000.0,
+            'mileage': 8000,
+            'fuel_type': 'petrol'
+        }
+        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
+        self.assertEqual(car_response.status_code, 200)
+        car_id = car_response.json().get('car_id')
+        
+        # 2. Создаем клиента
+        customer_data = {
+            'first_name': 'Frank',
+            'last_name': 'Miller',
+            'email': f'frank.miller{self.timestamp}@test.com',
+            'phone': '+79160000006',
+            'driver_license': f'DL_WORKFLOW{self.timestamp}',
+            'address': 'Workflow test address'
+        }
+        customer_response = requests.post(f"{self.BASE_URL}/customers/", params=customer_data)
+        self.assertEqual(customer_response.status_code, 200)
+        customer_id = customer_response.json().get('customer_id')
+        
+        if car_id and customer_id:
+            self.created_ids['cars'].append(car_id)
+            self.created_ids['customers'].append(customer_id)
+            
+            # 3. Создаем аренду
+            rental_data = {
+                'car_id': car_id,
+                'customer_id': customer_id,
+                'rental_date': str(date.today() - timedelta(days=1)),
+                'planned_return_date': str(date.today() + timedelta(days=2)),
+                'mileage_start': 8000
+            }
+            rental_response = requests.post(f"{self.BASE_URL}/rentals/", params=rental_data)
+            self.assertEqual(rental_response.status_code, 200)
+            rental_id = rental_response.json().get('rental_id')
+            
+            if rental_id:
+                self.created_ids['rentals'].append(rental_id)
+                
+                # 4. Проверяем, что автомобиль стал недоступен
+                available_cars_response = requests.get(f"{self.BASE_URL}/cars/", params={"available_only": True})
+                self.assertEqual(available_cars_response.status_code, 200)
+                
+                # 5. Возвращаем автомобиль
+                return_data = {
+                    'return_date': str(date.today()),
+                    'mileage_end': 8150
+                }
+                return_response = requests.post(f"{self.BASE_URL}/rentals/{rental_id}/return", params=return_data)
+                self.assertEqual(return_response.status_code, 200)
+                
+                # 6. Создаем запись ТО
+                maintenance_data = {
+                    'car_id': car_id,
+                    'maintenance_date': str(date.today()),
+                    'maintenance_type': 'Мойка и чистка',
+                    'cost': 1500.0,
+                    'mileage': 8150,
+                    'description': 'После аренды'
+                }
+                maintenance_response = requests.post(f"{self.BASE_URL}/maintenance/", params=maintenance_data)
+                self.assertEqual(maintenance_response.status_code, 200)
+                maintenance_id = maintenance_response.json().get('maintenance_id')
+                
+                if maintenance_id:
+                    self.created_ids['maintenance'].append(maintenance_id)
+                
+                # 7. Проверяем статистику
+                rental_stats_response = requests.get(f"{self.BASE_URL}/stats/rentals")
+                self.assertEqual(rental_stats_response.status_code, 200)
+                
+                car_stats_response = requests.get(f"{self.BASE_URL}/stats/cars")
+                self.assertEqual(car_stats_response.status_code, 200)
+                
+                # 8. Проверяем данные
+                cars_response = requests.get(f"{self.BASE_URL}/cars/")
+                self.assertEqual(cars_response.status_code, 200)
+                
+                customers_response = requests.get(f"{self.BASE_URL}/customers/")
+                self.assertEqual(customers_response.status_code, 200)
+                
+                rentals_response = requests.get(f"{self.BASE_URL}/rentals/")
+                self.assertEqual(rentals_response.status_code, 200)
+                
+                maintenance_response = requests.get(f"{self.BASE_URL}/maintenance/{car_id}")
+                self.assertEqual(maintenance_response.status_code, 200)
+
+    def test_20_rental_with_overdue(self):
+        """Тест аренды с просрочкой возврата"""
+        # Создаем автомобиль и клиента
+        car_data = {
+            'brand': 'Volkswagen',
+            'model': 'Golf',
+            'year': 2022,
+            'color': 'Blue',
+            'license_plate': f'OVERDUE{self.timestamp}',
+            'daily_rate': 2300.0,
+            'mileage': 12000,
+            'fuel_type': 'petrol'
+        }
+        car_response = requests.post(f"{self.BASE_URL}/cars/", params=car_data)
+        car_id = car_response.json().get('car_id')
+        
+        customer_data = {
+            'first_name': 'Grace',
+            'last_name': 'Taylor',
+            'email': f'grace.taylor{self.timestamp}@test.com',
+            'phone': '+79160000007',
+            'driver_license': f'DL_OVERDUE{self.timestamp}',
+            'address': 'Overdue test address'
+        }
+        customer_response = requests.post(f"{self.BASE_URL}/customers/", params=customer_data)
+        customer_id = customer_response.json().get('customer_id')
+        
+        if car_id and customer_id:
+            self.created_ids['cars'].append(car_id)
+            self.created_ids['customers'].append(customer_id)
+            
+            # Создаем аренду с прошлой датой
+            rental_data = {
+                'car_id': car_id,
+                'customer_id': customer_id,
+                'rental_date': str(date.today() - timedelta(days=5)),
+                'planned_return_date': str(date.today() - timedelta(days=2)),  # Просрочка на 3 дня
+                'mileage_start': 12000
+            }
+            rental_response = requests.post(f"{self.BASE_URL}/rentals/", params=rental_data)
+            rental_id = rental_response.json().get('rental_id')
+            
+            if rental_id:
+                self.created_ids['rentals'].append(rental_id)
+                
+                # Возвращаем с просрочкой
+                return_data = {
+                    'return_date': str(date.today()),
+                    'mileage_end': 12300
+                }
+                return_response = requests.post(f"{self.BASE_URL}/rentals/{rental_id}/return", params=return_data)
+                self.assertEqual(return_response.status_code, 200)
+                
+                # Проверяем, что в ответе есть информация о стоимости
+                response_data = return_response.json()
+                self.assertIn('total_cost', response_data)
+                self.assertIn('days_rented', response_data)
+
+
+    def test_21_schema_migrations_and_indexes(self):
+        """Тест версии схемы и использования индексов в частых запросах"""
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            version = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0]
+            self.assertEqual(version, MIGRATIONS[-1][0])
+
+            queries = [
+                ("SELECT * FROM Rentals WHERE status = ? ORDER BY rental_date DESC", ('active',)),
+                ("SELECT 1 FROM Rentals WHERE car_id = ? AND status = 'active'", (1,)),
+                ("SELECT 1 FROM Rentals WHERE customer_id = ? AND status = 'active'", (1,)),
+                ("SELECT * FROM Maintenance WHERE car_id = ? ORDER BY maintenance_date DESC", (1,)),
+            ]
+            for query, params in queries:
+                plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+                self.assertRegex(plan, r"USING (COVERING )?INDEX", query)
+                self.assertNotIn("TEMP B-TREE", plan, query)
+        finally:
+            conn.close()
+
+    def test_22_keyset_pagination(self):
+        """Тест постраничного вывода автомобилей, клиентов и аренд"""
+        for i in range(3):
+            car_data = {
+                'brand': 'Skoda',
+                'model': 'Octavia',
+                'year': 2021,
+                'color': 'Grey',
+                'license_plate': f'PAGE{i}_{self.timestamp}',
+                'daily_rate': 2000.0,
+                'mileage': 1000,
+                'fuel_type': 'petrol'
+            }
+            car_id = requests.post(f"{self.BASE_URL}/cars/", params=car_data).json().get('car_id')
+            if car_id:
+                self.created_ids['cars'].append(car_id)
+
+        for path, key in [("cars", "car_id"), ("customers", "customer_id"), ("rentals", "rental_id")]:
+            full = requests.get(f"{self.BASE_URL}/{path}/").json()
+            expected = [item[key] for item in full] if isinstance(full, list) else []
+
+            collected = []
+            params = {'limit': 2}
+            while True:
+                response = requests.get(f"{self.BASE_URL}/{path}/", params=params)
+                self.assertEqual(response.status_code, 200)
+                page = response.json()
+                self.assertLessEqual(len(page['items']), 2)
+                collected.extend(item[key] for item in page['items'])
+                if not page['next_cursor']:
+                    break
+                params = {'limit': 2, 'after': page['next_cursor']}
+
+            self.assertEqual(collected, expected)
+
+        response = requests.get(f"{self.BASE_URL}/cars/", params={'after': 'broken'})
+        self.assertIn('error', response.json())
+
+    def test_23_streaming_export(self):
+        """Тест потоковой выгрузки списков в NDJSON и CSV"""
+        for path, key in [("cars", "car_id"), ("customers", "customer_id"), ("rentals", "rental_id")]:
+            full = requests.get(f"{self.BASE_URL}/{path}/").json()
+            expected = [item[key] for item in full] if isinstance(full, list) else []
+
+            response = requests.get(f"{self.BASE_URL}/{path}/", params={'format': 'ndjson'})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.headers['content-type'].startswith('application/x-ndjson'))
+            rows = [json.loads(line) for line in response.text.splitlines()]
+            self.assertEqual([row[key] for row in rows], expected)
+
+            response = requests.get(f"{self.BASE_URL}/{path}/", params={'format': 'csv'})
+            self.assertEqual(response.status_code, 200)
+            rows = list(csv.DictReader(response.text.splitlines()))
+            self.assertEqual([int(row[key]) for row in rows], expected)
+            if path == "cars":
+                # Логические значения - как в JSON
+                self.assertEqual({row['is_available'] for row in rows} - {'true', 'false'}, set())
+
+        response = requests.get(f"{self.BASE_URL}/cars/", params={'format': 'xml'})
+        self.assertIn('error', response.json())
+
+    def test_24_bulk_insert(self):
+        """Тест массового добавления автомобилей, клиентов и записей о ТО"""
+        cars = [{
+            'brand': 'Renault',
+            'model': 'Logan',
+            'year': 2020,
+            'color': 'White',
+            'license_plate': f'BULK{i}_{self.timestamp}',
+            'daily_rate': 1500.0
+        } for i in range(3)]
+        cars.append(dict(cars[0]))  # Дубликат номерного знака
+        response = requests.post(f"{self.BASE_URL}/cars/bulk", json=cars)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['inserted'], 3)
+        self.assertEqual(data['failed'], 1)
+        self.assertIn('error', data['results'][3])
+        car_ids = [item['car_id'] for item in data['results'][:3]]
+        self.created_ids['cars'].extend(car_ids)
+        self.assertEqual(len(set(car_ids)), 3)
+
+        customers = [{
+            'first_name': 'Bulk',
+            'last_name': f'Customer{i}',
+            'email': f'bulk{i}_{self.timestamp}@test.com',
+            'phone': '+79160000010',
+            'driver_license': f'DL_BULK{i}_{self.timestamp}'
+        } for i in range(2)]
+        response = requests.post(f"{self.BASE_URL}/customers/bulk", json=customers)
+        data = response.json()
+        self.assertEqual(data['inserted'], 2)
+        self.created_ids['customers'].extend(item['customer_id'] for item in data['results'])
+
+        records = [{
+            'car_id': car_id,
+            'maintenance_date': str(date.today()),
+            'maintenance_type': 'Диагностика',
+            'cost': 3000.0,
+            'mileage': 1000
+        } for car_id in car_ids]
+        records.append(dict(records[0], car_id=-1))  # Несуществующий автомобиль
+        response = requests.post(f"{self.BASE_URL}/maintenance/bulk", json=records)
+        data = response.json()
+        self.assertEqual(data['inserted'], 3)
+        self.assertEqual(data['failed'], 1)
+        self.created_ids['maintenance'].extend(item['maintenance_id'] for item in data['results'][:3])
+
+        # Идентификаторы соответствуют вставленным строкам
+        history = requests.get(f"{self.BASE_URL}/maintenance/{car_ids[1]}").json()
+        self.assertEqual([m['maintenance_id'] for m in history], [data['results'][1]['maintenance_id']])
+
+    def test_25_offline_loader(self):
+        """Тест офлайн-загрузчика: SQL-файл с тестовыми данными и CSV с проверкой внешних ключей"""
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'load.db')
+            maintenance_csv = os.path.join(tmp, 'maintenance.csv')
+            with open(maintenance_csv, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['car_id', 'maintenance_date', 'maintenance_type', 'cost', 'mileage', 'description'])
+                writer.writerow([1, '2024-03-01', 'Замена масла', 4000, 16000, ''])
+                writer.writerow([999, '2024-03-01', 'Замена масла', 4000, 16000, ''])  # Нет такого автомобиля
+
+            test_data = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_data.txt')
+            load_files(db_path, [maintenance_csv, test_data])
+
+            conn = sqlite3.connect(db_path)
+            try:
+                counts = [conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                          for t in ('Cars', 'Customers', 'Rentals', 'Maintenance')]
+                self.assertEqual(counts, [6, 5, 5, 6])
+                description = conn.execute("SELECT description FROM Maintenance WHERE maintenance_date = '2024-03-01'").fetchone()[0]
+                self.assertIsNone(description)
+                index_count = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'").fetchone()[0]
+                self.assertGreater(index_count, 0)
+            finally:
+                conn.close()
+
+    def expected_rental_stats(self):
+        """Статистика аренд, посчитанная полным проходом по таблице Rentals"""
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            total = conn.execute("SELECT COUNT(*) FROM Rentals").fetchone()[0]
+            active = conn.execute("SELECT COUNT(*) FROM Rentals WHERE status = 'active'").fetchone()[0]
+            revenue = conn.execute("SELECT SUM(total_cost) FROM Rentals WHERE status = 'completed' AND total_cost IS NOT NULL").fetchone()[0] or 0
+            avg_days = conn.execute('''
+                SELECT AVG(julianday(return_date) - julianday(rental_date))
+                FROM Rentals WHERE status = 'completed' AND return_date IS NOT NULL
+            ''').fetchone()[0] or 0
+        finally:
+            conn.close()
+        return {
+            "total_rentals": total,
+            "active_rentals": active,
+            "total_revenue": round(revenue, 2),
+            "avg_rental_days": round(avg_days, 1)
+        }
+
+    def test_26_rental_stats_rollup(self):
+        """Тест согласованности сводной статистики аренд при создании, возврате и удалении"""
+        self.assertEqual(requests.get(f"{self.BASE_URL}/stats/rentals").json(), self.expected_rental_stats())
+
+        car_data = {
+            'brand': 'Mazda',
+            'model': '6',
+            'year': 2022,
+            'color': 'Red',
+            'license_plate': f'STATS{self.timestamp}',
+            'daily_rate': 2600.0,
+            'mileage': 7000,
+            'fuel_type': 'petrol'
+        }
+        car_id = requests.post(f"{self.BASE_URL}/cars/", params=car_data).json().get('car_id')
+        customer_data = {
+            'first_name': 'Henry',
+            'last_name': 'Moore',
+            'email': f'henry.moore{self.timestamp}@test.com',
+            'phone': '+79160000011',
+            'driver_license': f'DL_STATS{self.timestamp}'
+        }
+        customer_id = requests.post(f"{self.BASE_URL}/customers/", params=customer_data).json().get('customer_id')
+        self.created_ids['cars'].append(car_id)
+        self.created_ids['customers'].append(customer_id)
+
+        rental_data = {
+            'car_id': car_id,
+            'customer_id': customer_id,
+            'rental_date': str(date.today() - timedelta(days=4)),
+            'planned_return_date': str(date.today() - timedelta(days=1)),
+            'mileage_start': 7000
+        }
+        rental_id = requests.post(f"{self.BASE_URL}/rentals/", params=rental_data).json().get('rental_id')
+        self.created_ids['rentals'].append(rental_id)
+        self.assertEqual(requests.get(f"{self.BASE_URL}/stats/rentals").json(), self.expected_rental_stats())
+
+        return_data = {'return_date': str(date.today()), 'mileage_end': 7400}
+        requests.post(f"{self.BASE_URL}/rentals/{rental_id}/return", params=return_data)
+        self.assertEqual(requests.get(f"{self.BASE_URL}/stats/rentals").json(), self.expected_rental_stats())
+
+        requests.delete(f"{self.BASE_URL}/rentals/{rental_id}")
+        self.assertEqual(requests.get(f"{self.BASE_URL}/stats/rentals").json(), self.expected_rental_stats())
+
+    def test_27_car_stats_cache(self):
+        """Тест кэширования статистики автомобилей до изменения таблиц"""
+        first = requests.get(f"{self.BASE_URL}/stats/cars").json()
+        before = requests.get(f"{self.BASE_URL}/stats/cache").json()
+        second = requests.get(f"{self.BASE_URL}/stats/cars").json()
+        after = requests.get(f"{self.BASE_URL}/stats/cache").json()
+        self.assertEqual(first, second)
+        self.assertEqual(after['hits'], before['hits'] + 1)
+        self.assertEqual(after['misses'], before['misses'])
+
+        car_data = {
+            'brand': 'Audi',
+            'model': 'A4',
+            'year': 2023,
+            'color': 'Black',
+            'license_plate': f'CACHE{self.timestamp}',
+            'daily_rate': 4000.0
+        }
+        car_id = requests.post(f"{self.BASE_URL}/cars/", params=car_data).json().get('car_id')
+        self.created_ids['cars'].append(car_id)
+
+        third = requests.get(f"{self.BASE_URL}/stats/cars").json()
+        self.assertEqual(third['total_cars'], first['total_cars'] + 1)
+        self.assertEqual(third['available_cars'], first['available_cars'] + 1)
+        self.assertEqual(requests.get(f"{self.BASE_URL}/stats/cache").json()['misses'], after['misses'] + 1)
+
+    def test_28_conditional_get(self):
+        """Тест ETag и ответа 304 для неизменившихся списков"""
+        etags = {}
+        for path in ("cars", "customers", "rentals"):
+            response = requests.get(f"{self.BASE_URL}/{path}/")
+            self.assertEqual(response.status_code, 200)
+            etags[path] = response.headers['ETag']
+
+            response = requests.get(f"{self.BASE_URL}/{path}/", headers={'If-None-Match': etags[path]})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+
+        customer_data = {
+            'first_name': 'Ivy',
+            'last_name': 'Clark',
+            'email': f'ivy.clark{self.timestamp}@test.com',
+            'phone': '+79160000012',
+            'driver_license': f'DL_ETAG{self.timestamp}'
+        }
+        customer_id = requests.post(f"{self.BASE_URL}/customers/", params=customer_data).json().get('customer_id')
+        self.created_ids['customers'].append(customer_id)
+
+        # Изменились клиенты: списки клиентов и аренд (JOIN) отдаются заново, автомобили - нет
+        for path, changed in (("cars", False), ("customers", True), ("rentals", True)):
+            response = requests.get(f"{self.BASE_URL}/{path}/", headers={'If-None-Match': etags[path]})
+            self.assertEqual(response.status_code, 200 if changed else 304, path)
+
+    def test_29_reservations(self):
+        """Тест бронирований: пересечения периодов, поиск по окну и конфликт с арендой"""
+        car_data = {
+            'brand': 'Nissan',
+            'model': 'Qashqai',
+            'year': 2022,
+            'color': 'Silver',
+            'license_plate': f'RESERVE{self.timestamp}',
+            'daily_rate': 3000.0,
+            'mileage': 9000
+        }
+        car_id = requests.post(f"{self.BASE_URL}/cars/", params=car_data).json().get('car_id')
+        self.created_ids['cars'].append(car_id)
+        customer_ids = []
+        for i in range(2):
+            customer_data = {
+                'first_name': 'Jack',
+                'last_name': f'Reserve{i}',
+                'email': f'jack.reserve{i}_{self.timestamp}@test.com',
+                'phone': '+79160000013',
+                'driver_license': f'DL_RESERVE{i}_{self.timestamp}'
+            }
+            customer_ids.append(requests.post(f"{self.BASE_URL}/customers/", params=customer_data).json().get('customer_id'))
+        self.created_ids['customers'].extend(customer_ids)
+
+        day = lambda n: str(date.today() + timedelta(days=n))
+        first = requests.post(f"{self.BASE_URL}/reservations/", params={
+            'car_id': car_id, 'customer_id': customer_ids[0], 'start_date': day(10), 'end_date': day(15)
+        }).json()
+        self.assertIn('reservation_id', first)
+
+        overlapping = requests.post(f"{self.BASE_URL}/reservations/", params={
+            'car_id': car_id, 'customer_id': customer_ids[1], 'start_date': day(12), 'end_date': day(20)
+        }).json()
+        self.assertIn('error', overlapping)
+
+        # Период [start, end) - бронирование с дня окончания предыдущего не пересекается
+        adjacent = requests.post(f"{self.BASE_URL}/reservations/", params={
+            'car_id': car_id, 'customer_id': customer_ids[1], 'start_date': day(15), 'end_date': day(18)
+        }).json()
+        self.assertIn('reservation_id', adjacent)
+
+        window = requests.get(f"{self.BASE_URL}/reservations/", params={'car_id': car_id, 'from': day(14), 'to': day(16)}).json()
+        self.assertEqual({r['reservation_id'] for r in window}, {first['reservation_id'], adjacent['reservation_id']})
+        window = requests.get(f"{self.BASE_URL}/reservations/", params={'car_id': car_id, 'from': day(0), 'to': day(10)}).json()
+        self.assertIn('error', window)
+
+        rental_data = {
+            'car_id': car_id,
+            'customer_id': customer_ids[1],
+            'rental_date': day(0),
+            'planned_return_date': day(11),
+            'mileage_start': 9000
+        }
+        self.assertIn('error', requests.post(f"{self.BASE_URL}/rentals/", params=rental_data).json())
+
+        # Клиент забирает автомобиль по своему бронированию
+        rental_data.update(customer_id=customer_ids[0], rental_date=day(10), planned_return_date=day(15),
+                           reservation_id=first['reservation_id'])
+        rental = requests.post(f"{self.BASE_URL}/rentals/", params=rental_data).json()
+        self.assertIn('rental_id', rental)
+        self.created_ids['rentals'].append(rental['rental_id'])
+        requests.post(f"{self.BASE_URL}/rentals/{rental['rental_id']}/return", params={'return_date': day(15), 'mileage_end': 9500})
+
+        response = requests.post(f"{self.BASE_URL}/reservations/{adjacent['reservation_id']}/cancel")
+        self.assertIn('message', response.json())
+        window = requests.get(f"{self.BASE_URL}/reservations/", params={'car_id': car_id}).json()
+        self.assertIn('error', window)
+
+    def test_30_available_cars(self):
+        """Тест поиска свободных автомобилей по карте занятости: бронирование, аренда, отмена и возврат"""
+        fuel_type = f'Hydrogen{self.timestamp}'
+        car_data = {
+            'brand': 'Toyota',
+            'model': 'Mirai',
+            'year': 2023,
+            'color': 'Blue',
+            'license_plate': f'AVAIL{self.timestamp}',
+            'daily_rate': 4000.0,
+            'mileage': 1000,
+            'fuel_type': fuel_type
+        }
+        car_id = requests.post(f"{self.BASE_URL}/cars/", params=car_data).json().get('car_id')
+        self.created_ids['cars'].append(car_id)
+        customer_data = {
+            'first_name': 'Kate',
+            'last_name': 'Available',
+            'email': f'kate.available{self.timestamp}@test.com',
+            'phone': '+79160000014',
+            'driver_license': f'DL_AVAIL{self.timestamp}'
+        }
+        customer_id = requests.post(f"{self.BASE_URL}/customers/", params=customer_data).json().get('customer_id')
+        self.created_ids['customers'].append(customer_id)
+
+        day = lambda n: str(date.today() + timedelta(days=n))
+
+        def available(start, end, **filters):
+            result = requests.get(f"{self.BASE_URL}/cars/available",
+                                  params={'from': day(start), 'to': day(end), 'fuel_type': fuel_type, **filters}).json()
+            return [] if isinstance(result, dict) else [c['car_id'] for c in result]
+
+        self.assertEqual(available(5, 8), [car_id])
+        self.assertEqual(available(5, 8, max_rate=3999), [])
+
+        reservation = requests.post(f"{self.BASE_URL}/reservations/", params={
+            'car_id': car_id, 'customer_id': customer_id, 'start_date': day(5), 'end_date': day(8)
+        }).json()
+        self.assertIn('reservation_id', reservation)
+        self.assertEqual(available(6, 7), [])
+        self.assertEqual(available(8, 10), [car_id])
+        requests.post(f"{self.BASE_URL}/reservations/{reservation['reservation_id']}/cancel")
+        self.assertEqual(available(6, 7), [car_id])
+
+        rental = requests.post(f"{self.BASE_URL}/rentals/", params={
+            'car_id': car_id, 'customer_id': customer_id, 'rental_date': day(0),
+            'planned_return_date': day(3), 'mileage_start': 1000
+        }).json()
+        self.assertIn('rental_id', rental)
+        self.created_ids['rentals'].append(rental['rental_id'])
+        self.assertEqual(available(0, 2), [])
+        self.assertEqual(available(3, 5), [car_id])
+        requests.post(f"{self.BASE_URL}/rentals/{rental['rental_id']}/return", params={'return_date': day(0), 'mileage_end': 1200})
+        self.assertEqual(available(0, 2), [car_id])
+
+        # Окно вне горизонта карты и некорректные даты
+        self.assertIn('error', requests.get(f"{self.BASE_URL}/cars/available", params={'from': day(-1), 'to': day(2)}).json())
+        self.assertIn('error', requests.get(f"{self.BASE_URL}/cars/available", params={'from': 'bad', 'to': day(2)}).json())
+
+    def test_31_concurrent_rentals(self):
+        """Тест одновременной аренды одного автомобиля: ровно одна успешна, остальные получают 409"""
+        car_data = {
+            'brand': 'Skoda',
+            'model': 'Octavia',
+            'year': 2021,
+            'color': 'Gray',
+            'license_plate': f'RACE{self.timestamp}',
+            'daily_rate': 2200.0,
+            'mileage': 30000
+        }
+        car_id = requests.post(f"{self.BASE_URL}/cars/", params=car_data).json().get('car_id')
+        self.created_ids['cars'].append(car_id)
+        customer_ids = []
+        for i in range(8):
+            customer_data = {
+                'first_name': 'Leo',
+                'last_name': f'Race{i}',
+                'email': f'leo.race{i}_{self.timestamp}@test.com',
+                'phone': '+79160000015',
+                'driver_license': f'DL_RACE{i}_{self.timestamp}'
+            }
+            customer_ids.append(requests.post(f"{self.BASE_URL}/customers/", params=customer_data).json().get('customer_id'))
+        self.created_ids['customers'].extend(customer_ids)
+
+        def rent(customer_id):
+            return requests.post(f"{self.BASE_URL}/rentals/", params={
+                'car_id': car_id,
+                'customer_id': customer_id,
+                'rental_date': str(date.today()),
+                'planned_return_date': str(date.today() + timedelta(days=2)),
+                'mileage_start': 30000
+            })
+
+        with ThreadPoolExecutor(max_workers=len(customer_ids)) as executor:
+            responses = list(executor.map(rent, customer_ids))
+
+        created = [r.json()['rental_id'] for r in responses if 'rental_id' in r.json()]
+        self.created_ids['rentals'].extend(created)
+        self.assertEqual(len(created), 1)
+        self.assertTrue(all(r.status_code == 409 for r in responses if 'error' in r.json()))
+
+        # Несуществующий клиент - обычная ошибка, а автомобиль после возврата остается свободным
+        requests.post(f"{self.BASE_URL}/rentals/{created[0]}/return", params={'return_date': str(date.today()), 'mileage_end': 30100})
+        response = rent(999999999)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('error', response.json())
+        cars = requests.get(f"{self.BASE_URL}/cars/", params={'available_only': True}).json()
+        self.assertIn(car_id, [c['car_id'] for c in cars])
+
+    def test_32_batch_return(self):
+        """Тест пакетного возврата: стоимость, штраф за просрочку и ошибки отдельных записей"""
+        customer_data = {
+            'first_name': 'Mia',
+            'last_name': 'Batch',
+            'email': f'mia.batch{self.timestamp}@test.com',
+            'phone': '+79160000016',
+            'driver_license': f'DL_BATCH{self.timestamp}'
+        }
+        customer_id = requests.post(f"{self.BASE_URL}/customers/", params=customer_data).json().get('customer_id')
+        self.created_ids['customers'].append(customer_id)
+
+        day = lambda n: str(date.today() + timedelta(days=n))
+        rental_ids = []
+        car_ids = []
+        for i in range(2):
+            car_data = {
+                'brand': 'Kia',
+                'model': 'Rio',
+                'year': 2020,
+                'color': 'White',
+                'license_plate': f'BATCH{i}_{self.timestamp}',
+                'daily_rate': 1000.0 * (i + 1),
+                'mileage': 5000
+            }
+            car_id = requests.post(f"{self.BASE_URL}/cars/", params=car_data).json().get('car_id')
+            self.created_ids['cars'].append(car_id)
+            car_ids.append(car_id)
+            rental = requests.post(f"{self.BASE_URL}/rentals/", params={
+                'car_id': car_id, 'customer_id': customer_id, 'rental_date': day(0),
+                'planned_return_date': day(2), 'mileage_start': 5000
+            }).json()
+            rental_ids.append(rental['rental_id'])
+        self.created_ids['rentals'].extend(rental_ids)
+
+        result = requests.post(f"{self.BASE_URL}/rentals/return/batch", json=[
+            {'rental_id': rental_ids[0], 'return_date': day(2), 'mileage_end': 5300},
+            {'rental_id': rental_ids[1], 'return_date': day(4), 'mileage_end': 5800},
+            {'rental_id': rental_ids[0], 'return_date': day(2), 'mileage_end': 5300},
+            {'rental_id': 999999999, 'return_date': day(2), 'mileage_end': 5300}
+        ]).json()
+        self.assertEqual(result['returned'], 2)
+        self.assertEqual(result['failed'], 2)
+        first, second, duplicate, missing = result['results']
+        self.assertEqual((first['days_rented'], first['total_cost'], first['mileage_driven']), (2, 2000.0, 300))
+        # 4 дня по 2000 плюс 2 дня просрочки по 50% ставки
+        self.assertEqual((second['days_rented'], second['total_cost']), (4, 10000.0))
+        self.assertIn('error', duplicate)
+        self.assertIn('error', missing)
+
+        cars = requests.get(f"{self.BASE_URL}/cars/", params={'available_only': True}).json()
+        available = {c['car_id']: c['mileage'] for c in cars}
+        self.assertEqual((available.get(car_ids[0]), available.get(car_ids[1])), (5300, 5800))
+
+    def test_33_reprice(self):
+        """Тест переоценки аренд: сухой прогон показывает разницу, запись меняет стоимость"""
+        car_data = {
+            'brand': 'Renault',
+            'model': 'Logan',
+            'year': 2019,
+            'color': 'Beige',
+            'license_plate': f'REPRICE{self.timestamp}',
+            'daily_rate': 1000.0,
+            'mileage': 70000
+        }
+        car_id = requests.post(f"{self.BASE_URL}/cars/", params=car_data).json().get('car_id')
+        self.created_ids['cars'].append(car_id)
+        customer_data = {
+            'first_name': 'Nick',
+            'last_name': 'Reprice',
+            'email': f'nick.reprice{self.timestamp}@test.com',
+            'phone': '+79160000017',
+            'driver_license': f'DL_REPRICE{self.timestamp}'
+        }
+        customer_id = requests.post(f"{self.BASE_URL}/customers/", params=customer_data).json().get('customer_id')
+        self.created_ids['customers'].append(customer_id)
+
+        rental = requests.post(f"{self.BASE_URL}/rentals/", params={
+            'car_id': car_id, 'customer_id': customer_id, 'rental_date': '2024-03-01',
+            'planned_return_date': '2024-03-04', 'mileage_start': 70000
+        }).json()
+        self.created_ids['rentals'].append(rental['rental_id'])
+        returned = requests.post(f"{self.BASE_URL}/rentals/{rental['rental_id']}/return",
+                                 params={'return_date': '2024-03-06', 'mileage_end': 70500}).json()
+        # 5 дней по 1000 плюс 2 дня просрочки по 50% ставки
+        self.assertEqual(returned['total_cost'], 6000.0)
+
+        requests.put(f"{self.BASE_URL}/cars/{car_id}", params={'daily_rate': 1200.0})
+        diff = requests.post(f"{self.BASE_URL}/admin/reprice", params={'car_id': car_id}).json()
+        self.assertTrue(diff['dry_run'])
+        self.assertEqual((diff['rentals'], diff['changed'], diff['difference']), (1, 1, 1200.0))
+        self.assertEqual(diff['changes'][0], {'rental_id': rental['rental_id'], 'old_cost': 6000.0, 'new_cost': 7200.0})
+
+        def current_cost():
+            rentals = requests.get(f"{self.BASE_URL}/rentals/", params={'status': 'completed'}).json()
+            return next(r['total_cost'] for r in rentals if r['rental_id'] == rental['rental_id'])
+
+        self.assertEqual(current_cost(), 6000.0)
+        applied = requests.post(f"{self.BASE_URL}/admin/reprice", params={'car_id': car_id, 'dry_run': False}).json()
+        self.assertEqual(applied['changed'], 1)
+        self.assertEqual(current_cost(), 7200.0)
+        again = requests.post(f"{self.BASE_URL}/admin/reprice", params={'car_id': car_id}).json()
+        self.assertEqual(again['changed'], 0)
+
+    def test_34_revenue_stats(self):
+        """Тест выручки по периодам из дневной сводки: группировки, детализация и удаление аренды"""
+        brand = f'Revenue{self.timestamp}'
+        car_data = {
+            'brand': brand,
+            'model': 'R1',
+            'year': 2022,
+            'color': 'Green',
+            'license_plate': f'REVENUE{self.timestamp}',
+            'daily_rate': 1000.0,
+            'mileage': 100
+        }
+        car_id = requests.post(f"{self.BASE_URL}/cars/", params=car_data).json().get('car_id')
+        self.created_ids['cars'].append(car_id)
+        customer_data = {
+            'first_name': 'Olga',
+            'last_name': 'Revenue',
+            'email': f'olga.revenue{self.timestamp}@test.com',
+            'phone': '+79160000018',
+            'driver_license': f'DL_REVENUE{self.timestamp}'
+        }
+        customer_id = requests.post(f"{self.BASE_URL}/customers/", params=customer_data).json().get('customer_id')
+        self.created_ids['customers'].append(customer_id)
+
+        rental_ids = []
+        for rental_date, return_date in [('2001-03-01', '2001-03-05'), ('2001-03-05', '2001-03-07'), ('2001-04-01', '2001-04-02')]:
+            rental = requests.post(f"{self.BASE_URL}/rentals/", params={
+                'car_id': car_id, 'customer_id': customer_id, 'rental_date': rental_date,
+                'planned_return_date': return_date, 'mileage_start': 100
+            }).json()
+            rental_ids.append(rental['rental_id'])
+            requests.post(f"{self.BASE_URL}/rentals/{rental['rental_id']}/return", params={'return_date': return_date, 'mileage_end': 200})
+        self.created_ids['rentals'].extend(rental_ids)
+
+        def revenue(**params):
+            result = requests.get(f"{self.BASE_URL}/stats/revenue", params={'from': '2001-01-01', 'to': '2002-01-01', **params}).json()
+            return [] if isinstance(result, dict) else result
+
+        by_day = revenue(group_by='car')
+        self.assertEqual([(r['period'], r['car'], r['rentals'], r['revenue']) for r in by_day if r['car'] == car_id],
+                         [('2001-03-05', car_id, 1, 4000.0), ('2001-03-07', car_id, 1, 2000.0), ('2001-04-02', car_id, 1, 1000.0)])
+        by_month = [r for r in revenue(granularity='month', group_by='brand') if r['brand'] == brand]
+        self.assertEqual([(r['period'], r['revenue']) for r in by_month], [('2001-03-01', 6000.0), ('2001-04-01', 1000.0)])
+        by_week = [r for r in revenue(granularity='week', group_by='brand') if r['brand'] == brand]
+        self.assertEqual([(r['period'], r['rentals']) for r in by_week], [('2001-03-05', 2), ('2001-04-02', 1)])
+
+        requests.delete(f"{self.BASE_URL}/rentals/{rental_ids[2]}")
+        by_month = [r for r in revenue(granularity='month', group_by='brand') if r['brand'] == brand]
+        self.assertEqual([(r['period'], r['revenue']) for r in by_month], [('2001-03-01', 6000.0)])
+
+        self.assertIn('error', requests.get(f"{self.BASE_URL}/stats/revenue", params={'granularity': 'year'}).json())
+        self.assertIn('error', requests.get(f"{self.BASE_URL}/stats/revenue", params={'group_by': 'color'}).json())
+
+    def test_35_utilization(self):
+        """Тест загрузки автомобилей: пересекающиеся аренды считаются один раз, активные - до плановой даты"""
+        car_ids = []
+        for suffix in ('A', 'B'):
+            car_data = {
+                'brand': 'Lada',
+                'model': 'Vesta',
+                'year': 2020,
+                'color': 'Orange',
+                'license_plate': f'UTIL{suffix}{self.timestamp}',
+                'daily_rate': 1500.0,
+                'mileage': 100
+            }
+            car_ids.append(requests.post(f"{self.BASE_URL}/cars/", params=car_data).json().get('car_id'))
+            self.created_ids['cars'].append(car_ids[-1])
+        car_id, quiet_car_id = car_ids
+        customer_data = {
+            'first_name': 'Paul',
+            'last_name': 'Utilization',
+            'email': f'paul.util{self.timestamp}@test.com',
+            'phone': '+79160000019',
+            'driver_license': f'DL_UTIL{self.timestamp}'
+        }
+        customer_id = requests.post(f"{self.BASE_URL}/customers/", params=customer_data).json().get('customer_id')
+        self.created_ids['customers'].append(customer_id)
+
+        for rental_car_id, rental_date, planned_return_date, return_date in [(car_id, '2002-01-01', '2002-01-11', '2002-01-11'),
+                                                                             (car_id, '2002-01-05', '2002-01-15', '2002-01-15'),
+                                                                             (car_id, '2002-01-25', '2002-02-10', None),
+                                                                             (quiet_car_id, '2002-01-10', '2002-01-12', '2002-01-12')]:
+            rental = requests.post(f"{self.BASE_URL}/rentals/", params={
+                'car_id': rental_car_id, 'customer_id': customer_id, 'rental_date': rental_date,
+                'planned_return_date': planned_return_date, 'mileage_start': 100
+            }).json()
+            self.created_ids['rentals'].append(rental['rental_id'])
+            if return_date:
+                requests.post(f"{self.BASE_URL}/rentals/{rental['rental_id']}/return", params={'return_date': return_date, 'mileage_end': 200})
+
+        report = requests.get(f"{self.BASE_URL}/stats/utilization", params={'from': '2002-01-01', 'to': '2002-01-31'}).json()
+        rows = {r['car_id']: r for r in report}
+        # 01.01-15.01 (14 дней) и 25.01-31.01 (6 дней) из 30
+        self.assertEqual((rows[car_id]['rented_days'], rows[car_id]['utilization']), (20, 66.7))
+        self.assertEqual((rows[quiet_car_id]['rented_days'], rows[quiet_car_id]['utilization']), (2, 6.7))
+        # Пересечение отмечено триггером при возврате: этот автомобиль отчет считает проходом по интервалам
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            overlapping = {row[0] for row in conn.execute("SELECT car_id FROM RentalOverlaps")}
+        finally:
+            conn.close()
+        self.assertIn(car_id, overlapping)
+        self.assertNotIn(quiet_car_id, overlapping)
+
+        least = requests.get(f"{self.BASE_URL}/stats/utilization",
+                             params={'from': '2002-01-01', 'to': '2002-01-31', 'least_first': True}).json()
+        self.assertEqual([r['rented_days'] for r in least], sorted(r['rented_days'] for r in least))
+        ours = [r['car_id'] for r in least if r['car_id'] in car_ids]
+        self.assertEqual(ours, [quiet_car_id, car_id])
+        limited = requests.get(f"{self.BASE_URL}/stats/utilization",
+                               params={'from': '2002-01-01', 'to': '2002-01-31', 'least_first': True, 'limit': 2}).json()
+        self.assertEqual(limited, least[:2])
+        for limit in (0, -1):
+            self.assertIn('error', requests.get(f"{self.BASE_URL}/stats/utilization",
+                                                params={'from': '2002-01-01', 'to': '2002-01-31', 'limit': limit}).json())
+        self.assertIn('error', requests.get(f"{self.BASE_URL}/stats/utilization", params={'from': '2002-02-01', 'to': '2002-01-01'}).json())
+
+    def test_36_overdue_rentals(self):
+        """Тест просроченных аренд: список со штрафом на сегодня и исчезновение после возврата"""
+        car_data = {
+            'brand': 'Chery',
+            'model': 'Tiggo',
+            'year': 2023,
+            'color': 'Red',
+            'license_plate': f'OVERDUE{self.timestamp}',
+            'daily_rate': 2000.0,
+            'mileage': 100
+        }
+        car_id = requests.post(f"{self.BASE_URL}/cars/", params=car_data).json().get('car_id')
+        self.created_ids['cars'].append(car_id)
+        customer_data = {
+            'first_name': 'Rita',
+            'last_name': 'Overdue',
+            'email': f'rita.overdue{self.timestamp}@test.com',
+            'phone': '+79160000020',
+            'driver_license': f'DL_OVERDUE{self.timestamp}'
+        }
+        customer_id = requests.post(f"{self.BASE_URL}/customers/", params=customer_data).json().get('customer_id')
+        self.created_ids['customers'].append(customer_id)
+
+        day = lambda n: str(date.today() + timedelta(days=n))
+        rental = requests.post(f"{self.BASE_URL}/rentals/", params={
+            'car_id': car_id, 'customer_id': customer_id, 'rental_date': day(-5),
+            'planned_return_date': day(-3), 'mileage_start': 100
+        }).json()
+        self.created_ids['rentals'].append(rental['rental_id'])
+
+        def overdue():
+            result = requests.get(f"{self.BASE_URL}/rentals/overdue").json()
+            return {} if isinstance(result, dict) else {r['rental_id']: r for r in result}
+
+        item = overdue()[rental['rental_id']]
+        self.assertEqual((item['overdue_days'], item['penalty']), (3, 3000.0))
+
+        requests.post(f"{self.BASE_URL}/rentals/{rental['rental_id']}/return", params={'return_date': day(0), 'mileage_end': 300})
+        self.assertNotIn(rental['rental_id'], overdue())
+
+    def test_37_overdue_scanner(self):
+        """Тест сканера: отмечаются только аренды, чей плановый возврат прошел после прошлого прохода"""
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = sqlite3.connect(os.path.join(tmp, 'overdue.db'))
+            try:
+                migrate(conn)
+                conn.execute("INSERT INTO Cars (brand, model, year, color, license_plate, daily_rate) VALUES ('A', 'B', 2020, 'C', 'X1', 100)")
+                conn.execute("INSERT INTO Customers (first_name, last_name, email, phone, driver_license) VALUES ('A', 'B', 'a@b', '1', 'D1')")
+                for planned in ('2024-01-05', '2024-01-15', '2024-02-01'):
+                    conn.execute("INSERT INTO Rentals (car_id, customer_id, rental_date, planned_return_date, mileage_start) VALUES (1, 1, '2024-01-01', ?, 0)",
+                                 (planned,))
+                conn.commit()
+
+                self.assertEqual(scan_overdue(conn, '2024-01-10'), 1)
+                self.assertEqual(scan_overdue(conn, '2024-01-10'), 0)
+                self.assertEqual(scan_overdue(conn, '2024-01-20'), 1)
+                # Аренда, просроченная уже при записи, отмечается триггером без сканера
+                conn.execute("INSERT INTO Rentals (car_id, customer_id, rental_date, planned_return_date, mileage_start) VALUES (1, 1, '2024-01-01', '2024-01-03', 0)")
+                conn.execute("UPDATE Rentals SET status = 'completed' WHERE planned_return_date = '2024-01-05'")
+                conn.commit()
+                overdue = [row[0] for row in conn.execute(
+                    "SELECT r.planned_return_date FROM OverdueRentals o JOIN Rentals r ON o.rental_id = r.rental_id ORDER BY 1")]
+                self.assertEqual(overdue, ['2024-01-03', '2024-01-15'])
+
+                plan = " ".join(row[3] for row in conn.execute(
+                    "EXPLAIN QUERY PLAN SELECT rental_id FROM Rentals WHERE status = 'active' AND planned_return_date >= ? AND planned_return_date < ?",
+                    ('2024-01-10', '2024-01-20')))
+                self.assertIn('idx_rentals_status_planned', plan)
+            finally:
+                conn.close()
+
+    def test_38_customer_search(self):
+        """Тест полнотекстового поиска клиентов: префиксы полей, ранжирование и синхронизация с изменениями"""
+        last_name = f'Searchable{self.timestamp}'
+        customer_data = {
+            'first_name': 'Светлана',
+            'last_name': last_name,
+            'email': f'sveta.search{self.timestamp}@example.com',
+            'phone': f'+7999{self.timestamp}',
+            'driver_license': f'DLSEARCH{self.timestamp}'
+        }
+        customer_id = requests.post(f"{self.BASE_URL}/customers/", params=customer_data).json().get('customer_id')
+        self.created_ids['customers'].append(customer_id)
+
+        def found(q, **params):
+            result = requests.get(f"{self.BASE_URL}/customers/search", params={'q': q, **params}).json()
+            return [] if isinstance(result, dict) else [c['customer_id'] for c in result]
+
+        for q in (last_name[:-3], f'свет {last_name}', f'sveta.search{self.timestamp}', f'7999{self.timestamp}'[:-2], f'dlsearch{self.timestamp}'):
+            self.assertEqual(found(q), [customer_id], q)
+        self.assertEqual(found(f'{last_name} Иван'), [])
+        self.assertIn('error', requests.get(f"{self.BASE_URL}/customers/search", params={'q': '*" OR'}).json())
+
+        requests.put(f"{self.BASE_URL}/customers/{customer_id}", params={'last_name': f'Renamed{self.timestamp}'})
+        self.assertEqual(found(last_name), [])
+        self.assertEqual(found(f'Renamed{self.timestamp}'), [customer_id])
+
+        requests.delete(f"{self.BASE_URL}/customers/{customer_id}")
+        self.assertEqual(found(f'Renamed{self.timestamp}'), [])
+
+    def test_39_car_search(self):
+        """Тест поиска автомобилей: сочетания фильтров, сортировки и ошибки параметров"""
+        brand = f'Search{self.timestamp}'
+        car_ids = []
+        for i, (model, year, rate, fuel_type) in enumerate([('Alpha', 2018, 1500.0, 'petrol'), ('Alpha', 2021, 2500.0, 'diesel'),
+                                                            ('Beta', 2022, 3500.0, 'petrol')]):
+            car_data = {
+                'brand': brand,
+                'model': model,
+                'year': year,
+                'color': 'Black',
+                'license_plate': f'SEARCH{i}_{self.timestamp}',
+                'daily_rate': rate,
+                'mileage': 1000,
+                'fuel_type': fuel_type
+            }
+            car_ids.append(requests.post(f"{self.BASE_URL}/cars/", params=car_data).json().get('car_id'))
+        self.created_ids['cars'].extend(car_ids)
+
+        def found(**params):
+            result = requests.get(f"{self.BASE_URL}/cars/search", params={'brand': brand, **params}).json()
+            return [] if isinstance(result, dict) else [c['car_id'] for c in result]
+
+        self.assertEqual(found(), car_ids)
+        self.assertEqual(found(model='Alpha'), car_ids[:2])
+        self.assertEqual(found(model='Alpha', year_min=2020), car_ids[1:2])
+        self.assertEqual(found(fuel_type='petrol', sort='-daily_rate'), [car_ids[2], car_ids[0]])
+        self.assertEqual(found(rate_min=2000, rate_max=3000), car_ids[1:2])
+        self.assertEqual(found(sort='-year', limit=2), [car_ids[2], car_ids[1]])
+        self.assertEqual(found(year_max=2000), [])
+        self.assertIn('error', requests.get(f"{self.BASE_URL}/cars/search", params={'sort': 'color'}).json())
+
+    def test_40_car_search_plans(self):
+        """Тест планов поиска автомобилей на базе со статистикой ANALYZE: любой набор фильтров при любой сортировке идет по индексу"""
+        values = {'brand': 'Toyota', 'model': 'Camry', 'fuel_type': 'diesel', 'year_min': 2015, 'year_max': 2022,
+                  'rate_min': 1500, 'rate_max': 4000, 'available_only': True}
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'search.db')
+            generate(db_path, cars=3000, customers=100, rentals=1000)
+            conn = sqlite3.connect(db_path)
+            try:
+                self.assertTrue(conn.execute("SELECT COUNT(*) FROM sqlite_stat1 WHERE tbl = 'Cars'").fetchone()[0])
+                for count in range(len(values) + 1):
+                    for names in itertools.combinations(values, count):
+                        for sort in CAR_SORTS:
+                            shape = {name: values[name] for name in names}
+                            query, params = car_search_query(**shape, sort=sort)
+                            plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+                            if shape:
+                                self.assertRegex(plan, r"^SEARCH Cars USING (COVERING )?INDEX idx_cars_", (shape, sort))
+                                self.assertNotIn("SCAN", plan, (shape, sort))
+                            else:
+                                self.assertNotIn("TEMP B-TREE", plan, sort)
+                            # Явный индекс не меняет результат: сверка с полным обходом таблицы
+                            reference = re.sub(r" INDEXED BY \w+", " NOT INDEXED", query)
+                            self.assertEqual(conn.execute(query, params).fetchall(),
+                                             conn.execute(reference, params).fetchall(), (shape, sort))
+            finally:
+                conn.close()
+
+    def test_41_reads_do_not_block_rentals(self):
+        """Тест чтения через пул только для чтения: поток GET /rentals/ не задерживает создание аренды"""
+        car_data = {
+            'brand': 'Geely',
+            'model': 'Coolray',
+            'year': 2023,
+            'color': 'Gray',
+            'license_plate': f'LATENCY{self.timestamp}',
+            'daily_rate': 2000.0,
+            'mileage': 100
+        }
+        car_id = requests.post(f"{self.BASE_URL}/cars/", params=car_data).json().get('car_id')
+        self.created_ids['cars'].append(car_id)
+        customer_data = {
+            'first_name': 'Sam',
+            'last_name': 'Latency',
+            'email': f'sam.latency{self.timestamp}@test.com',
+            'phone': '+79160000021',
+            'driver_license': f'DL_LATENCY{self.timestamp}'
+        }
+        customer_id = requests.post(f"{self.BASE_URL}/customers/", params=customer_data).json().get('customer_id')
+        self.created_ids['customers'].append(customer_id)
+
+        def create_and_return(count):
+            """Создать и закрыть count аренд; время создания каждой и ошибки записи"""
+            latencies, errors = [], []
+            for _ in range(count):
+                started = time.perf_counter()
+                response = requests.post(f"{self.BASE_URL}/rentals/", params={
+                    'car_id': car_id, 'customer_id': customer_id, 'rental_date': str(date.today()),
+                    'planned_return_date': str(date.today() + timedelta(days=1)), 'mileage_start': 100
+                })
+                latencies.append(time.perf_counter() - started)
+                rental = response.json()
+                if response.status_code != 200 or 'rental_id' not in rental:
+                    errors.append((response.status_code, rental))
+                    continue
+                self.created_ids['rentals'].append(rental['rental_id'])
+                returned = requests.post(f"{self.BASE_URL}/rentals/{rental['rental_id']}/return",
+                                         params={'return_date': str(date.today()), 'mileage_end': 100})
+                if returned.status_code != 200 or 'error' in returned.json():
+                    errors.append((returned.status_code, returned.json()))
+            return latencies, errors
+
+        baseline, write_errors = create_and_return(10)
+        self.assertEqual(write_errors, [])
+
+        stop = threading.Event()
+        read_errors = []
+        reads = []
+
+        def read_rentals():
+            session = requests.Session()
+            while not stop.is_set():
+                response = session.get(f"{self.BASE_URL}/rentals/", params={'limit': 200})
+                reads.append(response.status_code)
+                if response.status_code != 200 or 'error' in response.json():
+                    read_errors.append(response.status_code)
+
+        before = requests.get(f"{self.BASE_URL}/metrics").text
+        readers = [threading.Thread(target=read_rentals) for _ in range(8)]
+        for reader in readers:
+            reader.start()
+        try:
+            time.sleep(0.2)
+            loaded, write_errors = create_and_return(20)
+        finally:
+            stop.set()
+            for reader in readers:
+                reader.join()
+        after = requests.get(f"{self.BASE_URL}/metrics").text
+
+        self.assertGreater(len(reads), 0)
+        self.assertEqual(write_errors, [])
+        self.assertEqual(read_errors, [])
+
+        # GET-обработчики берут соединения из пула чтения, а не из пула записи:
+        # пул записи за время нагрузки выдал соединения только записям (и изредка сканеру просрочек)
+        pool_count = 'car_rental_db_pool_wait_seconds_count{{pool="{}"}}'
+        read_delta = metric_value(after, pool_count.format('read')) - metric_value(before, pool_count.format('read'))
+        write_delta = metric_value(after, pool_count.format('write')) - metric_value(before, pool_count.format('write'))
+        self.assertGreaterEqual(read_delta, len(reads))
+        self.assertLessEqual(write_delta, 2 * len(loaded) + 5)
+
+        # Соединения пула чтения открыты только для чтения (mode=ro, query_only)
+        read_only = ConnectionPool(DB_PATH, size=1, read_only=True)
+        try:
+            with read_only.connection() as conn:
+                with self.assertRaises(sqlite3.OperationalError):
+                    conn.execute("UPDATE Cars SET mileage = mileage WHERE car_id = ?", (car_id,))
+        finally:
+            read_only.close()
+
+        # Читатели делят с записью только процессор, а не блокировки и соединения: медиана создания аренды
+        # под нагрузкой растет в разы меньше, чем при ожидании пула или блокировки (таймауты - секунды)
+        self.assertLess(statistics.median(loaded), 5 * statistics.median(baseline) + 0.5)
+
+    def test_42_group_commit_writer(self):
+        """Тест групповой фиксации: параллельные операции идут пачками, ошибка одной не мешает остальным"""
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'writer.db')
+            conn = sqlite3.connect(db_path)
+            migrate(conn)
+            conn.close()
+
+            writer = GroupCommitWriter(db_path, delay_ms=5, max_batch=64)
+            writer.start()
+            try:
+                def insert(i):
+                    email = 'dup@test.com' if i in (10, 11) else f'c{i}@test.com'
+                    return lambda c: c.execute(
+                        "INSERT INTO Customers (first_name, last_name, email, phone, driver_license) VALUES ('A', 'B', ?, '1', ?) RETURNING customer_id",
+                        (email, f'DL{i}')
+                    ).fetchone()[0]
+
+                with ThreadPoolExecutor(max_workers=32) as executor:
+                    futures = list(executor.map(lambda i: writer.submit(insert(i)), range(200)))
+                outcomes = [f.exception() or f.result() for f in futures]
+            finally:
+                writer.stop()
+
+            errors = [o for o in outcomes if isinstance(o, Exception)]
+            self.assertEqual(len(errors), 1)
+            self.assertIsInstance(errors[0], sqlite3.IntegrityError)
+            self.assertLess(writer.batches, writer.operations)
+
+            conn = sqlite3.connect(db_path)
+            try:
+                ids = sorted(o for o in outcomes if not isinstance(o, Exception))
+                self.assertEqual([row[0] for row in conn.execute("SELECT customer_id FROM Customers ORDER BY customer_id")], ids)
+            finally:
+                conn.close()
+
+    def test_43_typed_responses(self):
+        """Тест ответов списков: типы полей, заголовки и описание моделей в OpenAPI"""
+        car_data = {
+            'brand': 'Chery',
+            'model': 'Tiggo 7',
+            'year': 2022,
+            'color': 'White',
+            'license_plate': f'TYPED{self.timestamp}',
+            'daily_rate': 2300.0,
+            'mileage': 500
+        }
+        car_id = requests.post(f"{self.BASE_URL}/cars/", params=car_data).json().get('car_id')
+        self.created_ids['cars'].append(car_id)
+        customer_data = {
+            'first_name': 'Tina',
+            'last_name': 'Typed',
+            'email': f'tina.typed{self.timestamp}@test.com',
+            'phone': '+79160000043',
+            'driver_license': f'DL_TYPED{self.timestamp}'
+        }
+        customer_id = requests.post(f"{self.BASE_URL}/customers/", params=customer_data).json().get('customer_id')
+        self.created_ids['customers'].append(customer_id)
+        rental_id = requests.post(f"{self.BASE_URL}/rentals/", params={
+            'car_id': car_id, 'customer_id': customer_id, 'rental_date': str(date.today()),
+            'planned_return_date': str(date.today() + timedelta(days=2)), 'mileage_start': 500
+        }).json().get('rental_id')
+        self.assertIsNotNone(rental_id)
+        self.created_ids['rentals'].append(rental_id)
+
+        response = requests.get(f"{self.BASE_URL}/cars/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers['content-type'].startswith('application/json'))
+        self.assertIn('ETag', response.headers)
+        car = next(c for c in response.json() if c['car_id'] == car_id)
+        self.assertIs(car['is_available'], False)
+        self.assertEqual(car['daily_rate'], 2300.0)
+        self.assertIsInstance(car['daily_rate'], float)
+        self.assertIsInstance(car['year'], int)
+
+        rentals = requests.get(f"{self.BASE_URL}/rentals/", params={'status': 'active'}).json()
+        rental = next(r for r in rentals if r['rental_id'] == rental_id)
+        self.assertEqual(rental['customer_name'], 'Tina Typed')
+        self.assertEqual((rental['car_brand'], rental['car_model']), ('Chery', 'Tiggo 7'))
+        self.assertIsNone(rental['return_date'])
+
+        schemas = requests.get(f"{self.BASE_URL}/openapi.json").json()['components']['schemas']
+        for model in ('Car', 'Customer', 'Rental', 'MaintenanceRecord', 'CarPage'):
+            self.assertIn(model, schemas)
+        self.assertEqual(schemas['Car']['properties']['is_available']['type'], 'boolean')
+
+    def test_44_generate_data(self):
+        """Тест генератора: воспроизводимость, непересекающиеся аренды и заполненные производные таблицы"""
+        with tempfile.TemporaryDirectory() as tmp:
+            tables = {}
+            for name in ('first.db', 'second.db'):
+                path = os.path.join(tmp, name)
+                generate(path, cars=50, customers=200, rentals=2000, seed=7, today=date(2024, 6, 1), active_share=0.4, overdue_share=0.2)
+                conn = sqlite3.connect(path)
+                try:
+                    tables[name] = {t: conn.execute(f"SELECT * FROM {t}").fetchall() for t in ('Cars', 'Customers', 'Rentals', 'Maintenance')}
+                    if name == 'second.db':
+                        continue
+                    self.assertEqual(len(tables[name]['Rentals']), 2000)
+                    self.assertEqual(conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0], MIGRATIONS[-1][0])
+
+                    overlaps = conn.execute('''
+                        SELECT COUNT(*) FROM Rentals a JOIN Rentals b ON a.car_id = b.car_id AND a.rental_id < b.rental_id
+                        WHERE a.rental_date < COALESCE(b.return_date, '9999-12-31') AND b.rental_date < COALESCE(a.return_date, '9999-12-31')
+                    ''').fetchone()[0]
+                    self.assertEqual(overlaps, 0)
+
+                    active, overdue = conn.execute(
+                        "SELECT COUNT(*), SUM(planned_return_date < '2024-06-01') FROM Rentals WHERE status = 'active'").fetchone()
+                    self.assertGreater(overdue, 0)
+                    self.assertGreater(active, overdue)
+                    self.assertEqual(conn.execute("SELECT COUNT(*) FROM OverdueRentals").fetchone()[0], overdue)
+                    self.assertEqual(conn.execute("SELECT COUNT(*) FROM Cars WHERE is_available = 0").fetchone()[0], active)
+                    self.assertEqual(conn.execute("SELECT total_rentals, active_rentals FROM RentalStats").fetchone(), (2000, active))
+                finally:
+                    conn.close()
+            self.assertEqual(tables['first.db'], tables['second.db'])
+
+    def test_45_metrics(self):
+        """Тест метрик Prometheus: счетчики по шаблону маршрута, строки списков, время SQL и пулы"""
+        car_data = {
+            'brand': 'Haval',
+            'model': 'Jolion',
+            'year': 2023,
+            'color': 'Blue',
+            'license_plate': f'METRICS{self.timestamp}',
+            'daily_rate': 2100.0,
+            'mileage': 300
+        }
+        car_id = requests.post(f"{self.BASE_URL}/cars/", params=car_data).json().get('car_id')
+        self.created_ids['cars'].append(car_id)
+        for maintenance_date in ('2024-02-01', '2024-08-01'):
+            maintenance_id = requests.post(f"{self.BASE_URL}/maintenance/", params={
+                'car_id': car_id, 'maintenance_date': maintenance_date, 'maintenance_type': 'Oil change',
+                'cost': 3000.0, 'mileage': 300
+            }).json().get('maintenance_id')
+            self.assertIsNotNone(maintenance_id)
+            self.created_ids['maintenance'].append(maintenance_id)
+
+        before = requests.get(f"{self.BASE_URL}/metrics").text
+        cars = requests.get(f"{self.BASE_URL}/cars/").json()
+        records = requests.get(f"{self.BASE_URL}/maintenance/{car_id}").json()
+        self.assertEqual(len(records), 2)
+
+        response = requests.get(f"{self.BASE_URL}/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers['content-type'].startswith('text/plain; version=0.0.4'))
+        text = response.text
+
+        requests_line = 'car_rental_http_requests_total{method="GET",route="/cars/",status="200"}'
+        self.assertEqual(metric_value(text, requests_line) - metric_value(before, requests_line), 1)
+        maintenance_line = 'car_rental_http_requests_total{method="GET",route="/maintenance/{car_id}",status="200"}'
+        self.assertEqual(metric_value(text, maintenance_line) - metric_value(before, maintenance_line), 1)
+        maintenance_rows = 'car_rental_list_rows_sum{method="GET",route="/maintenance/{car_id}"}'
+        self.assertEqual(metric_value(text, maintenance_rows) - metric_value(before, maintenance_rows), 2)
+        rows_sum = 'car_rental_list_rows_sum{method="GET",route="/cars/"}'
+        self.assertEqual(metric_value(text, rows_sum) - metric_value(before, rows_sum), len(cars))
+
+        # Гистограмма накопительная: корзина +Inf равна числу наблюдений
+        inf_bucket = metric_value(text, 'car_rental_http_request_duration_seconds_bucket{method="GET",route="/cars/",le="+Inf"}')
+        self.assertEqual(inf_bucket, metric_value(text, 'car_rental_http_request_duration_seconds_count{method="GET",route="/cars/"}'))
+
+        self.assertIn('car_rental_sql_duration_seconds_count{statement="SELECT Cars"}', text)
+        # Метка - операция и таблица: ни текста запросов, ни служебных PRAGMA/DDL в метриках нет
+        statements = {line.split('"')[1] for line in text.splitlines() if line.startswith('car_rental_sql_duration_seconds_count{')}
+        self.assertFalse([label for label in statements if 'PRAGMA' in label or 'CREATE' in label or 'WHERE' in label])
+        self.assertIn('car_rental_db_pool_wait_seconds_count{pool="read"}', text)
+        self.assertIn('car_rental_db_pool_connections{pool="write",state="size"}', text)
+        self.assertIn('car_rental_cache_hit_ratio', text)
+        self.assertNotIn('/metrics', requests.get(f"{self.BASE_URL}/openapi.json").json()['paths'])
+
+    def test_46_busy_errors(self):
+        """Тест классификации ошибок SQLite: занятая база - конфликт (409), прочие ошибки - нет"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'busy.db')
+            holder = sqlite3.connect(path)
+            waiter = sqlite3.connect(path, timeout=0)
+            try:
+                holder.execute("CREATE TABLE Cars (car_id INTEGER PRIMARY KEY)")
+                holder.commit()
+                holder.execute("BEGIN IMMEDIATE")
+                with self.assertRaises(sqlite3.OperationalError) as busy:
+                    waiter.execute("BEGIN IMMEDIATE")
+                self.assertTrue(is_busy(busy.exception))
+                with self.assertRaises(sqlite3.OperationalError) as missing:
+                    waiter.execute("SELECT * FROM Missing")
+                self.assertFalse(is_busy(missing.exception))
+                self.assertFalse(is_busy(ValueError("database is locked")))
+            finally:
+                holder.rollback()
+                holder.close()
+                waiter.close()
+
+    def test_47_availability_index_dates(self):
+        """Тест карты занятости: будущая аренда не занимает автомобиль сегодня, строки с испорченной датой пропускаются"""
+        day = lambda n: str(date.today() + timedelta(days=n))
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = sqlite3.connect(os.path.join(tmp, 'availability.db'))
+            try:
+                migrate(conn)
+                car_ids = [conn.execute(
+                    "INSERT INTO Cars (brand, model, year, color, license_plate, daily_rate, mileage) "
+                    "VALUES ('Lada', 'Vesta', 2022, 'White', ?, 1500, 0) RETURNING car_id", (f'DAYS{n}',)
+                ).fetchone()[0] for n in range(3)]
+                future, overdue, broken = car_ids
+                rentals = [(future, day(2), day(5)), (overdue, day(-5), day(-1)), (broken, 'not a date', day(3))]
+                conn.executemany("INSERT INTO Rentals (car_id, customer_id, rental_date, planned_return_date, mileage_start) "
+                                 "VALUES (?, 1, ?, ?, 0)", rentals)
+                conn.commit()
+
+                index = AvailabilityIndex(horizon_days=30)
+                with self.assertLogs('availability', 'WARNING'):
+                    index.rebuild(conn)
+                self.assertEqual(index.find_available(conn, day(0), day(2)), [future, broken])
+                # Просроченная аренда занимает автомобиль и в следующие дни, пока его не вернут
+                self.assertEqual(index.find_available(conn, day(5), day(7)), [future, broken])
+                self.assertTrue(active_rental_overlaps(conn, overdue, day(10), day(12)))
+                self.assertFalse(active_rental_overlaps(conn, future, day(5), day(7)))
+
+                # Испорченная запись журнала не останавливает применение следующих
+                conn.execute("INSERT INTO Rentals (car_id, customer_id, rental_date, planned_return_date, mileage_start) "
+                             "VALUES (?, 1, '2024-13-45', ?, 0)", (broken, day(3)))
+                conn.execute("INSERT INTO Rentals (car_id, customer_id, rental_date, planned_return_date, mileage_start) "
+                             "VALUES (?, 1, ?, ?, 0)", (overdue, day(6), day(8)))
+                conn.commit()
+                with self.assertLogs('availability', 'WARNING'):
+                    self.assertEqual(index.find_available(conn, day(6), day(7)), [future, broken])
+                self.assertEqual(index.find_available(conn, day(0), day(2)), [future, broken])
+
+                # Возврат освобождает автомобиль через журнал
+                conn.execute("UPDATE Rentals SET status = 'completed', return_date = ? WHERE car_id = ? AND rental_date = ?",
+                             (day(0), overdue, day(-5)))
+                conn.commit()
+                self.assertEqual(index.find_available(conn, day(2), day(4)), [overdue, broken])
+                self.assertFalse(active_rental_overlaps(conn, overdue, day(10), day(12)))
+            finally:
+                conn.close()
+
+    def test_48_loader_schema_recovery(self):
+        """Тест загрузчика: индексы и триггеры, снятые на время загрузки, возвращаются при migrate() после сбоя
+        вместе с пересчитанными производными данными"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'loader.db')
+            schema = "SELECT type, name FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL ORDER BY name"
+            conn = sqlite3.connect(path)
+            try:
+                migrate(conn)
+                objects = conn.execute(schema).fetchall()
+                dropped = drop_schema(conn, TABLE_ORDER)
+                self.assertIn('idx_cars_brand_rate', dropped)
+                self.assertIn('trg_rental_stats_insert', dropped)
+                self.assertIn('trg_customer_search_insert', dropped)
+                # Строки, записанные без триггеров, а затем процесс "упал" до rebuild_schema
+                conn.execute("INSERT INTO Cars (brand, model, year, color, license_plate, daily_rate) "
+                             "VALUES ('Lada', 'Niva', 2021, 'Green', 'CRASH1', 1400)")
+                conn.execute("INSERT INTO Customers (first_name, last_name, email, phone, driver_license) "
+                             "VALUES ('Zakhar', 'Crashev', 'crash@test.com', '+79160000048', 'DL_CRASH')")
+                conn.execute("INSERT INTO Rentals (car_id, customer_id, rental_date, return_date, planned_return_date, "
+                             "total_cost, mileage_start, status) VALUES (1, 1, '2024-01-01', '2024-01-03', '2024-01-03', 2800, 0, 'completed')")
+                conn.commit()
+            finally:
+                conn.close()
+
+            conn = sqlite3.connect(path)
+            try:
+                remaining = [row for row in conn.execute(schema) if row[1] not in dropped]
+                self.assertEqual(remaining, [row for row in objects if row[1] not in dropped])
+                self.assertEqual(conn.execute("SELECT total_rentals FROM RentalStats").fetchone()[0], 0)
+
+                self.assertEqual(migrate(conn), [])
+                self.assertEqual(conn.execute(schema).fetchall(), objects)
+                self.assertEqual(conn.execute("SELECT COUNT(*) FROM DroppedSchema").fetchone()[0], 0)
+                self.assertEqual(conn.execute("SELECT total_rentals, total_revenue FROM RentalStats").fetchone(), (1, 2800.0))
+                self.assertEqual(conn.execute("SELECT day, rentals, revenue FROM RevenueDaily").fetchall(), [('2024-01-03', 1, 2800.0)])
+                self.assertEqual(conn.execute("SELECT rowid FROM CustomerSearch WHERE CustomerSearch MATCH 'Crash*'").fetchall(), [(1,)])
+                self.assertEqual(conn.execute("SELECT kind FROM AvailabilityLog ORDER BY seq DESC LIMIT 1").fetchone(), ('car',))
+                self.assertGreater(conn.execute("SELECT version FROM TableVersions WHERE table_name = 'Rentals'").fetchone()[0], 0)
+            finally:
+                conn.close()
+
+if __name__ == '__main__':
     unittest.main(verbosity=2)
\ No newline at end of file
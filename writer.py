@@ -0,0 +1,124 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from db import DB_PATH, connect
+
+# Групповая фиксация включается переменной окружения; по умолчанию каждая запись - своя транзакция
+GROUP_COMMIT = os.environ.get("CAR_RENTAL_GROUP_COMMIT", "0") == "1"
+# Сколько ждать попутных операций после первой в пачке и сколько операций не более в одной транзакции
+GROUP_COMMIT_DELAY_MS = float(os.environ.get("CAR_RENTAL_GROUP_COMMIT_DELAY_MS", "2"))
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get("CAR_RENTAL_GROUP_COMMIT_MAX_BATCH", "256"))
+
+
+class GroupCommitWriter:
+    """Единственный писатель: собирает операции записи из параллельных запросов
+    и применяет их пачкой в одной транзакции с одной фиксацией.
+
+    Операция - функция operation(conn), которая выполняет свои запросы без
+    BEGIN/COMMIT. Каждая операция идет в своей точке сохранения, поэтому ошибка
+    одной откатывает только ее. Результат или исключение операции передается
+    через Future после фиксации всей пачки.
+    """
+
+    def __init__(self, path=DB_PATH, delay_ms=GROUP_COMMIT_DELAY_MS, max_batch=GROUP_COMMIT_MAX_BATCH):
+        self.path = path
+        self.delay = delay_ms / 1000
+        self.max_batch = max_batch
+        self.batches = 0
+        self.operations = 0
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, operation):
+        """Поставить операцию в очередь; возвращает Future с ее результатом"""
+        if self._thread is None:
+            raise RuntimeError("Писатель групповой фиксации не запущен")
+        future = Future()
+        self._queue.put((operation, future))
+        return future
+
+    def _collect(self, first):
+        """Добрать в пачку операции, пришедшие за время ожидания"""
+        batch = [first]
+        deadline = time.monotonic() + self.delay
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _apply(self, conn, batch):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for operation, _ in batch:
+                conn.execute("SAVEPOINT operation")
+                try:
+                    outcomes.append((True, operation(conn)))
+                    conn.execute("RELEASE operation")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO operation")
+                    conn.execute("RELEASE operation")
+                    outcomes.append((False, e))
+            conn.commit()
+        except Exception as e:
+            # Пачка не зафиксирована - ошибка у всех ее операций
+            if conn.in_transaction:
+                conn.rollback()
+            outcomes = [(False, e)] * len(batch)
+
+        self.batches += 1
+        self.operations += len(batch)
+        for (_, future), (ok, value) in zip(batch, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _run(self):
+        conn = connect(self.path)
+        try:
+            while True:
+                first = self._queue.get()
+                if first is None:
+                    break
+                self._apply(conn, self._collect(first))
+        finally:
+            conn.close()
+
+
+writer = GroupCommitWriter() if GROUP_COMMIT else None
+
+
+def execute_write(conn, operation):
+    """Выполнить операцию записи: через групповую фиксацию, если она включена, иначе отдельной транзакцией на conn"""
+    if writer is not None:
+        return writer.submit(operation).result()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = operation(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return result